@@ -1,6 +1,37 @@
 from __future__ import annotations
+from typing import Dict
+
 from state_schema import Profile, MonthSignal, PortfolioPlan
 
+# 안전자산 버킷은 이 티커 하나로 삼
+SAFE_TICKER = "BIL"
+DEFAULT_EQUITY_BASKET = {"QQQ": 1.0}
+
+# 주식 바스켓에서 빼는 채권/금/원자재/현금성 티커 (추천 포트폴리오에 섞여 있어도 주식 신호/주문에는 안 씀)
+NON_EQUITY_TICKERS = frozenset({
+    "BIL", "SGOV", "SHV", "USFR", "TFLO", "JPST", "MINT", "ICSH",
+    "SHY", "VGSH", "IEI", "IEF", "VGIT", "TLT", "VGLT", "EDV", "ZROZ", "GOVT",
+    "AGG", "BND", "BNDX", "IAGG", "TIP", "SCHP", "VTIP", "LQD", "VCIT", "HYG", "JNK", "MUB", "EMB",
+    "GLD", "IAU", "GLDM", "SGOL", "SLV", "PDBC", "DBC", "GSG",
+})
+
+
+def equity_bucket(weights: Dict[str, float]) -> Dict[str, float]:
+    """
+    포트폴리오 비중 -> 주식 종목만 남겨 합 1로 정규화 (없으면 QQQ 단독)
+    """
+    eq = {}
+    for t, w in (weights or {}).items():
+        t = str(t).upper()
+        if t in NON_EQUITY_TICKERS or float(w or 0) <= 0:
+            continue
+        eq[t] = eq.get(t, 0.0) + float(w)
+    total = sum(eq.values())
+    if total <= 0:
+        return dict(DEFAULT_EQUITY_BASKET)
+    return {t: round(w / total, 4) for t, w in sorted(eq.items(), key=lambda kv: -kv[1])}
+
+
 def build_portfolio_plan(profile: Profile, signal: MonthSignal) -> PortfolioPlan:
     budget = int(profile.monthly_budget_krw)
     equity_amt = int(round(budget * float(signal.equity_weight)))
@@ -8,6 +39,6 @@ def build_portfolio_plan(profile: Profile, signal: MonthSignal) -> PortfolioPlan
     return PortfolioPlan(
         equity_amount_krw=equity_amt,
         safe_amount_krw=safe_amt,
-        equity_bucket="Broad Equity Basket",
+        equity_bucket=" / ".join(f"{t} {w:.0%}" for t, w in signal.basket.items()) or "Broad Equity Basket",
         safe_bucket="Safe Asset Basket",
     )
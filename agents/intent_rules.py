@@ -0,0 +1,251 @@
+from __future__ import annotations
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Mapping, Optional, Sequence, Tuple
+
+# 라우팅 규칙 표 (import 시 한 번 컴파일)
+# - 키워드는 Aho-Corasick 자동자 하나로 한 번만 훑어서 그룹별 적중을 모음 -> O(len(text))
+# - \s* 처럼 공백이 유동적인 패턴만 정규식, 앵커 키워드가 맞을 때만 평가
+# - 규칙은 위에서부터 먼저 맞는 것이 이김 (기존 if 순서 그대로)
+
+# 그룹 이름 -> (키워드 목록, 대소문자 무시 여부)
+KEYWORDS: Dict[str, Tuple[List[str], bool]] = {
+    # 설정/프로필 관리
+    "edit_settings": (["설정 바꿔", "설정 바꾸자", "설정 변경", "설정 수정", "프로필 바꿔", "프로필 변경"], False),
+    "profile_list": (["내 설정 목록", "설정 목록", "프로필 목록", "내 설정 보여줘", "설정 리스트"], False),
+    "switch_anchor": (["번"], False),
+    "switch_verbs": (["바꿔", "전환", "선택", "사용"], False),
+    "rename_target": (["이 설정", "설정 이름", "이름을"], False),
+    "rename_verbs": (["바꿔", "변경", "rename"], False),
+    "rename_exact": (["이 설정 이름"], False),
+    # 과거 기록
+    "month_anchor": (["달"], False),
+    "three_month_anchor": (["개월"], False),
+    # 용어 설명
+    "term_markers": (["뭐야", "뜻", "의미", "설명", "용어", "란"], False),
+    "finance_terms": (["etf", "per", "pbr", "배당", "분산", "리밸런싱", "지수", "s&p", "나스닥", "qqq", "tqqq"], True),
+    "question": (["?"], False),
+    # 매수 판단 / 배분 / 온보딩
+    "decide": (["지금 사", "지금 사도", "지금 매수", "추가로 사", "더 사", "급락", "급등", "불안", "무서", "조급"], False),
+    "allocate": (["얼마씩", "얼마 사", "비중", "포트폴리오", "이번 달", "투자 계획", "가이드", "분배"], False),
+    "onboard": (["시작", "온보딩", "프로필", "설정 등록", "처음", "가입"], False),
+    "plan": (["계획"], False),
+    "plan_verbs": (["세워", "수립", "만들", "짜"], False),
+    # node_route 단계
+    "sim_confirm": (["보여줘", "시뮬레이션", "예", "응", "그래"], False),
+    "market": ([
+        "시장", "뉴스", "시황", "분위기", "전망", "trend", "market",
+        "경제", "증시", "지수", "장세", "나스닥", "다우", "S&P", "에스앤피",
+        "장이", "장 상황", "장 흐름", "어때",
+    ], False),
+    "recommend_word": (["추천"], False),
+    "recommend": (["추천", "종목", "살까"], False),
+}
+
+REGEXES: Dict[str, str] = {
+    "switch_no": r"설정\s*\d+\s*번",
+    "rename_object": r"(이\s*설정\s*이름|설정\s*이름|이름)\s*을",
+    # "지난달"뿐 아니라 "지난 달/저번 달/이전 달/전 달" 등도 처리
+    "last_month": r"(지난\s*달|지난달|저번\s*달|저번달|이전\s*달|이전달|전\s*달|전달)",
+    "three_month": r"(최근\s*3\s*개월|지난\s*3\s*개월|3\s*개월)",
+    "three_month_action": r"(요약|정리|리포트|조회|보여|내역)",
+}
+
+# (규칙 이름, intent, 조건)
+# 조건 = 절(clause)들의 AND, 절 = 원자들의 OR
+# 원자: "kw:그룹" / "re:정규식" / "ctx:문맥 플래그", 앞에 "!"가 붙으면 부정
+INTENT_RULES: List[Tuple[str, str, List[List[str]]]] = [
+    ("empty", "ONBOARD", [["ctx:empty"]]),
+    ("edit_settings", "EDIT_SETTINGS", [["kw:edit_settings"]]),
+    ("profile_list", "PROFILE_LIST", [["kw:profile_list"]]),
+    ("profile_switch", "PROFILE_SWITCH", [["kw:switch_anchor"], ["kw:switch_verbs"], ["re:switch_no"]]),
+    ("profile_rename", "PROFILE_RENAME", [
+        ["kw:rename_target"], ["kw:rename_verbs"], ["kw:rename_exact", "re:rename_object"],
+    ]),
+    # 예전 조건의 계획 단어 패턴은 선택(?)이라 항상 맞았음 -> "지난달" 표현만으로 판단
+    ("history_last_month", "HISTORY_LAST_MONTH", [["kw:month_anchor"], ["re:last_month"]]),
+    ("history_3m", "HISTORY_3M", [["kw:three_month_anchor"], ["re:three_month"], ["re:three_month_action"]]),
+    ("term_qa", "TERM_QA", [["kw:term_markers"], ["kw:finance_terms"]]),
+    ("term_qa_question", "TERM_QA", [["kw:question"], ["kw:finance_terms"]]),
+    ("decide_now", "DECIDE_NOW", [["kw:decide"]]),
+    ("allocate", "ALLOCATE", [["kw:allocate"]]),
+    ("onboard", "ONBOARD", [["kw:onboard"]]),
+    # "세워줘", "만들어줘" 등이 포함된 계획 관련 발화
+    ("onboard_plan", "ONBOARD", [["kw:plan"], ["kw:plan_verbs"]]),
+]
+DEFAULT_INTENT = ("default", "ALLOCATE")
+
+# node_route 전용 (INTENT_RULES보다 먼저 평가)
+TURN_RULES: List[Tuple[str, str, List[List[str]]]] = [
+    ("confirm_reset", "EDIT_CONFIRM", [["ctx:confirm_reset"]]),
+    # 인터뷰 완료 상태에서 '보여줘' 등 -> 시뮬레이션 직행
+    ("run_simulation", "RUN_SIMULATION", [["ctx:show_result"], ["kw:sim_confirm"]]),
+    # 인터뷰 진행 중 (기존 추천 확인 포함)
+    ("interview", "RECOMMEND_STOCK", [["ctx:interviewing"]]),
+    # 시장 브리핑, 추천 요청과 겹치지 않게
+    ("market_info", "MARKET_INFO", [["kw:market"], ["!kw:recommend_word"]]),
+    # "추천해줘", "어떤 종목" 등은 기본 라우팅 결과보다 우선
+    ("recommend", "RECOMMEND_STOCK", [["kw:recommend"]]),
+]
+
+
+class AhoCorasick:
+    """
+    여러 키워드를 한 번에 찾는 자동자. find()는 맞은 패턴 번호 집합을 돌려줌.
+    """
+
+    def __init__(self, patterns: Sequence[str]):
+        self.patterns = list(patterns)
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[int]] = [[]]
+        for pid, pat in enumerate(self.patterns):
+            node = 0
+            for ch in pat:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                node = nxt
+            out[node].append(pid)
+
+        # 실패 링크를 미리 펼쳐서 노드별 완전한 전이표(DFA)로 만듦 -> 문자당 dict 조회 1번
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        queue = list(goto[0].values())
+        for node in queue:
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                fail[nxt] = delta[fail[node]].get(ch, 0)
+                out[nxt].extend(out[fail[nxt]])
+            delta[node] = {**delta[fail[node]], **goto[node]}
+
+        self._delta = delta
+        self._out = [tuple(o) for o in out]
+
+    def find(self, text: str) -> set:
+        delta, out = self._delta, self._out
+        hits = set()
+        node = 0
+        for ch in text:
+            node = delta[node].get(ch, 0)
+            if out[node]:
+                hits.update(out[node])
+        return hits
+
+
+@dataclass(frozen=True)
+class RuleMatch:
+    intent: str
+    rule: str
+    hits: FrozenSet[str]  # 적중한 키워드 그룹
+
+
+class CompiledRules:
+    def __init__(self, keywords: Mapping[str, Tuple[List[str], bool]], regexes: Mapping[str, str]):
+        # 자동자는 소문자로 한 번만 훑고, 대소문자를 구분하는 영문 키워드("S&P", "market" 등)만
+        # 원문에도 그대로 있는지 재확인
+        patterns: List[str] = []
+        index: Dict[str, int] = {}
+        # 패턴 번호 -> [(그룹, 원래 키워드, 재확인 필요)]
+        self._by_pid: List[List[Tuple[str, str, bool]]] = []
+        for group, (words, ignore_case) in keywords.items():
+            for w in words:
+                key = w.lower()
+                if key not in index:
+                    index[key] = len(patterns)
+                    patterns.append(key)
+                    self._by_pid.append([])
+                self._by_pid[index[key]].append((group, w, (not ignore_case) and w.lower() != w.upper()))
+        self._automaton = AhoCorasick(patterns)
+        self._regexes = {name: re.compile(p) for name, p in regexes.items()}
+
+    def keyword_hits(self, text: str) -> FrozenSet[str]:
+        low = text.lower()
+        if len(low) != len(text):  # 소문자 변환으로 길이가 바뀌는 드문 문자
+            low = "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+        hits = set()
+        for pid in self._automaton.find(low):
+            for group, word, recheck in self._by_pid[pid]:
+                if not recheck or word in text:
+                    hits.add(group)
+        return frozenset(hits)
+
+    def regex(self, name: str, text: str) -> bool:
+        return self._regexes[name].search(text) is not None
+
+
+@dataclass(frozen=True)
+class _Rule:
+    name: str
+    intent: str
+    need_kw: FrozenSet[str]  # 단일 키워드 절 (전부 맞아야 함)
+    deny_kw: FrozenSet[str]  # 부정 키워드 절 (하나도 맞으면 안 됨)
+    need_ctx: Tuple[str, ...]
+    clauses: Tuple[Tuple[Tuple[str, str, bool], ...], ...]  # 나머지 (OR 절, 정규식)
+
+
+def _compile_rules(rules: List[Tuple[str, str, List[List[str]]]]) -> List[_Rule]:
+    compiled = []
+    for name, intent, clauses in rules:
+        need_kw, deny_kw, need_ctx, rest = set(), set(), [], []
+        for clause in clauses:
+            atoms = []
+            for atom in clause:
+                neg = atom.startswith("!")
+                kind, _, arg = atom.lstrip("!").partition(":")
+                if kind not in ("kw", "re", "ctx"):
+                    raise ValueError(f"알 수 없는 조건: {atom} ({name})")
+                if kind == "kw" and arg not in KEYWORDS:
+                    raise ValueError(f"알 수 없는 키워드 그룹: {arg} ({name})")
+                if kind == "re" and arg not in REGEXES:
+                    raise ValueError(f"알 수 없는 정규식: {arg} ({name})")
+                atoms.append((kind, arg, neg))
+            if len(atoms) == 1 and atoms[0][0] == "kw":
+                (deny_kw if atoms[0][2] else need_kw).add(atoms[0][1])
+            elif len(atoms) == 1 and atoms[0][0] == "ctx" and not atoms[0][2]:
+                need_ctx.append(atoms[0][1])
+            else:
+                rest.append(tuple(atoms))
+        # 정규식이 든 절은 키워드 절이 다 맞은 뒤에만 평가
+        rest.sort(key=lambda c: any(k == "re" for k, _, _ in c))
+        compiled.append(_Rule(name, intent, frozenset(need_kw), frozenset(deny_kw), tuple(need_ctx), tuple(rest)))
+    return compiled
+
+
+_MATCHER = CompiledRules(KEYWORDS, REGEXES)
+_INTENT_RULES = _compile_rules(INTENT_RULES)
+_TURN_RULES = _compile_rules(TURN_RULES) + _INTENT_RULES
+
+
+def _holds(atom: Tuple[str, str, bool], text: str, hits: FrozenSet[str], ctx: Mapping[str, bool], memo: Dict[str, bool]) -> bool:
+    kind, arg, neg = atom
+    if kind == "kw":
+        ok = arg in hits
+    elif kind == "ctx":
+        ok = bool(ctx.get(arg))
+    else:
+        if arg not in memo:
+            memo[arg] = _MATCHER.regex(arg, text)
+        ok = memo[arg]
+    return ok != neg
+
+
+def match_rules(text: str, ctx: Optional[Mapping[str, bool]] = None, turn: bool = False) -> RuleMatch:
+    """
+    규칙 표로 intent 결정. turn=True면 node_route 규칙(문맥 포함)부터 평가.
+    ctx: empty / confirm_reset / show_result / interviewing
+    """
+    text = text or ""
+    ctx = ctx or {}
+    hits = _MATCHER.keyword_hits(text)
+    memo: Dict[str, bool] = {}
+    for r in (_TURN_RULES if turn else _INTENT_RULES):
+        if not r.need_kw <= hits or not r.deny_kw.isdisjoint(hits):
+            continue
+        if all(ctx.get(c) for c in r.need_ctx) and all(
+            any(_holds(a, text, hits, ctx, memo) for a in clause) for clause in r.clauses
+        ):
+            return RuleMatch(r.intent, r.name, hits)
+    return RuleMatch(DEFAULT_INTENT[1], DEFAULT_INTENT[0], hits)
@@ -0,0 +1,140 @@
+from __future__ import annotations
+import inspect
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# 무거운 노드(시뮬레이션/위기 테스트/시장 브리핑)를 Streamlit 스크립트 스레드 밖에서 실행
+MAX_WORKERS = 4
+JOB_TTL_S = 30 * 60
+MAX_JOBS = 128
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="rulepilot-job")
+_LOCK = threading.Lock()
+_JOBS: Dict[str, "Job"] = {}
+# (kind, key) -> job_id : 같은 입력의 작업은 한 번만 실행
+_BY_KEY: Dict[Tuple[str, Any], str] = {}
+
+
+@dataclass
+class Job:
+    job_id: str
+    kind: str
+    key: Any = None
+    status: str = "queued"  # queued | running | done | error
+    progress: float = 0.0
+    message: str = ""
+    result: Any = None
+    error: str = ""
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    done_event: threading.Event = field(default_factory=threading.Event)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def _evict_locked(now: float) -> None:
+    old = [jid for jid, j in _JOBS.items() if j.finished_at and now - j.finished_at > JOB_TTL_S]
+    if len(_JOBS) - len(old) > MAX_JOBS:
+        finished = sorted((j.finished_at, jid) for jid, j in _JOBS.items() if j.finished_at and jid not in old)
+        old += [jid for _, jid in finished[: len(_JOBS) - len(old) - MAX_JOBS]]
+    for jid in old:
+        j = _JOBS.pop(jid, None)
+        if j is not None and _BY_KEY.get((j.kind, j.key)) == jid:
+            _BY_KEY.pop((j.kind, j.key), None)
+
+
+def _emit(job: Job, pct: float, msg: str) -> None:
+    with _LOCK:
+        job.progress = max(job.progress, min(float(pct), 1.0))
+        job.message = msg
+
+
+def _run(job: Job, fn: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+    with _LOCK:
+        job.status = "running"
+    try:
+        result = fn(*args, **kwargs)
+    except Exception as e:
+        with _LOCK:
+            job.status = "error"
+            job.error = str(e)
+            job.finished_at = time.time()
+        print(f"Job {job.kind}/{job.job_id} failed: {e}")
+    else:
+        with _LOCK:
+            job.result = result
+            job.status = "done"
+            job.progress = 1.0
+            job.finished_at = time.time()
+    finally:
+        job.done_event.set()
+
+
+def submit_job(kind: str, fn: Callable[..., Any], *args: Any, key: Any = None, **kwargs: Any) -> str:
+    """
+    fn(*args, **kwargs)를 워커 풀에서 실행하고 job_id 반환.
+    - fn이 progress 인자를 받으면 (0~1, 메시지) 콜백을 넘겨줌
+    - key가 있으면 같은 (kind, key)의 진행 중/완료 작업을 재사용 (실패한 작업은 새로 실행)
+    """
+    now = time.time()
+    with _LOCK:
+        _evict_locked(now)
+        if key is not None:
+            jid = _BY_KEY.get((kind, key))
+            if jid in _JOBS and _JOBS[jid].status != "error":
+                return jid
+
+        job = Job(job_id=uuid.uuid4().hex[:12], kind=kind, key=key)
+        _JOBS[job.job_id] = job
+        if key is not None:
+            _BY_KEY[(kind, key)] = job.job_id
+
+    if "progress" in inspect.signature(fn).parameters:
+        kwargs["progress"] = lambda pct, msg: _emit(job, pct, msg)
+    _EXECUTOR.submit(_run, job, fn, args, kwargs)
+    return job.job_id
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    with _LOCK:
+        job = _JOBS.get(job_id)
+        return job.snapshot() if job else None
+
+
+def wait_job(job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    완료(또는 timeout)까지 대기 후 스냅샷 반환
+    """
+    with _LOCK:
+        job = _JOBS.get(job_id)
+    if job is None:
+        return None
+    job.done_event.wait(timeout)
+    return get_job(job_id)
+
+
+def job_result(job_id: str) -> Any:
+    """
+    완료된 작업의 결과. 실패했으면 RuntimeError, 아직이면 None.
+    """
+    with _LOCK:
+        job = _JOBS.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if job.status == "error":
+            raise RuntimeError(job.error)
+        return job.result if job.status == "done" else None
@@ -0,0 +1,107 @@
+from __future__ import annotations
+import functools
+import hashlib
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+from agents.providers import chat_model, embeddings
+
+# 동시에 나가는 OpenAI 요청 상한 (초과분은 커넥션 풀에서 대기)
+MAX_CONCURRENCY = int(os.getenv("RULEPILOT_LLM_CONCURRENCY", "8"))
+# 풀에서 빈 커넥션을 기다리는 최대 시간(초), 응답 대기 시간(초)
+POOL_TIMEOUT_S = float(os.getenv("RULEPILOT_LLM_POOL_TIMEOUT", "30"))
+REQUEST_TIMEOUT_S = float(os.getenv("RULEPILOT_LLM_TIMEOUT", "120"))
+
+_LOCK = threading.Lock()
+_HTTP_CLIENT: Optional[httpx.Client] = None
+_CHAT: Dict[Tuple[str, float, str], ChatOpenAI] = {}
+_EMBEDDINGS: Dict[Tuple[Optional[str], str], OpenAIEmbeddings] = {}
+
+
+def _http_client() -> httpx.Client:
+    """
+    프로세스 공용 httpx 클라이언트 (keep-alive 커넥션 재사용 -> 매 호출 TLS 핸드셰이크 없음).
+    max_connections가 곧 동시 호출 상한.
+    """
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is None:
+        _HTTP_CLIENT = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=MAX_CONCURRENCY,
+                max_keepalive_connections=MAX_CONCURRENCY,
+                keepalive_expiry=60.0,
+            ),
+            timeout=httpx.Timeout(REQUEST_TIMEOUT_S, pool=POOL_TIMEOUT_S),
+        )
+    return _HTTP_CLIENT
+
+
+@functools.lru_cache(maxsize=1)
+def load_env() -> bool:
+    """
+    .env는 프로세스당 한 번만 읽음 (매 LLM/임베딩 호출마다 상위 디렉터리 탐색+파싱 방지)
+    """
+    return load_dotenv()
+
+
+def _key_tag() -> str:
+    # 사이드바에서 API 키를 바꾸면 새 클라이언트를 쓰도록 키 지문을 레지스트리 키에 포함
+    key = os.getenv("OPENAI_API_KEY", "")
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:12] if key else ""
+
+
+def get_llm(model: str = "gpt-4o-mini", temperature: float = 0.1, **kwargs: Any) -> BaseChatModel:
+    """
+    (model, temperature) 별로 채팅 모델을 한 번만 만들고 재사용.
+    RULEPILOT_PROVIDER가 fake/recorded/record면 agents.providers의 대체 모델을 돌려줌.
+    추가 kwargs가 있으면 레지스트리를 거치지 않고 ChatOpenAI를 새로 만듦 (특수 설정용).
+    """
+    load_env()
+    if kwargs:
+        return ChatOpenAI(model=model, temperature=temperature, http_client=_http_client(), **kwargs)
+    return chat_model(model, temperature)
+
+
+def get_embeddings(model: Optional[str] = None) -> Embeddings:
+    """
+    임베딩 모델 (model=None이면 라이브러리 기본 모델). 백엔드 선택은 get_llm과 동일.
+    """
+    load_env()
+    return embeddings(model)
+
+
+def openai_chat(model: str, temperature: float) -> ChatOpenAI:
+    key = (model, float(temperature), _key_tag())
+    llm = _CHAT.get(key)
+    if llm is None:
+        with _LOCK:
+            llm = _CHAT.get(key)
+            if llm is None:
+                llm = ChatOpenAI(model=model, temperature=temperature, http_client=_http_client())
+                _CHAT[key] = llm
+    return llm
+
+
+def openai_embeddings(model: Optional[str] = None) -> OpenAIEmbeddings:
+    """
+    OpenAIEmbeddings도 같은 커넥션 풀을 공유
+    """
+    key = (model, _key_tag())
+    emb = _EMBEDDINGS.get(key)
+    if emb is None:
+        with _LOCK:
+            emb = _EMBEDDINGS.get(key)
+            if emb is None:
+                opts: Dict[str, Any] = {"http_client": _http_client()}
+                if model:
+                    opts["model"] = model
+                emb = OpenAIEmbeddings(**opts)
+                _EMBEDDINGS[key] = emb
+    return emb
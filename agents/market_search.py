@@ -0,0 +1,174 @@
+from __future__ import annotations
+import asyncio
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from agents.providers import search_tool
+
+# 검색 라이브러리 호출은 동기라 전용 스레드 풀에서 돌림
+# - 마감 시간이 지나면 결과를 버리고 진행하지만 호출 자체는 끝날 때까지 워커를 잡고 있음
+#   -> 슬롯(세마포어)은 검색이 실제로 끝날 때 반납. 슬롯 수 = 워커 수라서 슬롯을 얻으면 바로 실행됨
+# - 이벤트 루프는 검색 워커와 별개인 전용 스레드 1개에서 계속 돌림
+MAX_INFLIGHT = 8
+_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_INFLIGHT, thread_name_prefix="market-search")
+_SLOTS = threading.BoundedSemaphore(MAX_INFLIGHT)
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LOOP_LOCK = threading.Lock()
+SLOT_POLL_S = 0.05
+
+PER_QUERY_TIMEOUT_S = 4.0
+DEADLINE_S = 6.0
+TOKEN_BUDGET = 1200
+
+_TICKER = re.compile(r"(?<![A-Za-z])[A-Z]{2,5}(?![A-Za-z])")
+_SENT_SPLIT = re.compile(r"(?<=[.!?。…])\s+|\s*\.\.\.\s*")
+
+
+def _search_tool():
+    # DuckDuckGo (RULEPILOT_PROVIDER=fake/recorded면 대체 검색)
+    return search_tool()
+
+
+def build_queries(user_text: str) -> Tuple[str, List[str]]:
+    """
+    사용자 질문 -> (focus, 검색어 변형 목록). 첫 번째가 대표 검색어(캐시 키).
+    - market: 한국어/영어 시장 뉴스
+    - stock: 질문 그대로 + 티커별 영문 뉴스/한글 전망
+    """
+    t = (user_text or "").strip()
+    if "시장" in t or "장" in t:
+        return "market", [
+            "최신 미국 증시 전망 및 주요 뉴스 latest US stock market news",
+            "US stock market today news",
+            "미국 증시 마감 시황",
+        ]
+
+    queries = [f"{t} 주가 전망 분석 news analysis"]
+    for ticker in dict.fromkeys(_TICKER.findall(t)):
+        queries.append(f"{ticker} stock news")
+        queries.append(f"{ticker} 주가 전망")
+    return "stock", queries[:5]
+
+
+def approx_tokens(text: str) -> int:
+    # 대략치: 영문 4글자 ≈ 1토큰, 한글 등 비ASCII는 글자당 1토큰
+    ascii_n = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_n // 4 + (len(text) - ascii_n)
+
+
+def _snippets(text: str) -> List[str]:
+    return [s.strip() for s in _SENT_SPLIT.split(text or "") if len(s.strip()) > 20]
+
+
+def merge_results(results: List[str], token_budget: int = TOKEN_BUDGET) -> str:
+    """
+    여러 검색 결과 -> 문장 단위 중복 제거 -> 검색어별로 번갈아 가며 토큰 예산까지 채움
+    """
+    seen = set()
+    per_query: List[List[str]] = []
+    for text in results:
+        uniq = []
+        for s in _snippets(text):
+            k = re.sub(r"\W+", "", s.lower())[:80]
+            if k in seen:
+                continue
+            seen.add(k)
+            uniq.append(s)
+        per_query.append(uniq)
+
+    out: List[str] = []
+    used = 0
+    i = 0
+    while any(per_query):
+        bucket = per_query[i % len(per_query)]
+        i += 1
+        if not bucket:
+            continue
+        s = bucket.pop(0)
+        cost = approx_tokens(s) + 1
+        if used + cost > token_budget:
+            # 너무 긴 문장은 건너뛰고 짧은 문장으로 남은 예산을 채움
+            continue
+        out.append(s)
+        used += cost
+    return "\n".join(f"- {s}" for s in out)
+
+
+def _loop() -> asyncio.AbstractEventLoop:
+    global _LOOP
+    if _LOOP is None:
+        with _LOOP_LOCK:
+            if _LOOP is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="market-search-loop", daemon=True).start()
+                _LOOP = loop
+    return _LOOP
+
+
+async def _acquire_slot(timeout_s: float) -> bool:
+    # 루프 스레드를 막지 않게 비차단 시도 + 짧은 대기 반복
+    end = time.monotonic() + timeout_s
+    while not _SLOTS.acquire(blocking=False):
+        if time.monotonic() >= end:
+            return False
+        await asyncio.sleep(SLOT_POLL_S)
+    return True
+
+
+async def _search_all(queries: List[str], per_query_timeout_s: float, deadline_s: float) -> List[Optional[str]]:
+    tool = _search_tool()
+
+    async def one(q: str) -> Optional[str]:
+        end = time.monotonic() + per_query_timeout_s
+        if not await _acquire_slot(per_query_timeout_s):
+            print(f"Search skipped ({q}): all {MAX_INFLIGHT} search slots busy")
+            return None
+        try:
+            fut = _EXECUTOR.submit(tool.invoke, q)
+        except Exception:
+            _SLOTS.release()
+            raise
+        # 끝나거나 (아직 시작 전에) 취소될 때 반납 -> wait_for 타임아웃으로는 반납 안 됨
+        fut.add_done_callback(lambda _: _SLOTS.release())
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(fut), max(0.0, end - time.monotonic()))
+        except Exception as e:
+            print(f"Search failed ({q}): {type(e).__name__} {e}")
+            return None
+
+    tasks = [asyncio.ensure_future(one(q)) for q in queries]
+    done, pending = await asyncio.wait(tasks, timeout=deadline_s)
+    for t in pending:
+        t.cancel()
+    return [t.result() if t in done else None for t in tasks]
+
+
+def search_market(
+    user_text: str,
+    per_query_timeout_s: float = PER_QUERY_TIMEOUT_S,
+    deadline_s: float = DEADLINE_S,
+    token_budget: int = TOKEN_BUDGET,
+) -> Dict[str, Any]:
+    """
+    검색어 변형을 동시에 검색하고(검색어별 타임아웃 + 전체 마감) 합쳐서 반환.
+    반환: {focus, query(대표), queries, text, ok(성공 수), elapsed_ms}
+    """
+    focus, queries = build_queries(user_text)
+    t0 = time.perf_counter()
+    # 호출 스레드에 이벤트 루프가 있든 없든 전용 루프 스레드에서 실행
+    results = asyncio.run_coroutine_threadsafe(
+        _search_all(queries, per_query_timeout_s, deadline_s), _loop()
+    ).result()
+
+    ok = [r for r in results if r]
+    return {
+        "focus": focus,
+        "query": queries[0],
+        "queries": queries,
+        "text": merge_results(ok, token_budget=token_budget),
+        "ok": len(ok),
+        "elapsed_ms": int((time.perf_counter() - t0) * 1000),
+    }
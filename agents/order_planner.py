@@ -1,7 +1,7 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Dict, Any
-from model.price_utils import get_latest_price_usd
+from typing import Dict, Any, List, Optional
+from model.price_utils import get_latest_price_usd, get_latest_prices_usd
 
 @dataclass
 class OrderPlan:
@@ -13,12 +13,7 @@ class OrderPlan:
     used_krw: int
     leftover_krw: int
 
-def build_order_plan(ticker: str, budget_krw: int, fx_krw_per_usd: int = 1350, allow_fractional: bool = True) -> Dict[str, Any]:
-    """
-    예산(원) -> 환율 -> USD 가격 -> 살 수 있는 주 수 계산
-    allow_fractional=True면 소수점 주식 허용(가정)
-    """
-    price = get_latest_price_usd(ticker)
+def _order_for_price(ticker: str, budget_krw: int, price: float, fx_krw_per_usd: int, allow_fractional: bool) -> Dict[str, Any]:
     budget_usd = budget_krw / fx_krw_per_usd
 
     if allow_fractional:
@@ -39,3 +34,176 @@ def build_order_plan(ticker: str, budget_krw: int, fx_krw_per_usd: int = 1350, a
         "used_krw": int(used_krw),
         "leftover_krw": int(leftover),
     }
+
+def build_order_plan(ticker: str, budget_krw: int, fx_krw_per_usd: int = 1350, allow_fractional: bool = True) -> Dict[str, Any]:
+    """
+    예산(원) -> 환율 -> USD 가격 -> 살 수 있는 주 수 계산
+    allow_fractional=True면 소수점 주식 허용(가정)
+    """
+    price = get_latest_price_usd(ticker)
+    return _order_for_price(ticker, budget_krw, price, fx_krw_per_usd, allow_fractional)
+
+def split_budget(weights: Dict[str, float], budget_krw: int) -> Dict[str, int]:
+    """
+    비중 dict -> 티커별 원화 예산 (합계가 budget_krw와 정확히 같도록 큰 나머지 순으로 1원씩 배분)
+    """
+    w = {t: max(0.0, float(v)) for t, v in weights.items()}
+    total = sum(w.values())
+    if total <= 0 or budget_krw <= 0:
+        return {t: 0 for t in w}
+
+    raw = {t: budget_krw * v / total for t, v in w.items()}
+    out = {t: int(x) for t, x in raw.items()}
+    rest = int(budget_krw) - sum(out.values())
+    for t in sorted(raw, key=lambda k: raw[k] - out[k], reverse=True)[:rest]:
+        out[t] += 1
+    return out
+
+def optimize_integer_shares(
+    targets_krw: Dict[str, float],
+    prices_krw: Dict[str, float],
+    budget_krw: Optional[float] = None,
+    dev_weight: float = 1.0,
+    radius: int = 2,
+    max_nodes: int = 50_000,
+) -> Dict[str, int]:
+    """
+    소수점 매수가 안 되는 증권사용: 티커별 정수 주 수 선택 (분기 한정법)
+    - 제약: 총 매수금액 <= budget_krw (기본: 목표 금액 합)
+    - 비용: 남는 금액 + dev_weight * Σ|매수금액 - 목표금액|
+    - 후보: 목표 주 수(내림) ± radius 안에서만 탐색, 그리디 해를 초기 상한으로 사용
+    - max_nodes를 넘으면 그때까지 찾은 최선 해 반환 (3~6개 티커는 보통 수 ms)
+    """
+    tickers = [t for t in targets_krw if prices_krw.get(t, 0) > 0]
+    if not tickers:
+        return {}
+    budget = float(budget_krw if budget_krw is not None else sum(targets_krw[t] for t in tickers))
+
+    # 비싼 티커부터 정하고, 싼 티커가 뒤에서 잔액을 메우도록
+    tickers.sort(key=lambda t: prices_krw[t], reverse=True)
+    price = [float(prices_krw[t]) for t in tickers]
+    target = [max(0.0, float(targets_krw[t])) for t in tickers]
+    n = len(tickers)
+
+    def cost(spent: float, dev: float) -> float:
+        return (budget - spent) + dev_weight * dev
+
+    # 하한용: 남은 티커 각각이 목표에 가장 가깝게 살 때의 편차 합 (예산 무시 -> 항상 실제 이하)
+    min_dev = [min(target[i] % price[i], price[i] - target[i] % price[i]) for i in range(n)]
+    suffix_dev = [0.0] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        suffix_dev[i] = suffix_dev[i + 1] + min_dev[i]
+
+    # 그리디 초기해: 내림 -> 목표 대비 가장 모자란 티커부터 1주씩 추가
+    counts = [int(target[i] // price[i]) for i in range(n)]
+    spent = sum(c * p for c, p in zip(counts, price))
+    while True:
+        gaps = [(target[i] - counts[i] * price[i], i) for i in range(n) if spent + price[i] <= budget]
+        if not gaps:
+            break
+        gap, i = max(gaps)
+        if gap <= 0 and dev_weight >= 1.0:
+            # 이미 목표 이상이면 1주 더 사도 편차 증가 >= 잔액 감소
+            break
+        counts[i] += 1
+        spent += price[i]
+    best: List[Any] = [cost(spent, sum(abs(counts[i] * price[i] - target[i]) for i in range(n))), list(counts)]
+
+    cur = [0] * n
+    nodes = 0
+
+    def dfs(i: int, spent: float, dev: float) -> None:
+        nonlocal nodes
+        if nodes >= max_nodes:
+            return
+        nodes += 1
+        if i == n:
+            c = cost(spent, dev)
+            if c < best[0] - 1e-9:
+                best[0], best[1] = c, list(cur)
+            return
+        # 남는 금액 항은 0 이상이므로 편차 하한만으로 가지치기
+        if dev_weight * (dev + suffix_dev[i]) >= best[0] - 1e-9:
+            return
+        p, t = price[i], target[i]
+        base = int(t // p)
+        hi = min(base + radius, int((budget - spent) // p))
+        lo = max(0, base - radius)
+        # 목표에 가까운 개수부터 시도
+        for c in sorted(range(lo, hi + 1), key=lambda k: abs(k * p - t)):
+            cur[i] = c
+            dfs(i + 1, spent + c * p, dev + abs(c * p - t))
+        cur[i] = 0
+
+    dfs(0, 0.0, 0.0)
+    return {t: int(c) for t, c in zip(tickers, best[1])}
+
+def plan_orders_for_budgets(
+    budgets_krw: Dict[str, int],
+    fx_krw_per_usd: int = 1350,
+    allow_fractional: bool = True,
+    prices_usd: Optional[Dict[str, float]] = None,
+) -> Dict[str, Any]:
+    """
+    티커별 원화 예산 -> 주문 계획 (시세는 한 번에 조회)
+    가격을 못 가져온 티커는 orders에서 빠지고 missing에 남으며, 그 예산은 leftover로 잡힘.
+    allow_fractional=False면 optimize_integer_shares로 바구니 단위 정수 주 수 결정
+    (티커별 used_krw가 자기 예산을 조금 넘을 수 있지만 합계는 예산 이내).
+    """
+    budgets = {str(t).upper(): int(b) for t, b in budgets_krw.items()}
+    prices = prices_usd if prices_usd is not None else get_latest_prices_usd(list(budgets))
+    prices = {str(t).upper(): float(p) for t, p in prices.items()}
+
+    orders: List[Dict[str, Any]] = []
+    missing = [t for t in budgets if not prices.get(t) or prices[t] <= 0]
+    priced = {t: b for t, b in budgets.items() if t not in missing}
+
+    if allow_fractional:
+        for t, b in priced.items():
+            orders.append(_order_for_price(t, b, prices[t], fx_krw_per_usd, True))
+    else:
+        # 티커별로 따로 내림하면 잔액이 크게 남음 -> 바구니 전체로 정수 주 수 최적화
+        shares = optimize_integer_shares(
+            {t: float(b) for t, b in priced.items()},
+            {t: prices[t] * fx_krw_per_usd for t in priced},
+        )
+        for t, b in priced.items():
+            used_krw = int(round(shares.get(t, 0) * prices[t] * fx_krw_per_usd))
+            orders.append({
+                "ticker": t,
+                "budget_krw": int(b),
+                "fx_krw_per_usd": int(fx_krw_per_usd),
+                "price_usd": float(prices[t]),
+                "shares": float(shares.get(t, 0)),
+                "used_krw": used_krw,
+                "leftover_krw": int(max(0, b - used_krw)),
+            })
+
+    budget_total = sum(budgets.values())
+    used = sum(o["used_krw"] for o in orders)
+    return {
+        "budget_krw": int(budget_total),
+        "fx_krw_per_usd": int(fx_krw_per_usd),
+        "orders": orders,
+        "used_krw": int(used),
+        "leftover_krw": int(max(0, budget_total - used)),
+        "missing": missing,
+    }
+
+def build_batch_order_plan(
+    weights: Dict[str, float],
+    budget_krw: int,
+    fx_krw_per_usd: int = 1350,
+    allow_fractional: bool = True,
+) -> Dict[str, Any]:
+    """
+    추천 포트폴리오 {티커: 비중} + 월 예산(원) -> 티커별 주 수 / 사용 금액 / 남는 금액
+    시세는 N번이 아니라 1번에 조회.
+    """
+    budgets = split_budget(weights, int(budget_krw))
+    plan = plan_orders_for_budgets(budgets, fx_krw_per_usd=fx_krw_per_usd, allow_fractional=allow_fractional)
+    total_w = sum(max(0.0, float(v)) for v in weights.values()) or 1.0
+    target = {str(t).upper(): max(0.0, float(v)) / total_w for t, v in weights.items()}
+    for o in plan["orders"]:
+        o["weight"] = target.get(o["ticker"], 0.0)
+    return plan
@@ -1,5 +1,20 @@
 from typing import Dict, Any
 
+
+def _format_backtest(bt: Dict[str, Any]) -> str:
+    """
+    run_walk_forward_backtest 결과 -> Advanced View용 요약 블록
+    """
+    st = bt["strategy"]
+    bh = bt["buy_hold"]
+    return f"""
+🧪 규칙 백테스트 ({bt['period']}, 매월 {bt['monthly_budget_krw']:,}원 적립)
+- 이 규칙({bt['equity_ticker']}/{bt['safe_ticker']}): CAGR {st['cagr']:.1%} / MDD {st['mdd']:.1%} / 연 회전율 {st['turnover']:.0%}
+- {bt['equity_ticker']} 100% 보유: CAGR {bh['cagr']:.1%} / MDD {bh['mdd']:.1%}
+- 평가금액: 규칙 {st['final_value_krw']:,.0f}원 vs 보유 {bh['final_value_krw']:,.0f}원 (원금 {bt['invested_krw']:,}원)
+- 평균 주식 비중: {bt['avg_equity_weight']:.1%} (월말 기준, 시간가중 수익률)
+""".strip()
+
 def format_allocation_output(base_output: Dict[str, Any], user_level: str) -> str:
     """
     user_level에 따라 같은 정보도 다르게 표현
@@ -11,19 +26,25 @@ def format_allocation_output(base_output: Dict[str, Any], user_level: str) -> st
     orders = base_output["orders"]
     reason_text = base_output["reason_text"]
 
-    equity = orders["equity"]
+    # 주식 주문은 바스켓 종목별 리스트 (예전 기록은 dict 1개)
+    equity = orders["equity"] if isinstance(orders["equity"], list) else [orders["equity"]]
     safe = orders["safe"]
 
     if user_level == "advanced":
+        backtest = base_output.get("backtest")
+        backtest_text = f"\n\n{_format_backtest(backtest)}" if backtest else ""
+        equity_lines = "\n".join(
+            f"- {o['ticker']} : {o['shares']:.4f}주 (${o['price_usd']:.2f})" for o in equity
+        )
         return f"""
 📊 [Advanced View] 이번 달 투자 계획
 
 💰 비중 요약
-- 주식 비중: {signal.equity_weight:.1%}
+- 주식 비중: {signal.equity_weight:.1%} ({plan.equity_bucket})
 - 안전자산 비중: {signal.safe_weight:.1%}
 
 🧮 주문 세부
-- {equity['ticker']} : {equity['shares']:.4f}주 (${equity['price_usd']:.2f})
+{equity_lines}
 - {safe['ticker']} : {safe['shares']:.4f}주 (${safe['price_usd']:.2f})
 
 📈 모델 근거
@@ -31,7 +52,7 @@ def format_allocation_output(base_output: Dict[str, Any], user_level: str) -> st
 
 ⚙️ 해석
 - 모델이 계산한 위험/추세 기반 조정 결과입니다.
-- 변동성이 높아질 경우 다음 달 비중이 자동 축소됩니다.
+- 변동성이 높아질 경우 다음 달 비중이 자동 축소됩니다.{backtest_text}
 """.strip()
 
     elif user_level == "intermediate":
@@ -39,7 +60,7 @@ def format_allocation_output(base_output: Dict[str, Any], user_level: str) -> st
 📊 이번 달 투자 가이드
 
 💰 이렇게 나눠서 사세요
-- 주식: {plan.equity_amount_krw:,}원
+- 주식: {plan.equity_amount_krw:,}원 ({plan.equity_bucket})
 - 안전자산: {plan.safe_amount_krw:,}원
 
 🤔 왜 이렇게 정했을까요?
@@ -0,0 +1,129 @@
+from __future__ import annotations
+import functools
+import re
+from typing import Any, Dict, List
+
+from agents.market_search import approx_tokens
+
+# SHOW_RESULT 후속 질문용 프롬프트
+# - 시스템 프롬프트는 매 턴 글자 하나 안 바뀌는 고정 문자열 (제공자 쪽 프롬프트 캐시가 앞부분을 재사용)
+# - 포트폴리오는 그 뒤에 티커/비중/짧은 태그만 담은 작은 컨텍스트로, 토큰 예산을 넘지 않게
+CONTEXT_TOKEN_BUDGET = 350
+TAG_MAX_CHARS = 40
+
+PORTFOLIO_QA_SYSTEM = (
+    "You are a professional portfolio manager named 'RulePilot'.\n"
+    "The user takes a look at the recommended portfolio and asks a question.\n"
+    "The current portfolio is given in the next message (symbol, weight, short tag).\n"
+    "Answer the user's question specifically regarding this portfolio.\n"
+    "If the user asks for a comparison (e.g., VHT vs SPY), provide a logical investment perspective.\n"
+    "Keep the answer concise and helpful (Korean).\n\n"
+    "!!! IRON RULES (MUST FOLLOW) !!!\n"
+    "1. The goal is NOT to make money, but NOT TO LOSE money.\n"
+    "2. Keep Rule #1.\n"
+    "Always advise caution and emphasize risk management (MDD) in your answers."
+)
+
+_CLAUSE_END = re.compile(r"[.!?。\n]|(?:,|;)\s|\s[-–—]\s")
+
+
+@functools.lru_cache(maxsize=8)
+def _encoder(model: str):
+    # tiktoken이 없거나 인코딩 파일을 못 받으면 (오프라인) 한 번만 시도하고 근사치 사용
+    try:
+        import tiktoken
+
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"tiktoken unavailable, using approximate token counts: {type(e).__name__}")
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    enc = _encoder(model)
+    if enc is None:
+        return approx_tokens(text or "")
+    return len(enc.encode(text or ""))
+
+
+def short_tag(reason: str, max_chars: int = TAG_MAX_CHARS) -> str:
+    """
+    긴 추천 이유 -> 첫 구절만 (max_chars 이내)
+    """
+    r = re.sub(r"\s+", " ", str(reason or "")).strip()
+    m = _CLAUSE_END.search(r)
+    if m and m.start() > 0:
+        r = r[: m.start()].strip()
+    if len(r) > max_chars:
+        r = r[: max_chars - 1].rstrip() + "…"
+    return r
+
+
+def _render(rationale: str, rows: List[str]) -> str:
+    head = f"Strategy: {rationale}\n" if rationale else ""
+    return head + "Holdings:\n" + "\n".join(rows)
+
+
+def compact_portfolio_context(
+    port_data: Dict[str, Any],
+    budget_tokens: int = CONTEXT_TOKEN_BUDGET,
+    model: str = "gpt-4",
+) -> str:
+    """
+    포트폴리오 dict -> 티커/비중/짧은 태그 컨텍스트 (budget_tokens 이하 보장).
+    넘치면 태그 -> 전략 설명 -> 비중 작은 종목 순으로 줄임.
+    """
+    tickers = sorted(
+        (t for t in (port_data or {}).get("tickers", []) or [] if t.get("symbol")),
+        key=lambda t: -float(t.get("weight") or 0),
+    )
+    rationale = short_tag(port_data.get("rationale", ""), max_chars=120) if port_data else ""
+
+    def rows(with_tags: bool, n: int) -> List[str]:
+        out = []
+        for t in tickers[:n]:
+            line = f"- {str(t['symbol']).upper()} {float(t.get('weight') or 0):.0%}"
+            tag = short_tag(t.get("reason", "")) if with_tags else ""
+            out.append(f"{line} | {tag}" if tag else line)
+        if n < len(tickers):
+            rest = sum(float(t.get("weight") or 0) for t in tickers[n:])
+            out.append(f"- (+{len(tickers) - n} more, {rest:.0%})")
+        return out
+
+    attempts = [(rationale, True), (rationale, False), ("", False)]
+    for rat, tags in attempts:
+        text = _render(rat, rows(tags, len(tickers)))
+        if count_tokens(text, model) <= budget_tokens:
+            return text
+    for n in range(len(tickers) - 1, 0, -1):
+        text = _render("", rows(False, n))
+        if count_tokens(text, model) <= budget_tokens:
+            return text
+    # 종목 하나도 안 들어가는 예산이면 글자 단위로 자름
+    text = _render("", rows(False, 1))
+    while text and count_tokens(text, model) > budget_tokens:
+        text = text[: max(0, len(text) - 8)]
+    return text
+
+
+def build_portfolio_qa_messages(
+    port_data: Dict[str, Any],
+    question: str,
+    budget_tokens: int = CONTEXT_TOKEN_BUDGET,
+    model: str = "gpt-4",
+) -> List[Any]:
+    """
+    [고정 시스템 프롬프트, 포트폴리오 컨텍스트, 사용자 질문]
+    """
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    context = compact_portfolio_context(port_data, budget_tokens=budget_tokens, model=model)
+    return [
+        SystemMessage(content=PORTFOLIO_QA_SYSTEM),
+        SystemMessage(content=f"Current Portfolio Context:\n{context}"),
+        HumanMessage(content=question or ""),
+    ]
+
@@ -0,0 +1,182 @@
+from __future__ import annotations
+import json
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
+
+from agents.llm_clients import get_llm
+
+# 추천 포트폴리오는 자유 텍스트(JSON 코드블록) 대신 함수 호출 스키마로 받음
+# - 형식이 깨지면 비싼 모델을 다시 부르지 않고 싼 모델로 한 번만 고침
+REPAIR_MODEL = "gpt-4o-mini"
+MAX_TICKERS = 8
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.S)
+
+
+class PortfolioSchemaError(ValueError):
+    pass
+
+
+class TickerPick(BaseModel):
+    symbol: str = Field(description="US ticker symbol, e.g. QQQ")
+    weight: float = Field(description="Portfolio weight between 0 and 1")
+    reason: str = Field(default="", description="Why this asset fits the user's goal and sector (Korean)")
+
+    @field_validator("symbol")
+    @classmethod
+    def _symbol(cls, v: str) -> str:
+        v = str(v).strip().upper().lstrip("$")
+        if not v:
+            raise ValueError("빈 티커")
+        return v
+
+    @field_validator("weight", mode="before")
+    @classmethod
+    def _weight(cls, v: Any) -> float:
+        # "40%", "0.4" 같은 문자열도 허용 (퍼센트 숫자 40은 _normalize에서 처리)
+        if isinstance(v, str):
+            s = v.strip()
+            v = float(s.rstrip("%")) / 100 if s.endswith("%") else float(s)
+        v = float(v)
+        if v < 0:
+            raise ValueError("음수 비중")
+        return v
+
+    @field_validator("reason", mode="before")
+    @classmethod
+    def _reason(cls, v: Any) -> str:
+        # LLM이 \\n 을 리터럴로 줄 때가 있음
+        return str(v or "").replace("\\n", "\n").strip()
+
+
+class PortfolioRecommendation(BaseModel):
+    """Diversified portfolio of 3-5 US ETFs or stocks. Weights must sum to 1.0."""
+
+    rationale: str = Field(description="Brief explanation of the portfolio strategy (Korean)")
+    tickers: List[TickerPick] = Field(description="3-5 assets with weights summing to 1.0")
+
+    @field_validator("rationale", mode="before")
+    @classmethod
+    def _rationale(cls, v: Any) -> str:
+        return str(v or "").replace("\\n", "\n").strip()
+
+    @model_validator(mode="after")
+    def _normalize(self) -> "PortfolioRecommendation":
+        # 같은 티커는 합치고, 비중 0은 빼고, 합이 1이 되도록 정규화
+        merged: Dict[str, TickerPick] = {}
+        for t in self.tickers:
+            if t.symbol in merged:
+                prev = merged[t.symbol]
+                merged[t.symbol] = TickerPick(
+                    symbol=t.symbol, weight=prev.weight + t.weight, reason=prev.reason or t.reason
+                )
+            else:
+                merged[t.symbol] = t
+        picks = [t for t in merged.values() if t.weight > 0] or list(merged.values())
+        if not picks:
+            raise ValueError("추천 종목이 없음")
+        picks = sorted(picks, key=lambda t: -t.weight)[:MAX_TICKERS]
+
+        raw = [t.weight for t in picks]
+        if max(raw) > 1.0:
+            # 퍼센트(40, 30)로 준 값 -> 비율로 ("30%"처럼 이미 비율인 값과 섞여 있어도 맞춰짐)
+            raw = [w / 100 if w > 1.0 else w for w in raw]
+        total = sum(raw)
+        if total <= 0:
+            weights = [1.0 / len(picks)] * len(picks)
+        else:
+            weights = [w / total for w in raw]
+        weights = [round(w, 4) for w in weights]
+        weights[0] = round(weights[0] + (1.0 - sum(weights)), 4)  # 반올림 오차는 최대 비중 종목에
+        self.tickers = [t.model_copy(update={"weight": w}) for t, w in zip(picks, weights)]
+        return self
+
+    def to_state(self) -> Dict[str, Any]:
+        # state["recommended_portfolio"] / DB 저장 형식 (기존과 동일한 dict)
+        return self.model_dump()
+
+
+def parse_portfolio_text(content: str) -> PortfolioRecommendation:
+    """
+    자유 텍스트 응답에서 JSON을 찾아 검증 (코드블록/앞뒤 설명 허용)
+    """
+    text = (content or "").strip()
+    m = _FENCE.search(text)
+    if m:
+        text = m.group(1).strip()
+    if not text.startswith("{"):
+        start, end = text.find("{"), text.rfind("}")
+        if start < 0 or end <= start:
+            raise PortfolioSchemaError("응답에 JSON 객체가 없음")
+        text = text[start : end + 1]
+    try:
+        return PortfolioRecommendation.model_validate(json.loads(text))
+    except (json.JSONDecodeError, ValidationError) as e:
+        raise PortfolioSchemaError(str(e)) from e
+
+
+def _raw_text(raw: Any) -> str:
+    # 함수 호출 응답이면 인자 문자열, 아니면 본문
+    if raw is None:
+        return ""
+    for tc in (getattr(raw, "additional_kwargs", {}) or {}).get("tool_calls", []) or []:
+        args = (tc.get("function") or {}).get("arguments")
+        if args:
+            return args
+    for tc in getattr(raw, "tool_calls", []) or []:
+        if tc.get("args"):
+            return json.dumps(tc["args"], ensure_ascii=False)
+    for tc in getattr(raw, "invalid_tool_calls", []) or []:  # JSON이 깨진 함수 호출
+        if tc.get("args"):
+            return tc["args"]
+    content = getattr(raw, "content", "")
+    return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+
+
+def repair_portfolio(raw_text: str, error: str, llm: Optional[Any] = None) -> PortfolioRecommendation:
+    """
+    깨진 응답을 싼 모델로 한 번만 스키마에 맞게 고침 (내용은 바꾸지 않게 지시)
+    """
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    llm = llm or get_llm(REPAIR_MODEL, temperature=0.0)
+    fixer = llm.with_structured_output(PortfolioRecommendation, method="function_calling")
+    out = fixer.invoke([
+        SystemMessage(content=(
+            "You fix malformed portfolio outputs. Keep the same assets, weights, rationale and reasons; "
+            "only repair the structure so it matches the schema. Do not invent new assets unless none are given."
+        )),
+        HumanMessage(content=f"Validation error: {error}\n\nMalformed output:\n{raw_text[:4000]}"),
+    ])
+    if out is None:
+        raise PortfolioSchemaError("복구 실패: 빈 응답")
+    return out if isinstance(out, PortfolioRecommendation) else PortfolioRecommendation.model_validate(out)
+
+
+def generate_portfolio(llm: Any, messages: Sequence[Any], repair_llm: Optional[Any] = None) -> PortfolioRecommendation:
+    """
+    스키마 강제 생성 -> (실패 시) 로컬 파싱 -> 싼 모델 복구 1회. 그래도 안 되면 PortfolioSchemaError.
+    """
+    structured = llm.with_structured_output(PortfolioRecommendation, method="function_calling", include_raw=True)
+    res = structured.invoke(list(messages))
+    parsed = res.get("parsed") if isinstance(res, dict) else res
+    if isinstance(parsed, PortfolioRecommendation):
+        return parsed
+
+    raw_text = _raw_text(res.get("raw") if isinstance(res, dict) else None)
+    error = str((res.get("parsing_error") if isinstance(res, dict) else None) or "스키마 불일치")
+    try:
+        return parse_portfolio_text(raw_text)
+    except PortfolioSchemaError as e:
+        error = f"{error} / {e}"
+
+    if not raw_text.strip():
+        raise PortfolioSchemaError(f"빈 응답: {error}")
+    try:
+        return repair_portfolio(raw_text, error, llm=repair_llm)
+    except PortfolioSchemaError:
+        raise
+    except Exception as e:
+        raise PortfolioSchemaError(f"복구 실패: {e}") from e
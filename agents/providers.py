@@ -0,0 +1,398 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# LLM / 임베딩 / 웹 검색 백엔드 선택 (벤치마크를 오프라인에서 재현 가능하게)
+# RULEPILOT_PROVIDER
+#   - openai   : 실제 OpenAI + DuckDuckGo (기본)
+#   - fake     : 결정적 가짜 응답 (같은 입력 -> 같은 출력), 네트워크 없음
+#   - recorded : 녹화 파일에서 재생, 없는 입력은 fake로 대체
+#   - record   : 실제 서비스를 호출하고 응답을 녹화 파일에 추가
+# RULEPILOT_PROVIDER_LATENCY_MS : "300" (전부) 또는 "chat=800,embed=20,search=400"
+#   (fake는 기본 0, recorded는 기본으로 녹화 당시 걸린 시간)
+# RULEPILOT_RECORDINGS : 녹화 파일 (JSONL)
+PROVIDERS = ("openai", "fake", "recorded", "record")
+FAKE_EMBED_DIM = 1536  # data/vector_store 인덱스(OpenAI 임베딩)와 같은 차원
+DEFAULT_RECORDINGS = Path(__file__).resolve().parents[1] / "data" / "provider_recordings.jsonl"
+
+_FAKE_TICKERS = ["SPY", "QQQ", "SCHD", "VIG", "GLD", "VTI", "SOXX", "XLV", "BND", "IEF"]
+
+_LOCK = threading.Lock()
+_MODELS: Dict[tuple, Any] = {}
+
+
+def provider_name() -> str:
+    name = os.getenv("RULEPILOT_PROVIDER", "openai").strip().lower() or "openai"
+    if name not in PROVIDERS:
+        raise ValueError(f"알 수 없는 RULEPILOT_PROVIDER: {name} (가능: {', '.join(PROVIDERS)})")
+    return name
+
+
+def latency_s(kind: str) -> Optional[float]:
+    """
+    kind(chat/embed/search)별 인위적 지연(초). 설정이 없으면 None.
+    """
+    raw = os.getenv("RULEPILOT_PROVIDER_LATENCY_MS", "").strip()
+    if not raw:
+        return None
+    if "=" not in raw:
+        return float(raw) / 1000
+    for part in raw.split(","):
+        k, _, v = part.partition("=")
+        if k.strip() == kind and v.strip():
+            return float(v) / 1000
+    return None
+
+
+def _sleep(kind: str, default_s: float = 0.0) -> None:
+    s = latency_s(kind)
+    s = default_s if s is None else s
+    if s > 0:
+        time.sleep(s)
+
+
+def _digest(payload: Any) -> str:
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _registry(key: tuple, make):
+    obj = _MODELS.get(key)
+    if obj is None:
+        with _LOCK:
+            obj = _MODELS.get(key)
+            if obj is None:
+                obj = make()
+                _MODELS[key] = obj
+    return obj
+
+
+# -------------------------
+# 녹화 파일
+# -------------------------
+class Recordings:
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: Optional[Dict[str, Dict[str, Any]]] = None
+        self.misses = 0
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    data: Dict[str, Dict[str, Any]] = {}
+                    if self.path.exists():
+                        with open(self.path, encoding="utf-8") as f:
+                            for line in f:
+                                if line.strip():
+                                    rec = json.loads(line)
+                                    data[rec["key"]] = rec
+                    self._data = data
+        return self._data
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        rec = self._load().get(key)
+        if rec is None:
+            self.misses += 1
+        return rec
+
+    def put(self, key: str, rec: Dict[str, Any]) -> None:
+        rec = {"key": key, **rec}
+        data = self._load()
+        with self._lock:
+            data[key] = rec
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+
+def recordings() -> Recordings:
+    path = Path(os.getenv("RULEPILOT_RECORDINGS", str(DEFAULT_RECORDINGS)))
+    return _registry(("recordings", str(path)), lambda: Recordings(path))
+
+
+# -------------------------
+# 채팅
+# -------------------------
+def _fake_value(schema: Dict[str, Any], rng: random.Random, key: str, root: Dict[str, Any]) -> Any:
+    if "$ref" in schema:
+        name = schema["$ref"].split("/")[-1]
+        schema = (root.get("$defs") or root.get("definitions") or {}).get(name, {})
+    if "anyOf" in schema:
+        schema = next((s for s in schema["anyOf"] if s.get("type") != "null"), schema["anyOf"][0])
+    t = schema.get("type")
+    if t == "object" or "properties" in schema:
+        return {k: _fake_value(v, rng, k, root) for k, v in (schema.get("properties") or {}).items()}
+    if t == "array":
+        item = schema.get("items", {})
+        if key == "tickers":
+            picks = rng.sample(_FAKE_TICKERS, 4)
+            return [{**_fake_value(item, rng, "ticker", root), "symbol": s} for s in picks]
+        return [_fake_value(item, rng, key, root) for _ in range(3)]
+    if t == "number":
+        return round(rng.uniform(0.1, 0.5), 2)
+    if t == "integer":
+        return rng.randint(1, 10)
+    if t == "boolean":
+        return True
+    if key == "symbol":
+        return rng.choice(_FAKE_TICKERS)
+    return f"(테스트 응답) {key} {rng.randint(100, 999)}"
+
+
+def _message_payload(messages: List[BaseMessage]) -> List[List[str]]:
+    return [[m.type, m.content if isinstance(m.content, str) else json.dumps(m.content, ensure_ascii=False)] for m in messages]
+
+
+class _ToolBindingMixin:
+    def bind_tools(self, tools, tool_choice: Any = None, **kwargs: Any):
+        kwargs.pop("ls_structured_output_format", None)
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], tool_choice=tool_choice, **kwargs)
+
+    def with_structured_output(self, schema, *, include_raw: bool = False, method: str = "function_calling", **kwargs: Any):
+        # OpenAI와 같은 호출 형태를 받되 (method 등) 항상 함수 호출 방식으로 처리
+        return BaseChatModel.with_structured_output(self, schema, include_raw=include_raw)
+
+
+class FakeChatModel(_ToolBindingMixin, BaseChatModel):
+    """
+    결정적 가짜 채팅 모델: 메시지 해시로 시드를 정해 텍스트 또는 함수 호출 인자를 만듦
+    """
+
+    model_name: str = "fake"
+
+    @property
+    def _llm_type(self) -> str:
+        return "rulepilot-fake"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        _sleep("chat")
+        return ChatResult(generations=[ChatGeneration(message=fake_reply(self.model_name, messages, **kwargs))])
+
+
+def fake_reply(model: str, messages: List[BaseMessage], tools: Optional[List[Dict[str, Any]]] = None, tool_choice: Any = None, **_: Any) -> AIMessage:
+    seed = _digest([model, _message_payload(messages), [t["function"]["name"] for t in tools or []]])
+    rng = random.Random(seed)
+
+    if tools:
+        wanted = tool_choice.get("function", {}).get("name") if isinstance(tool_choice, dict) else None
+        tool = next((t for t in tools if t["function"]["name"] == wanted), tools[0])["function"]
+        params = tool.get("parameters", {})
+        args = _fake_value(params, rng, tool["name"], params)
+        return AIMessage(content="", tool_calls=[{"name": tool["name"], "args": args, "id": f"call_{seed[:12]}"}])
+
+    last = next((m for m in reversed(messages) if m.type == "human"), messages[-1] if messages else None)
+    q = re.sub(r"\s+", " ", str(getattr(last, "content", "")))[:60]
+    return AIMessage(content=(
+        f"[{model} 테스트 응답 #{seed[:6]}]\n"
+        f"질문: {q}\n"
+        f"- 요점 {rng.randint(1, 9)}: 분산 투자와 손실 관리를 우선하세요.\n"
+        f"- 요점 {rng.randint(1, 9)}: 한 번에 사기보다 나눠서 사는 편이 안전해요."
+    ))
+
+
+class RecordedChatModel(_ToolBindingMixin, BaseChatModel):
+    """
+    녹화된 응답 재생 (record=True면 실제 모델을 호출하고 녹화)
+    """
+
+    model_name: str = "gpt-4o-mini"
+    temperature: float = 0.1
+    record: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "rulepilot-recorded"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        tools = kwargs.get("tools")
+        key = _digest({
+            "kind": "chat",
+            "model": self.model_name,
+            "temperature": self.temperature,
+            "messages": _message_payload(messages),
+            "tools": [t["function"]["name"] for t in tools or []],
+        })
+        store = recordings()
+        rec = store.get(key)
+        if rec is not None:
+            _sleep("chat", rec.get("elapsed_ms", 0) / 1000)
+            msg = messages_from_dict([rec["message"]])[0]
+        elif self.record:
+            from agents.llm_clients import openai_chat
+
+            inner = openai_chat(self.model_name, self.temperature)
+            if tools:
+                inner = inner.bind_tools(tools, tool_choice=kwargs.get("tool_choice"))
+            t0 = time.perf_counter()
+            msg = inner.invoke(messages, stop=stop)
+            store.put(key, {
+                "kind": "chat",
+                "model": self.model_name,
+                "message": message_to_dict(msg),
+                "elapsed_ms": int((time.perf_counter() - t0) * 1000),
+            })
+        else:
+            _sleep("chat")
+            msg = fake_reply(self.model_name, messages, **kwargs)
+        return ChatResult(generations=[ChatGeneration(message=msg)])
+
+
+def chat_model(model: str, temperature: float) -> BaseChatModel:
+    name = provider_name()
+    if name == "fake":
+        return _registry(("chat", name, model), lambda: FakeChatModel(model_name=model))
+    if name in ("recorded", "record"):
+        return _registry(
+            ("chat", name, model, float(temperature)),
+            lambda: RecordedChatModel(model_name=model, temperature=float(temperature), record=(name == "record")),
+        )
+    from agents.llm_clients import openai_chat
+
+    return openai_chat(model, temperature)
+
+
+# -------------------------
+# 임베딩
+# -------------------------
+def fake_vector(text: str, dim: int = FAKE_EMBED_DIM) -> List[float]:
+    """
+    글자 3-gram 해싱 벡터 (비슷한 문장 -> 비슷한 벡터, 단위 길이)
+    """
+    t = re.sub(r"\s+", " ", (text or "").lower()).strip()
+    v = np.zeros(dim, dtype=np.float32)
+    grams = [t[i : i + 3] for i in range(max(1, len(t) - 2))]
+    for g in grams:
+        h = hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest()
+        idx = int.from_bytes(h[:4], "little") % dim
+        v[idx] += 1.0 if h[4] & 1 else -1.0
+    n = float(np.linalg.norm(v))
+    return (v / n if n else v).tolist()
+
+
+class FakeEmbeddings(Embeddings):
+    def __init__(self, dim: int = FAKE_EMBED_DIM):
+        self.dim = dim
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        _sleep("embed")
+        return [fake_vector(t, self.dim) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class RecordedEmbeddings(Embeddings):
+    def __init__(self, model: Optional[str], record: bool = False):
+        self.model = model
+        self.record = record
+
+    def _key(self, text: str) -> str:
+        return _digest({"kind": "embed", "model": self.model, "text": text})
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        store = recordings()
+        out: List[Optional[List[float]]] = []
+        missing: List[int] = []
+        for i, t in enumerate(texts):
+            rec = store.get(self._key(t))
+            out.append(rec["vector"] if rec else None)
+            if rec is None:
+                missing.append(i)
+
+        if missing and self.record:
+            from agents.llm_clients import openai_embeddings
+
+            vecs = openai_embeddings(self.model).embed_documents([texts[i] for i in missing])
+            for i, v in zip(missing, vecs):
+                store.put(self._key(texts[i]), {"kind": "embed", "model": self.model, "vector": list(v)})
+                out[i] = list(v)
+        elif missing:
+            for i in missing:
+                out[i] = fake_vector(texts[i])
+        _sleep("embed")
+        return out  # type: ignore[return-value]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def embeddings(model: Optional[str] = None) -> Embeddings:
+    name = provider_name()
+    if name == "fake":
+        return _registry(("embed", name), FakeEmbeddings)
+    if name in ("recorded", "record"):
+        return _registry(("embed", name, model), lambda: RecordedEmbeddings(model, record=(name == "record")))
+    from agents.llm_clients import openai_embeddings
+
+    return openai_embeddings(model)
+
+
+# -------------------------
+# 웹 검색
+# -------------------------
+class FakeSearch:
+    def invoke(self, query: str) -> str:
+        _sleep("search")
+        rng = random.Random(_digest(["search", query]))
+        topics = ["금리", "실적 발표", "고용 지표", "반도체 수요", "유가", "환율"]
+        return " ".join(
+            f"(테스트 기사 {i + 1}) {query[:30]} 관련: {rng.choice(topics)} 영향으로 "
+            f"지수가 {rng.uniform(-2, 2):+.1f}% 움직였습니다."
+            for i in range(4)
+        )
+
+
+class RecordedSearch:
+    def __init__(self, record: bool = False):
+        self.record = record
+
+    def invoke(self, query: str) -> str:
+        key = _digest({"kind": "search", "query": query})
+        store = recordings()
+        rec = store.get(key)
+        if rec is not None:
+            _sleep("search", rec.get("elapsed_ms", 0) / 1000)
+            return rec["text"]
+        if self.record:
+            t0 = time.perf_counter()
+            text = _ddg().invoke(query)
+            store.put(key, {"kind": "search", "text": text, "elapsed_ms": int((time.perf_counter() - t0) * 1000)})
+            return text
+        return FakeSearch().invoke(query)
+
+
+def _ddg():
+    def make():
+        from langchain_community.tools import DuckDuckGoSearchRun
+
+        return DuckDuckGoSearchRun()
+
+    return _registry(("search", "ddg"), make)
+
+
+def search_tool():
+    """
+    invoke(query) -> 결과 텍스트 를 가진 검색 도구
+    """
+    name = provider_name()
+    if name == "fake":
+        return _registry(("search", name), FakeSearch)
+    if name in ("recorded", "record"):
+        return _registry(("search", name), lambda: RecordedSearch(record=(name == "record")))
+    return _ddg()
@@ -0,0 +1,100 @@
+from __future__ import annotations
+import hashlib
+import re
+import time
+from typing import Callable, Optional
+
+from data.db import get_llm_cache, purge_llm_cache, put_llm_cache
+
+# intent별 캐시 유지 시간(초)
+# - 용어 설명은 내용이 거의 안 바뀜 -> 길게
+# - 시장 브리핑은 뉴스 기반 -> 몇 분만
+TTL_BY_INTENT = {
+    "TERM_QA": 30 * 24 * 3600,
+    "MARKET_INFO": 10 * 60,
+}
+DEFAULT_TTL = 60 * 60
+
+# "ETF가 뭐야?" / "etf 뭐야" / "ETF란?" 을 같은 키로 묶기 위한 질문 꼬리/조사
+_QUESTION_TAIL = re.compile(
+    r"(?:\s*(?:에\s*대해(?:서)?|에\s*대한))?\s*"
+    r"(?:뭐야|뭐예요|뭐에요|뭔가요|뭐지|뭘까|뭐임|무엇인가요|무엇이야|이란|란|"
+    r"(?:좀\s*)?(?:알려|설명해)\s*(?:줘|주세요|줄래)|의미|뜻)$"
+)
+_PARTICLE_TAIL = re.compile(r"(?:이|가|은|는|의)$")
+MIN_STEM_CHARS = 2
+_PUNCT = re.compile(r"[?？!！.,~…\"'`]+")
+
+
+def normalize_question(text: str) -> str:
+    """
+    캐시 키용 질문 정규화: 소문자, 문장부호/공백 정리, 흔한 질문 꼬리("가 뭐야", "란", "알려줘") 제거
+    """
+    t = _PUNCT.sub(" ", (text or "").lower())
+    t = re.sub(r"\s+", " ", t).strip()
+    for _ in range(3):
+        m = _QUESTION_TAIL.search(t)
+        if not m or m.start() == 0:
+            break
+        t = t[: m.start()].rstrip()
+        # 질문 꼬리를 뗀 경우에만, 남는 말이 2글자 이상일 때만 조사 제거
+        # ("주가 뭐야"가 "주"가 되어 다른 용어 "주"의 답을 받지 않도록)
+        stem = _PARTICLE_TAIL.sub("", t).rstrip()
+        if len(stem) >= MIN_STEM_CHARS:
+            t = stem
+    return t
+
+
+def _key(intent: str, kind: str, text: str) -> str:
+    return hashlib.sha256(f"{intent}|{kind}|{text}".encode("utf-8")).hexdigest()
+
+
+def get_cached(intent: str, text: str) -> Optional[str]:
+    """
+    정확히 같은 질문 -> 정규화된 질문 순서로 조회. 없거나 만료면 None.
+    """
+    exact = (text or "").strip()
+    norm = normalize_question(exact)
+    keys = [_key(intent, "exact", exact)]
+    if norm:
+        keys.append(_key(intent, "norm", norm))
+    try:
+        row = get_llm_cache(keys, time.time())
+    except Exception as e:
+        print(f"LLM cache read failed: {e}")
+        return None
+    return row["response"] if row else None
+
+
+def put_cached(intent: str, text: str, response: str, ttl_s: Optional[int] = None) -> None:
+    exact = (text or "").strip()
+    norm = normalize_question(exact)
+    now = time.time()
+    ttl = ttl_s if ttl_s is not None else TTL_BY_INTENT.get(intent, DEFAULT_TTL)
+    rows = [{"kind": "exact", "cache_key": _key(intent, "exact", exact)}]
+    if norm:
+        rows.append({"kind": "norm", "cache_key": _key(intent, "norm", norm)})
+    for r in rows:
+        r.update(intent=intent, response=response, created_at=now, expires_at=now + ttl)
+    try:
+        put_llm_cache(rows)
+    except Exception as e:
+        print(f"LLM cache write failed: {e}")
+
+
+def cached_response(intent: str, text: str, produce: Callable[[], str], ttl_s: Optional[int] = None) -> str:
+    """
+    캐시에 있으면 바로 반환, 없으면 produce()로 만들고 저장.
+    produce()에서 예외가 나면 저장하지 않고 그대로 올림.
+    """
+    hit = get_cached(intent, text)
+    if hit is not None:
+        return hit
+    out = produce()
+    if out:
+        put_cached(intent, text, out, ttl_s=ttl_s)
+    return out
+
+
+def purge_expired() -> int:
+    return purge_llm_cache(time.time())
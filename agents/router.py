@@ -1,82 +1,105 @@
 # agents/router.py
 from __future__ import annotations
-import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional
+
+from agents.intent_rules import RuleMatch, match_rules
+
+# 규칙 자체(키워드/정규식/우선순위)는 agents/intent_rules.py의 표에서 관리
+
+INTERVIEW_STEPS = ("ASK_GOAL", "ASK_RISK", "ASK_SECTOR", "CHECK_EXISTING", "SHOW_RESULT", "ASK_SAVE")
 
 
 def route_intent(user_text: str) -> str:
-    t = (user_text or "").strip()
+    return explain_intent(user_text).intent
+
 
-    if t == "":
-        return "ONBOARD"
-
-    # -------------------------
-    # 1) 설정/프로필 관리
-    # -------------------------
-    if any(k in t for k in ["설정 바꿔", "설정 바꾸자", "설정 변경", "설정 수정", "프로필 바꿔", "프로필 변경"]):
-        return "EDIT_SETTINGS"
-
-    if any(k in t for k in ["내 설정 목록", "설정 목록", "프로필 목록", "내 설정 보여줘", "설정 리스트"]):
-        return "PROFILE_LIST"
-
-    if re.search(r"설정\s*\d+\s*번", t) and any(k in t for k in ["바꿔", "전환", "선택", "사용"]):
-        return "PROFILE_SWITCH"
-
-    if (("이 설정" in t) or ("설정 이름" in t) or ("이름을" in t)) and any(k in t for k in ["바꿔", "변경", "rename"]):
-        if re.search(r"(이\s*설정\s*이름|설정\s*이름|이름)\s*을", t) or ("이 설정 이름" in t):
-            return "PROFILE_RENAME"
-
-    # -------------------------
-    # 2) 과거 기록 조회 (강화)
-    # -------------------------
-    # "지난달"뿐 아니라 "지난 달/저번 달/이전 달/전 달" 등도 처리
-    last_month_pat = r"(지난\s*달|지난달|저번\s*달|저번달|이전\s*달|이전달|전\s*달|전달)"
-    # 사용자가 history를 요청할 때 자주 쓰는 동사/명사도 포함
-    history_action = r"(보여|조회|확인|요약|정리|기록|내역)"
-    plan_words = r"(계획|투자|비중|주문|리포트|가이드)?"
-
-    if re.search(last_month_pat, t) and (re.search(history_action, t) or re.search(plan_words, t)):
-        return "HISTORY_LAST_MONTH"
-
-    # 3개월 요약도 "보여줘/조회"만 있어도 잡히게
-    three_month_pat = r"(최근\s*3\s*개월|지난\s*3\s*개월|3\s*개월)"
-    if re.search(three_month_pat, t) and re.search(r"(요약|정리|리포트|조회|보여|내역)", t):
-        return "HISTORY_3M"
-
-    # -------------------------
-    # 3) 용어 설명(TERM_QA)
-    # -------------------------
-    term_markers = ["뭐야", "뜻", "의미", "설명", "용어", "란"]
-    finance_terms = ["etf", "per", "pbr", "배당", "분산", "리밸런싱", "지수", "s&p", "나스닥", "qqq", "tqqq"]
-    if any(m in t for m in term_markers) and any(ft.lower() in t.lower() or ft in t for ft in finance_terms):
-        return "TERM_QA"
-
-    if "?" in t and any(ft.lower() in t.lower() or ft in t for ft in finance_terms):
-        return "TERM_QA"
-
-    # -------------------------
-    # 4) 지금 사도 되나? (DECIDE_NOW)
-    # -------------------------
-    decide_markers = ["지금 사", "지금 사도", "지금 매수", "추가로 사", "더 사", "급락", "급등", "불안", "무서", "조급"]
-    if any(m in t for m in decide_markers):
-        return "DECIDE_NOW"
-
-    # -------------------------
-    # 5) 이번 달 계획/얼마씩 사? (ALLOCATE)
-    # -------------------------
-    allocate_markers = ["얼마씩", "얼마 사", "비중", "포트폴리오", "이번 달", "투자 계획", "가이드", "분배"]
-    if any(m in t for m in allocate_markers):
-        return "ALLOCATE"
-
-    # -------------------------
-    # 6) 온보딩 (계획 수립/시작)
-    # -------------------------
-    # "세워줘", "만들어줘" 등이 포함된 계획 관련 발화는 ONBOARD로 처리
-    onboard_markers = ["시작", "온보딩", "프로필", "설정 등록", "처음", "가입"]
-    
-    if any(m in t for m in onboard_markers):
-        return "ONBOARD"
-        
-    if "계획" in t and any(v in t for v in ["세워", "수립", "만들", "짜"]):
-        return "ONBOARD"
-
-    return "ALLOCATE"
+def explain_intent(user_text: str) -> RuleMatch:
+    """
+    route_intent와 같은 판단 + 어떤 규칙/키워드 그룹이 맞았는지
+    """
+    t = (user_text or "").strip()
+    return match_rules(t, {"empty": t == ""})
+
+
+def route_turn(user_text: str, interview_step: Optional[str] = None, pending_confirm_reset: bool = False) -> RuleMatch:
+    """
+    node_route용: 초기화 확인 / 인터뷰 진행 / 시장 브리핑 / 추천 요청을 먼저 보고 나머지는 route_intent 규칙
+    """
+    text = user_text or ""
+    ctx = {
+        "empty": text.strip() == "",
+        "confirm_reset": bool(pending_confirm_reset),
+        "show_result": interview_step == "SHOW_RESULT",
+        "interviewing": interview_step in INTERVIEW_STEPS,
+    }
+    return match_rules(text, ctx, turn=True)
+
+
+# -------------------------
+# 배치 라우팅 (로그/코퍼스 평가용)
+# -------------------------
+def route_record(rec: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    발화 1건 -> 원래 필드 + node_route/route_intent 결과, 맞은 규칙/키워드 그룹, 소요 시간(µs)
+    rec: {"text"(또는 "user_text"), "interview_step"?, "pending_confirm_reset"?, ...}
+    """
+    text = rec.get("text", rec.get("user_text")) or ""
+    t0 = time.perf_counter()
+    turn = route_turn(text, rec.get("interview_step"), bool(rec.get("pending_confirm_reset")))
+    base = explain_intent(text)
+    elapsed_us = (time.perf_counter() - t0) * 1e6
+    return {
+        **rec,
+        "intent": turn.intent,
+        "rule": turn.rule,
+        "base_intent": base.intent,
+        "base_rule": base.rule,
+        "hits": sorted(turn.hits),
+        "elapsed_us": round(elapsed_us, 2),
+    }
+
+
+def _route_chunk(chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [route_record(r) for r in chunk]
+
+
+def _chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    buf: List[Any] = []
+    for r in items:
+        buf.append(r)
+        if len(buf) >= size:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
+
+
+def map_chunks(fn: Callable[..., List[Any]], items: Iterable[Any], workers: int = 1, chunk_size: int = 512, *args: Any) -> Iterator[Any]:
+    """
+    items를 chunk_size씩 묶어 fn(묶음, *args)에 넘기고 결과를 입력 순서 그대로 흘려보냄 (입력 전체를 메모리에 올리지 않음).
+    workers > 1이면 프로세스 풀에서 처리 (라우팅은 CPU 작업이라 스레드로는 안 빨라짐),
+    동시에 떠 있는 묶음은 workers * 2개까지. fn은 모듈 최상위 함수여야 함 (pickle).
+    """
+    if workers <= 1:
+        for chunk in _chunks(items, chunk_size):
+            yield from fn(chunk, *args)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        pending: Deque = deque()
+        for chunk in _chunks(items, chunk_size):
+            pending.append(ex.submit(fn, chunk, *args))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def route_batch(records: Iterable[Dict[str, Any]], workers: int = 1, chunk_size: int = 512) -> Iterator[Dict[str, Any]]:
+    """
+    여러 발화를 route_record로 분류 (입력 순서 유지, 스트리밍)
+    """
+    return map_chunks(_route_chunk, records, workers, chunk_size)
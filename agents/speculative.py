@@ -0,0 +1,53 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from agents.jobs import submit_job
+from model.monthly_model import simulate_portfolio_history, backtest_crisis_scenarios
+
+# 추천 포트폴리오를 보여준 직후 "시뮬레이션 보여줘"가 거의 항상 오므로 미리 돌려둠
+# (실행/중복 제거/결과 보관은 jobs 워커 풀이 담당, 같은 포트폴리오+기간 = 같은 작업)
+
+
+def _key(portfolio: Dict[str, float], months: int) -> Tuple:
+    return (tuple(sorted((str(t).upper(), round(float(w), 6)) for t, w in portfolio.items())), int(months))
+
+
+def compute_simulation(
+    portfolio: Dict[str, float],
+    months: int = 120,
+    progress: Optional[Callable[[float, str], None]] = None,
+) -> Dict[str, Any]:
+    """
+    과거 + 미래(몬테카를로) 시뮬레이션 + 위기 구간 스트레스 테스트
+    progress: 전체 기준 (0~1, 메시지) — 시뮬레이션 0~0.8, 위기 테스트 0.8~1.0
+    """
+    def scaled(lo: float, hi: float):
+        if progress is None:
+            return None
+        return lambda pct, msg: progress(lo + (hi - lo) * pct, msg)
+
+    sim_result = simulate_portfolio_history(portfolio, months=months, progress=scaled(0.0, 0.8))
+    if "error" in sim_result:
+        return sim_result
+    try:
+        sim_result["crisis_test"] = backtest_crisis_scenarios(portfolio, progress=scaled(0.8, 1.0))
+    except Exception as e:
+        print(f"Crisis test failed: {e}")
+        sim_result["crisis_test"] = []
+    return sim_result
+
+
+def simulation_job(portfolio: Dict[str, float], months: int = 120) -> str:
+    """
+    시뮬레이션 작업 id (같은 포트폴리오/기간이 진행 중이거나 끝났으면 그 작업 재사용)
+    """
+    return submit_job("simulation", compute_simulation, dict(portfolio), int(months), key=_key(portfolio, months))
+
+
+def prefetch_simulation(portfolio: Dict[str, float], months: int = 120) -> None:
+    """
+    백그라운드에서 시뮬레이션 시작 (결과는 같은 인자의 simulation_job 작업 id로 회수)
+    """
+    if portfolio:
+        simulation_job(portfolio, months)
+
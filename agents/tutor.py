@@ -1,6 +1,6 @@
 from __future__ import annotations
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
+from agents.llm_clients import get_llm
+from agents.response_cache import cached_response
 from rag.retriever import get_retriever
 
 
@@ -26,8 +26,14 @@ SYSTEM = """너는 주식/ETF 왕초보(중학생도 이해할 수준)를 가르
 
 
 def answer_term_question(question: str) -> str:
-    load_dotenv()
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.1)
+    """
+    용어 설명 (같은/비슷한 질문은 응답 캐시에서 바로 반환)
+    """
+    return cached_response("TERM_QA", question, lambda: _answer_term_question(question))
+
+
+def _answer_term_question(question: str) -> str:
+    llm = get_llm("gpt-4o-mini", temperature=0.1)
 
     retriever = get_retriever(k=4)
     docs = retriever.invoke(question)
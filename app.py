@@ -6,8 +6,13 @@ import os
 # 환경변수 로드
 load_dotenv()
 
-from graph import build_app
-from data.db import load_profile
+from graph import get_app, run_thread_turn, complete_pending_job
+from data.state_store import load_thread, reset_thread, save_thread
+from agents.jobs import get_job
+from data.db import load_profile, migrate
+
+# 스키마 마이그레이션은 프로세스 시작 때 한 번 (이후 노드들의 migrate() 호출은 no-op)
+migrate()
 
 # 페이지 설정
 st.set_page_config(page_title="RulePilot AI", page_icon="🤖")
@@ -16,15 +21,22 @@ st.set_page_config(page_title="RulePilot AI", page_icon="🤖")
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
+def thread_id_for(user_id: str) -> str:
+    # 대화 체크포인트 키 (사용자별 1개 스레드)
+    return f"streamlit:{user_id}"
+
+
 if "rulepilot_state" not in st.session_state:
-    st.session_state.rulepilot_state = {"user_id": "streamlit_user"} # 기본 사용자 ID
+    # ✅ 저장된 대화 상태가 있으면 이어서 (프로세스 재시작 후에도 유지)
+    st.session_state.rulepilot_state = load_thread(thread_id_for("streamlit_user")) or {"user_id": "streamlit_user"} # 기본 사용자 ID
     st.session_state.rulepilot_state["user_text"] = "" # 초기 트리거용
 
 if "app_instance" not in st.session_state:
-    st.session_state.app_instance = build_app()
+    # 그래프는 프로세스 공용(한 번만 컴파일), 세션마다 다른 건 rulepilot_state뿐
+    st.session_state.app_instance = get_app()
     # 첫 실행 시 봇의 초기 메시지 트리거
     initial_state = st.session_state.rulepilot_state.copy()
-    out = st.session_state.app_instance.invoke(initial_state)
+    out = run_thread_turn(thread_id_for(initial_state["user_id"]), {}, state=initial_state)
     
     if isinstance(out, dict):
         st.session_state.rulepilot_state.update(out)
@@ -83,17 +95,15 @@ with st.sidebar:
 
     # 사용자가 변경되었으면 상태 업데이트 & 리로드
     if selected_user != current_uid:
-        # ✅ 상태 완전 초기화 (이전 사용자의 profile 등 데이터 잔존 방지)
-        st.session_state.rulepilot_state = {
+        # ✅ 그 사용자의 저장된 대화 상태로 교체 (없을 때만 새로 시작, 이전 사용자 데이터 잔존 방지)
+        # 빈 dict로 바꾸면 다음 턴의 save_thread가 저장된 키를 전부 '삭제'로 기록하므로 반드시 복원
+        st.session_state.rulepilot_state = load_thread(thread_id_for(selected_user)) or {
             "user_id": selected_user,
-            "user_text": "",
             "interview_step": None,
-            "output_text": "" 
         }
+        st.session_state.rulepilot_state.update({"user_id": selected_user, "user_text": "", "output_text": ""})
         st.session_state.messages = [] 
         
-        st.session_state.app_instance = build_app()
-        
         # ✅ 새 사용자 접속 시 봇이 먼저 말 걸기 (Welcome Message)
         # DB에 프로필이 있는지 확인
         existing_profile = load_profile(selected_user)
@@ -141,7 +151,6 @@ with st.sidebar:
                     "output_text": ""
                 }
                 st.session_state.messages = []
-                st.session_state.app_instance = build_app()
                 
                 welcome_msg = (
                     f"반가워요, **{new_name}**님! 🎉\n"
@@ -189,6 +198,34 @@ with st.sidebar:
                     st.session_state.delete_confirm_mode = False
                     st.rerun()
 
+    # ---------------------------------------------------------
+    # 📈 월별 신호 히스토리 (monthly_signals에 미리 계산된 월말 신호)
+    # ---------------------------------------------------------
+    basket = (st.session_state.rulepilot_state.get("month_signal") or {}).get("basket") or {}
+    if basket:
+        from data.db import list_monthly_signals
+        st.divider()
+        with st.expander("📈 월별 신호 히스토리"):
+            for t in basket:
+                rows = list_monthly_signals(t, limit=12)
+                if not rows:
+                    st.caption(f"{t}: 저장된 신호가 없습니다.")
+                    continue
+                st.markdown(f"**{t}**")
+                st.dataframe(
+                    [
+                        {
+                            "월": r["yyyymm"],
+                            "주식 비중": f"{r['equity_weight']:.0%}",
+                            "추세": r["trend_score"],
+                            "변동성": round(r["vol_score"], 2),
+                            "근거": ", ".join(r["reason_codes"]),
+                        }
+                        for r in rows
+                    ],
+                    hide_index=True,
+                )
+
     # ---------------------------------------------------------
     # 📂 저장된 포트폴리오 불러오기
     # ---------------------------------------------------------
@@ -243,11 +280,9 @@ with st.sidebar:
                 if st.button("🗑️ 삭제", key=f"delete_portfolio_{selected_key}"):
                     # DB에서 삭제
                     rec_id = options[selected_key]["id"]
-                    import sqlite3
-                    from data.db import get_conn
-                    with get_conn() as conn:
+                    from data.db import transaction
+                    with transaction() as conn:
                         conn.execute("DELETE FROM portfolio_recommendations WHERE rec_id = ?", (rec_id,))
-                        conn.commit()
                     st.success("✅ 포트폴리오가 삭제되었습니다.")
                     st.rerun()
 
@@ -309,9 +344,8 @@ with st.sidebar:
             "interview_step": None,
             "output_text": ""
         }
-        
-        # 앱 인스턴스 재생성
-        st.session_state.app_instance = build_app()
+        # 저장된 체크포인트도 초기화
+        reset_thread(thread_id_for(uid), keep=st.session_state.rulepilot_state)
         
         # 초기화 메시지
         st.session_state.messages.append({"role": "assistant", "content": "대화가 초기화되었습니다. 처음부터 다시 시작할게요! 😊"})
@@ -672,6 +706,48 @@ for message in st.session_state.messages:
         if message.get("type") == "chart" and "data" in message:
             draw_simulation_chart(message["data"])
 
+def assistant_message(state: dict) -> dict:
+    """
+    state -> 대화 기록용 봇 메시지 (시뮬레이션 결과가 있으면 차트 데이터 포함)
+    """
+    msg_obj = {"role": "assistant", "content": state.get("output_text", "(응답 없음)")}
+    if "simulation_data" in state:
+        msg_obj["type"] = "chart"
+        msg_obj["data"] = state["simulation_data"]
+    return msg_obj
+
+
+JOB_POLL_S = 0.5
+
+
+@st.fragment(run_every=JOB_POLL_S)
+def pending_job_progress() -> None:
+    """
+    pending_job 진행률 표시. 이 fragment만 주기적으로 다시 실행되므로 스크립트 스레드를 막지 않음
+    (작업 중에도 사이드바/입력창 사용 가능). 끝나면 결과를 대화 기록에 넣고 전체를 다시 그림.
+    """
+    state = st.session_state.rulepilot_state
+    job = state.get("pending_job")
+    if not job:
+        return
+    snap = get_job(job["job_id"])
+    if snap is not None and snap["status"] not in ("done", "error"):
+        st.progress(min(max(snap["progress"], 0.0), 1.0), text=snap["message"] or "작업 중...")
+        return
+
+    if "simulation_data" in state:
+        del state["simulation_data"]
+    state.update(complete_pending_job(state, timeout=0))
+    save_thread(thread_id_for(state.get("user_id", "streamlit_user")), state)
+    st.session_state.messages.append(assistant_message(state))
+    st.rerun()
+
+
+if st.session_state.rulepilot_state.get("pending_job"):
+    with st.chat_message("assistant"):
+        pending_job_progress()
+
+
 # 사용자 입력 처리
 if prompt := st.chat_input("메시지를 입력하세요..."):
     # 사용자 메시지 표시
@@ -695,10 +771,14 @@ if prompt := st.chat_input("메시지를 입력하세요..."):
         try:
             # ✅ 오래 걸리는 작업(LLM, 시뮬레이션) 시 스피너 표시
             with st.spinner("AI가 생각 중입니다... 🧠"):
-                out = st.session_state.app_instance.invoke(current_state)
+                # 바뀐 키만 체크포인트에 저장됨
+                tid = thread_id_for(current_state.get("user_id", "streamlit_user"))
+                out = run_thread_turn(tid, {"user_text": prompt}, state=current_state)
             
             if isinstance(out, dict):
                 st.session_state.rulepilot_state.update(out)
+                # ✅ 무거운 작업(시뮬레이션/시장 브리핑)은 백그라운드 작업 -> 안내 문구만 먼저 보여주고
+                #    진행률/결과는 pending_job_progress fragment가 이어서 표시
                 bot_response = st.session_state.rulepilot_state.get("output_text", "(응답 없음)")
             else:
                 bot_response = "(시스템 오류: 응답 형식이 올바르지 않습니다.)"
@@ -723,3 +803,7 @@ if prompt := st.chat_input("메시지를 입력하세요..."):
             msg_obj["data"] = sim_data
             
         st.session_state.messages.append(msg_obj)
+
+    # 백그라운드 작업이 시작됐으면 진행률 fragment가 보이도록 다시 그림 (안내 문구는 위에서 저장됨)
+    if st.session_state.rulepilot_state.get("pending_job"):
+        st.rerun()
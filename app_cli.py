@@ -1,17 +1,20 @@
 from __future__ import annotations
-from graph import build_app
+from graph import run_thread_turn
+from data.db import migrate
+from data.state_store import load_thread
+
+THREAD_ID = "cli:local"
 
 
 def main():
-    app = build_app()
+    migrate()
     print("RulePilot CLI 시작! (종료: exit)")
 
-    # ✅ state는 한 번 만들고 계속 유지
-    state = {"user_id": "local"}
+    # ✅ state는 한 번 만들고 계속 유지 (저장된 대화가 있으면 이어서)
+    state = load_thread(THREAD_ID) or {"user_id": "local"}
 
     # ✅ 시작하자마자 봇이 먼저 '첫 질문'을 하도록 트리거
-    state["user_text"] = ""  # 빈 입력
-    out = app.invoke(state)
+    out = run_thread_turn(THREAD_ID, {"user_text": ""}, state=state, wait_jobs=True)  # 빈 입력
 
     # ✅ out로 state를 통째로 갈아끼우지 말고 merge(안전)
     if isinstance(out, dict):
@@ -38,8 +41,7 @@ def main():
         if user.lower() in ["exit", "quit"]:
             break
 
-        state["user_text"] = user
-        out = app.invoke(state)
+        out = run_thread_turn(THREAD_ID, {"user_text": user}, state=state, wait_jobs=True)
 
         # ✅ merge
         if isinstance(out, dict):
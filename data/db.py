@@ -1,102 +1,355 @@
 # data/db.py
 from __future__ import annotations
 
+import copy
+import functools
 import json
 import sqlite3
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
-from typing import Any
 
 DB_PATH = Path(__file__).resolve().parent / "rulepilot.sqlite3"
 
 
-def get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(str(DB_PATH))
+# 스레드별 영속 커넥션 (Streamlit 세션 스레드마다 1개, DB 경로별)
+_LOCAL = threading.local()
+BUSY_TIMEOUT_MS = 5000
+
+
+def _open_conn(path: str) -> sqlite3.Connection:
+    # isolation_level=None: 자동 커밋. 여러 문장을 묶을 때는 transaction() 사용
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
     conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    # WAL: 읽기와 쓰기가 서로 막지 않음 (동시 세션의 'database is locked' 방지)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
     return conn
 
 
-def migrate() -> None:
+def get_conn() -> sqlite3.Connection:
     """
-    DB 테이블 생성/업데이트(간단 마이그레이션).
-    - users: 유저 존재 보장
-    - profiles: 여러 개 프로필 + active 관리
-    - monthly_plans: 월별 계획 히스토리
+    현재 스레드의 커넥션 반환 (없거나 닫혔으면 새로 열기).
+    쓰기는 항상 transaction()으로 (`with get_conn()` 블록은 끝에서 커밋하므로 바깥 트랜잭션을 끊음).
+    커넥션은 닫지 말 것.
     """
-    with get_conn() as conn:
-        cur = conn.cursor()
+    path = str(DB_PATH)
+    conns: Dict[str, sqlite3.Connection] = getattr(_LOCAL, "conns", None) or {}
+    _LOCAL.conns = conns
 
-        cur.execute(
-            """
-        CREATE TABLE IF NOT EXISTS users (
-            user_id TEXT PRIMARY KEY,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-        """
-        )
+    conn = conns.get(path)
+    if conn is not None:
+        try:
+            conn.total_changes  # 닫힌 커넥션이면 ProgrammingError
+            return conn
+        except sqlite3.ProgrammingError:
+            pass
 
-        cur.execute(
-            """
-        CREATE TABLE IF NOT EXISTS profiles (
-            profile_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT NOT NULL,
-            name TEXT NOT NULL DEFAULT '기본 설정',
-            is_active INTEGER NOT NULL DEFAULT 0,
-            profile_json TEXT NOT NULL,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(user_id) REFERENCES users(user_id)
-        )
-        """
-        )
+    conn = _open_conn(path)
+    conns[path] = conn
+    return conn
 
-        cur.execute(
-            """
-        CREATE INDEX IF NOT EXISTS idx_profiles_user_active
-        ON profiles(user_id, is_active)
-        """
-        )
 
-        cur.execute(
-            """
-        CREATE TABLE IF NOT EXISTS monthly_plans (
-            plan_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT NOT NULL,
-            profile_id INTEGER,
-            yyyymm TEXT NOT NULL,
-            plan_json TEXT NOT NULL,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(user_id, yyyymm, profile_id),
-            FOREIGN KEY(user_id) REFERENCES users(user_id),
-            FOREIGN KEY(profile_id) REFERENCES profiles(profile_id)
-        )
-        """
-        )
+def close_thread_conns() -> None:
+    """
+    현재 스레드가 연 커넥션 전부 닫기 (배치 스크립트 종료/테스트용)
+    """
+    conns = getattr(_LOCAL, "conns", None) or {}
+    for conn in conns.values():
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    conns.clear()
 
-        cur.execute(
-            """
-        CREATE TABLE IF NOT EXISTS portfolio_recommendations (
-            rec_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT NOT NULL,
-            profile_id INTEGER,
-            rec_json TEXT NOT NULL,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(user_id) REFERENCES users(user_id),
-            FOREIGN KEY(profile_id) REFERENCES profiles(profile_id)
-        )
-        """
-        )
 
+@contextmanager
+def transaction():
+    """
+    with transaction() as conn: ...
+    BEGIN IMMEDIATE로 쓰기 잠금을 먼저 잡고 블록이 끝나면 커밋 (예외 시 롤백).
+    중첩 호출이면 바깥 트랜잭션에 합류.
+    """
+    conn = get_conn()
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
         conn.commit()
 
 
+# ---------------------------
+# Turn cache (그래프 invoke 1번 동안만 읽기 결과 재사용)
+# ---------------------------
+# None이면 캐시 비활성 (turn_cache() 밖에서는 항상 DB를 직접 읽음)
+_TURN_CACHE: ContextVar[Optional[Dict[Any, Any]]] = ContextVar("rulepilot_turn_cache", default=None)
+
+
+@contextmanager
+def turn_cache():
+    """
+    with turn_cache(): app.invoke(state)
+    - 블록 안의 읽기 함수 결과를 (함수, DB 경로, 인자) 단위로 메모이즈
+    - 쓰기 함수가 호출되면 통째로 비움 (같은 턴 안에서도 쓴 뒤에는 새로 읽음)
+    - 이미 열린 캐시 안에서 다시 들어오면 바깥 캐시를 그대로 사용
+    """
+    if _TURN_CACHE.get() is not None:
+        yield
+        return
+    token = _TURN_CACHE.set({})
+    try:
+        yield
+    finally:
+        _TURN_CACHE.reset(token)
+
+
+def _turn_cached(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        cache = _TURN_CACHE.get()
+        if cache is None:
+            return fn(*args, **kwargs)
+        key = (fn.__name__, str(DB_PATH), args, tuple(sorted(kwargs.items())))
+        if key not in cache:
+            cache[key] = fn(*args, **kwargs)
+        # 호출한 쪽에서 dict를 수정해도 캐시가 오염되지 않도록 복사본 반환
+        return copy.deepcopy(cache[key])
+    return wrapper
+
+
+def _turn_write(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            cache = _TURN_CACHE.get()
+            if cache is not None:
+                cache.clear()
+    return wrapper
+
+
+# 버전별 마이그레이션 (PRAGMA user_version 기준으로 안 돌린 것만 실행)
+# - 기존 DB(user_version=0)도 그대로 올라가도록 IF NOT EXISTS 유지
+# - 새 테이블/컬럼은 끝에 버전을 추가하고, 이미 배포된 버전 내용은 바꾸지 말 것
+MIGRATIONS: List[Tuple[int, List[str]]] = [
+    (
+        1,
+        [
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                user_id TEXT PRIMARY KEY,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS profiles (
+                profile_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                name TEXT NOT NULL DEFAULT '기본 설정',
+                is_active INTEGER NOT NULL DEFAULT 0,
+                profile_json TEXT NOT NULL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY(user_id) REFERENCES users(user_id)
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_profiles_user_active
+            ON profiles(user_id, is_active)
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS monthly_plans (
+                plan_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                profile_id INTEGER,
+                yyyymm TEXT NOT NULL,
+                plan_json TEXT NOT NULL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(user_id, yyyymm, profile_id),
+                FOREIGN KEY(user_id) REFERENCES users(user_id),
+                FOREIGN KEY(profile_id) REFERENCES profiles(profile_id)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS portfolio_recommendations (
+                rec_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                profile_id INTEGER,
+                rec_json TEXT NOT NULL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY(user_id) REFERENCES users(user_id),
+                FOREIGN KEY(profile_id) REFERENCES profiles(profile_id)
+            )
+            """,
+        ],
+    ),
+    (
+        2,
+        [
+            """
+            CREATE TABLE IF NOT EXISTS monthly_signals (
+                ticker TEXT NOT NULL,
+                yyyymm TEXT NOT NULL,
+                as_of TEXT,
+                trend_score REAL NOT NULL,
+                vol_score REAL NOT NULL,
+                equity_weight REAL NOT NULL,
+                safe_weight REAL NOT NULL,
+                reason_codes TEXT NOT NULL,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY(ticker, yyyymm)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS signal_state (
+                ticker TEXT PRIMARY KEY,
+                last_date TEXT,
+                state_json TEXT NOT NULL,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+        ],
+    ),
+    (
+        3,
+        [
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                cache_key TEXT PRIMARY KEY,
+                intent TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_llm_cache_expires
+            ON llm_cache(expires_at)
+            """,
+        ],
+    ),
+    (
+        4,
+        [
+            """
+            CREATE TABLE IF NOT EXISTS conv_threads (
+                thread_id TEXT PRIMARY KEY,
+                user_id TEXT,
+                step INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS conv_state (
+                thread_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value_json TEXT,
+                blob_hash TEXT,
+                step INTEGER NOT NULL,
+                PRIMARY KEY(thread_id, key)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS conv_steps (
+                thread_id TEXT NOT NULL,
+                step INTEGER NOT NULL,
+                diff_json TEXT NOT NULL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY(thread_id, step)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS state_blobs (
+                blob_hash TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+        ],
+    ),
+    (
+        5,
+        [
+            """
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                cache_key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                query TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+            """,
+        ],
+    ),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# 프로세스 안에서 이미 마이그레이션 확인한 DB 경로 / 존재 확인된 유저
+_MIGRATED: set[str] = set()
+_KNOWN_USERS: set[Tuple[str, str]] = set()
+_MIGRATE_LOCK = threading.Lock()
+
+
+def migrate(force: bool = False) -> None:
+    """
+    DB 테이블 생성/업데이트(버전별 마이그레이션).
+    - users: 유저 존재 보장
+    - profiles: 여러 개 프로필 + active 관리
+    - monthly_plans: 월별 계획 히스토리
+    - monthly_signals: 티커별 월말 모델 신호 히스토리
+    - signal_state: 티커별 롤링 통계 상태(MA200/vol20 증분 갱신용)
+    - llm_cache: LLM 응답 캐시 (용어 설명/시장 브리핑)
+    - conv_*: 대화 상태 체크포인트 (스레드별 현재 값 + 스텝별 변경 키), state_blobs: 큰 값 본문
+    - embedding_cache: RAG 질의 임베딩 캐시 (float32 바이트)
+    DB 경로당 프로세스에서 한 번만 실제로 확인함 (이후 호출은 set 조회만).
+    """
+    key = str(DB_PATH)
+    if key in _MIGRATED and not force:
+        return
+
+    with _MIGRATE_LOCK:
+        if key in _MIGRATED and not force:
+            return
+
+        current = get_conn().execute("PRAGMA user_version").fetchone()[0]
+        for version, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            # 한 버전 = 한 트랜잭션 (DDL + user_version 같이 커밋)
+            with transaction() as conn:
+                for sql in statements:
+                    conn.execute(sql)
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+        _MIGRATED.add(key)
+
+
 def ensure_user(user_id: str) -> str:
-    migrate()
     uid = user_id or "local"
-    with get_conn() as conn:
+    key = (str(DB_PATH), uid)
+    if key in _KNOWN_USERS:
+        return uid
+
+    migrate()
+    with transaction() as conn:
         conn.execute("INSERT OR IGNORE INTO users(user_id) VALUES (?)", (uid,))
-        conn.commit()
+    _KNOWN_USERS.add(key)
     return uid
 
 
@@ -105,9 +358,10 @@ def ensure_user(user_id: str) -> str:
 # ---------------------------
 # Recommendation Persistence
 # ---------------------------
+@_turn_write
 def save_recommendation(user_id: str, profile_id: Optional[int], rec_data: Dict[str, Any]) -> None:
     rec_json = json.dumps(rec_data, ensure_ascii=False)
-    with get_conn() as conn:
+    with transaction() as conn:
         conn.execute(
             """
             INSERT INTO portfolio_recommendations(user_id, profile_id, rec_json)
@@ -115,27 +369,27 @@ def save_recommendation(user_id: str, profile_id: Optional[int], rec_data: Dict[
             """,
             (user_id, profile_id, rec_json),
         )
-        conn.commit()
 
 
+@_turn_cached
 def load_latest_recommendation(user_id: str, profile_id: Optional[int]) -> Optional[Dict[str, Any]]:
-    with get_conn() as conn:
-        # profile_id가 있으면 우선적으로 해당 프로필의 추천을 찾고, 없으면 그냥 유저의 최근 추천을 찾을 수도 있음
-        # 여기서는 profile_id가 명시되면 strict하게 찾자.
-        query = """
-            SELECT rec_json, created_at
-            FROM portfolio_recommendations
-            WHERE user_id = ?
-        """
-        params = [user_id]
-        
-        if profile_id is not None:
-            query += " AND profile_id = ?"
-            params.append(profile_id)
-            
-        query += " ORDER BY rec_id DESC LIMIT 1"
-        
-        row = conn.execute(query, tuple(params)).fetchone()
+    conn = get_conn()
+    # profile_id가 있으면 우선적으로 해당 프로필의 추천을 찾고, 없으면 그냥 유저의 최근 추천을 찾을 수도 있음
+    # 여기서는 profile_id가 명시되면 strict하게 찾자.
+    query = """
+        SELECT rec_json, created_at
+        FROM portfolio_recommendations
+        WHERE user_id = ?
+    """
+    params = [user_id]
+
+    if profile_id is not None:
+        query += " AND profile_id = ?"
+        params.append(profile_id)
+
+    query += " ORDER BY rec_id DESC LIMIT 1"
+
+    row = conn.execute(query, tuple(params)).fetchone()
         
     if not row:
         return None
@@ -144,18 +398,19 @@ def load_latest_recommendation(user_id: str, profile_id: Optional[int]) -> Optio
     data["created_at"] = row["created_at"]
     return data
 
+@_turn_cached
 def list_saved_recommendations(user_id: str, profile_id: Optional[int] = None) -> list[dict]:
-    with get_conn() as conn:
-        query = "SELECT rec_id, rec_json, created_at FROM portfolio_recommendations WHERE user_id = ?"
-        params = [user_id]
-        
-        if profile_id is not None:
-            query += " AND profile_id = ?"
-            params.append(profile_id)
-            
-        query += " ORDER BY rec_id DESC"
-        
-        rows = conn.execute(query, tuple(params)).fetchall()
+    conn = get_conn()
+    query = "SELECT rec_id, rec_json, created_at FROM portfolio_recommendations WHERE user_id = ?"
+    params = [user_id]
+
+    if profile_id is not None:
+        query += " AND profile_id = ?"
+        params.append(profile_id)
+
+    query += " ORDER BY rec_id DESC"
+
+    rows = conn.execute(query, tuple(params)).fetchall()
         
     results = []
     for r in rows:
@@ -227,6 +482,7 @@ def yyyymm_prev(months_back: int) -> str:
 # ---------------------------
 # Profile (여러 개) 관리
 # ---------------------------
+@_turn_write
 def create_profile(
     user_id: str,
     profile: Dict[str, Any],
@@ -234,7 +490,7 @@ def create_profile(
     make_active: bool = True,
 ) -> int:
     profile_json = json.dumps(profile, ensure_ascii=False)
-    with get_conn() as conn:
+    with transaction() as conn:
         cur = conn.cursor()
 
         if make_active:
@@ -248,26 +504,26 @@ def create_profile(
             (user_id, name, 1 if make_active else 0, profile_json),
         )
         pid = int(cur.lastrowid)
-        conn.commit()
     return pid
 
 
+@_turn_cached
 def list_profiles(user_id: str) -> List[Dict[str, Any]]:
     """
     ✅ 호환 확장:
     - 기존 키: profile_id, name, is_active, created_at, updated_at 유지
     - 앱 코드 호환 키: id, label 추가
     """
-    with get_conn() as conn:
-        rows = conn.execute(
-            """
-            SELECT profile_id, name, is_active, created_at, updated_at
-            FROM profiles
-            WHERE user_id=?
-            ORDER BY profile_id ASC
-            """,
-            (user_id,),
-        ).fetchall()
+    conn = get_conn()
+    rows = conn.execute(
+        """
+        SELECT profile_id, name, is_active, created_at, updated_at
+        FROM profiles
+        WHERE user_id=?
+        ORDER BY profile_id ASC
+        """,
+        (user_id,),
+    ).fetchall()
 
     out: List[Dict[str, Any]] = []
     for r in rows:
@@ -279,8 +535,9 @@ def list_profiles(user_id: str) -> List[Dict[str, Any]]:
     return out
 
 
+@_turn_write
 def set_active_profile(user_id: str, profile_id: int) -> None:
-    with get_conn() as conn:
+    with transaction() as conn:
         cur = conn.cursor()
         cur.execute("UPDATE profiles SET is_active=0 WHERE user_id=?", (user_id,))
         cur.execute(
@@ -291,11 +548,11 @@ def set_active_profile(user_id: str, profile_id: int) -> None:
             """,
             (user_id, profile_id),
         )
-        conn.commit()
 
 
+@_turn_write
 def rename_profile(user_id: str, profile_id: int, new_name: str) -> None:
-    with get_conn() as conn:
+    with transaction() as conn:
         conn.execute(
             """
             UPDATE profiles
@@ -304,27 +561,28 @@ def rename_profile(user_id: str, profile_id: int, new_name: str) -> None:
             """,
             (new_name, user_id, profile_id),
         )
-        conn.commit()
 
 
+@_turn_cached
 def load_active_profile(user_id: str) -> Tuple[Optional[int], Dict[str, Any]]:
-    with get_conn() as conn:
-        row = conn.execute(
-            """
-            SELECT profile_id, profile_json
-            FROM profiles
-            WHERE user_id=? AND is_active=1
-            ORDER BY profile_id DESC
-            LIMIT 1
-            """,
-            (user_id,),
-        ).fetchone()
+    conn = get_conn()
+    row = conn.execute(
+        """
+        SELECT profile_id, profile_json
+        FROM profiles
+        WHERE user_id=? AND is_active=1
+        ORDER BY profile_id DESC
+        LIMIT 1
+        """,
+        (user_id,),
+    ).fetchone()
 
     if not row:
         return None, {}
     return int(row["profile_id"]), json.loads(row["profile_json"])
 
 
+@_turn_write
 def update_active_profile(user_id: str, profile: Dict[str, Any]) -> None:
     """
     active 프로필이 있으면 덮어쓰기(RESET 모드),
@@ -336,7 +594,7 @@ def update_active_profile(user_id: str, profile: Dict[str, Any]) -> None:
         return
 
     profile_json = json.dumps(profile, ensure_ascii=False)
-    with get_conn() as conn:
+    with transaction() as conn:
         conn.execute(
             """
             UPDATE profiles
@@ -345,7 +603,6 @@ def update_active_profile(user_id: str, profile: Dict[str, Any]) -> None:
             """,
             (profile_json, user_id, pid),
         )
-        conn.commit()
 
 
 def create_new_profile_and_activate(user_id: str, profile: Dict[str, Any], name: str = "새 설정") -> int:
@@ -369,9 +626,10 @@ def rename_profile_by_id(user_id: str, profile_id: int, new_label: str) -> None:
 # ---------------------------
 # Monthly plan history
 # ---------------------------
+@_turn_write
 def _upsert_monthly_plan_raw(user_id: str, profile_id: Optional[int], yyyymm: str, plan: Dict[str, Any]) -> None:
     plan_json = json.dumps(plan, ensure_ascii=False)
-    with get_conn() as conn:
+    with transaction() as conn:
         conn.execute(
             """
             INSERT INTO monthly_plans(user_id, profile_id, yyyymm, plan_json)
@@ -381,62 +639,60 @@ def _upsert_monthly_plan_raw(user_id: str, profile_id: Optional[int], yyyymm: st
             """,
             (user_id, profile_id, yyyymm, plan_json),
         )
-        conn.commit()
 
 
+@_turn_write
 def upsert_monthly_plan(user_id: str, profile_id: int | None, yyyymm: str, plan: Dict[str, Any]) -> None:
     """
     monthly_plans에 (user_id, profile_id, yyyymm) 단위로 plan_json을 upsert한다.
     plan dict를 절대 가공하지 않고 그대로 JSON으로 저장한다.
     """
-    conn = get_conn()  # ✅ 너 db.py에 맞게
-    cur = conn.cursor()
-
     plan_json = json.dumps(plan or {}, ensure_ascii=False)
 
-    cur.execute(
-        """
-        INSERT INTO monthly_plans (user_id, profile_id, yyyymm, plan_json)
-        VALUES (?, ?, ?, ?)
-        ON CONFLICT(user_id, yyyymm, profile_id)
-        DO UPDATE SET
-            plan_json = excluded.plan_json,
-            created_at = CURRENT_TIMESTAMP
-        """,
-        (user_id, profile_id, str(yyyymm), plan_json),
-    )
-
-    conn.commit()
+    with transaction() as conn:
+        conn.execute(
+            """
+            INSERT INTO monthly_plans (user_id, profile_id, yyyymm, plan_json)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_id, yyyymm, profile_id)
+            DO UPDATE SET
+                plan_json = excluded.plan_json,
+                created_at = CURRENT_TIMESTAMP
+            """,
+            (user_id, profile_id, str(yyyymm), plan_json),
+        )
 
 
+@_turn_cached
 def get_plan(user_id: str, profile_id: Optional[int], yyyymm: str) -> Optional[Dict[str, Any]]:
     yyyymm = _to_yyyymm(yyyymm)
-    with get_conn() as conn:
-        row = conn.execute(
-            """
-            SELECT plan_json FROM monthly_plans
-            WHERE user_id=? AND profile_id IS ? AND yyyymm=?
-            """,
-            (user_id, profile_id, yyyymm),
-        ).fetchone()
+    conn = get_conn()
+    row = conn.execute(
+        """
+        SELECT plan_json FROM monthly_plans
+        WHERE user_id=? AND profile_id IS ? AND yyyymm=?
+        """,
+        (user_id, profile_id, yyyymm),
+    ).fetchone()
 
     if not row:
         return None
     return json.loads(row["plan_json"])
 
 
+@_turn_cached
 def list_recent_plans(user_id: str, profile_id: Optional[int], limit: int = 3) -> List[Dict[str, Any]]:
-    with get_conn() as conn:
-        rows = conn.execute(
-            """
-            SELECT yyyymm, plan_json, created_at
-            FROM monthly_plans
-            WHERE user_id=? AND profile_id IS ?
-            ORDER BY yyyymm DESC
-            LIMIT ?
-            """,
-            (user_id, profile_id, limit),
-        ).fetchall()
+    conn = get_conn()
+    rows = conn.execute(
+        """
+        SELECT yyyymm, plan_json, created_at
+        FROM monthly_plans
+        WHERE user_id=? AND profile_id IS ?
+        ORDER BY yyyymm DESC
+        LIMIT ?
+        """,
+        (user_id, profile_id, limit),
+    ).fetchall()
 
     out: List[Dict[str, Any]] = []
     for r in rows:
@@ -450,15 +706,14 @@ def list_recent_plans(user_id: str, profile_id: Optional[int], limit: int = 3) -
     return out
 
 
+@_turn_cached
 def fetch_monthly_plans(user_id: str, months: int = 3) -> list[dict[str, Any]]:
     """
     monthly_plans에서 최근 months건을 가져오고,
     plan_json(JSON 문자열)을 파싱해 plan dict를 반환한다.
     """
-    conn = get_conn()  # ✅ 여기만 네 db.py에 맞게
-    cur = conn.cursor()
-
-    cur.execute(
+    conn = get_conn()
+    rows = conn.execute(
         """
         SELECT yyyymm, plan_json, created_at
         FROM monthly_plans
@@ -467,9 +722,7 @@ def fetch_monthly_plans(user_id: str, months: int = 3) -> list[dict[str, Any]]:
         LIMIT ?
         """,
         (user_id, months),
-    )
-
-    rows = cur.fetchall()
+    ).fetchall()
     out: list[dict[str, Any]] = []
 
     for yyyymm, plan_json, created_at in rows:
@@ -492,6 +745,223 @@ def fetch_monthly_plans(user_id: str, months: int = 3) -> list[dict[str, Any]]:
 
     return out
 
+# ---------------------------
+# Monthly model signal history
+# ---------------------------
+@_turn_write
+def upsert_monthly_signals(ticker: str, rows: List[Dict[str, Any]]) -> int:
+    """
+    (ticker, yyyymm) 단위로 월말 신호를 일괄 upsert.
+    rows: [{yyyymm, as_of, trend_score, vol_score, equity_weight, safe_weight, reason_codes}, ...]
+    """
+    migrate()
+    params = [
+        (
+            ticker,
+            _to_yyyymm(str(r["yyyymm"])),
+            r.get("as_of"),
+            float(r["trend_score"]),
+            float(r["vol_score"]),
+            float(r["equity_weight"]),
+            float(r["safe_weight"]),
+            json.dumps(list(r.get("reason_codes") or []), ensure_ascii=False),
+        )
+        for r in rows
+    ]
+    with transaction() as conn:
+        conn.executemany(
+            """
+            INSERT INTO monthly_signals(
+                ticker, yyyymm, as_of, trend_score, vol_score, equity_weight, safe_weight, reason_codes
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(ticker, yyyymm)
+            DO UPDATE SET
+                as_of=excluded.as_of,
+                trend_score=excluded.trend_score,
+                vol_score=excluded.vol_score,
+                equity_weight=excluded.equity_weight,
+                safe_weight=excluded.safe_weight,
+                reason_codes=excluded.reason_codes,
+                updated_at=CURRENT_TIMESTAMP
+            """,
+            params,
+        )
+    return len(params)
+
+
+def _signal_row_to_dict(r: sqlite3.Row) -> Dict[str, Any]:
+    d = dict(r)
+    d["reason_codes"] = json.loads(d.get("reason_codes") or "[]")
+    return d
+
+
+@_turn_cached
+def get_monthly_signal(ticker: str, yyyymm: str) -> Optional[Dict[str, Any]]:
+    migrate()
+    conn = get_conn()
+    row = conn.execute(
+        """
+        SELECT ticker, yyyymm, as_of, trend_score, vol_score, equity_weight, safe_weight, reason_codes
+        FROM monthly_signals
+        WHERE ticker=? AND yyyymm=?
+        """,
+        (ticker, _to_yyyymm(yyyymm)),
+    ).fetchone()
+
+    if not row:
+        return None
+    return _signal_row_to_dict(row)
+
+
+@_turn_cached
+def list_monthly_signals(ticker: str, limit: int = 12) -> List[Dict[str, Any]]:
+    """
+    ticker의 월별 신호를 최신 월부터 limit개 반환 (히스토리 화면용)
+    """
+    migrate()
+    conn = get_conn()
+    rows = conn.execute(
+        """
+        SELECT ticker, yyyymm, as_of, trend_score, vol_score, equity_weight, safe_weight, reason_codes
+        FROM monthly_signals
+        WHERE ticker=?
+        ORDER BY yyyymm DESC
+        LIMIT ?
+        """,
+        (ticker, limit),
+    ).fetchall()
+
+    return [_signal_row_to_dict(r) for r in rows]
+
+
+@_turn_cached
+def load_signal_state(ticker: str) -> Optional[Dict[str, Any]]:
+    migrate()
+    conn = get_conn()
+    row = conn.execute(
+        "SELECT state_json FROM signal_state WHERE ticker=?",
+        (ticker,),
+    ).fetchone()
+
+    if not row:
+        return None
+    return json.loads(row["state_json"])
+
+
+@_turn_write
+def save_signal_state(ticker: str, last_date: str, state: Dict[str, Any]) -> None:
+    migrate()
+    state_json = json.dumps(state, ensure_ascii=False)
+    with transaction() as conn:
+        conn.execute(
+            """
+            INSERT INTO signal_state(ticker, last_date, state_json)
+            VALUES (?, ?, ?)
+            ON CONFLICT(ticker)
+            DO UPDATE SET
+                last_date=excluded.last_date,
+                state_json=excluded.state_json,
+                updated_at=CURRENT_TIMESTAMP
+            """,
+            (ticker, last_date, state_json),
+        )
+
+
+# ---------------------------
+# LLM response cache
+# ---------------------------
+def get_llm_cache(cache_keys: List[str], now: float) -> Optional[Dict[str, Any]]:
+    """
+    cache_keys를 순서대로 보고 만료 안 된 첫 행 반환 (hits 증가)
+    """
+    migrate()
+    conn = get_conn()
+    for key in cache_keys:
+        row = conn.execute(
+            """
+            SELECT cache_key, intent, kind, response, created_at, expires_at, hits
+            FROM llm_cache
+            WHERE cache_key=? AND expires_at > ?
+            """,
+            (key, now),
+        ).fetchone()
+        if row:
+            conn.execute("UPDATE llm_cache SET hits = hits + 1 WHERE cache_key=?", (key,))
+            return dict(row)
+    return None
+
+
+def put_llm_cache(rows: List[Dict[str, Any]]) -> None:
+    """
+    rows: [{cache_key, intent, kind, response, created_at, expires_at}, ...]
+    """
+    migrate()
+    with transaction() as conn:
+        conn.executemany(
+            """
+            INSERT INTO llm_cache(cache_key, intent, kind, response, created_at, expires_at)
+            VALUES (:cache_key, :intent, :kind, :response, :created_at, :expires_at)
+            ON CONFLICT(cache_key)
+            DO UPDATE SET
+                response=excluded.response,
+                created_at=excluded.created_at,
+                expires_at=excluded.expires_at
+            """,
+            rows,
+        )
+
+
+def purge_llm_cache(now: float) -> int:
+    migrate()
+    with transaction() as conn:
+        cur = conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        return int(cur.rowcount or 0)
+
+
+# ---------------------------
+# Query embedding cache
+# ---------------------------
+def get_embedding_cache(cache_key: str) -> Optional[Dict[str, Any]]:
+    """
+    있으면 {cache_key, model, query, dim, vector(bytes), created_at, hits} (hits 증가)
+    """
+    migrate()
+    conn = get_conn()
+    row = conn.execute(
+        """
+        SELECT cache_key, model, query, dim, vector, created_at, hits
+        FROM embedding_cache
+        WHERE cache_key=?
+        """,
+        (cache_key,),
+    ).fetchone()
+    if row:
+        conn.execute("UPDATE embedding_cache SET hits = hits + 1 WHERE cache_key=?", (cache_key,))
+        return dict(row)
+    return None
+
+
+def put_embedding_cache(rows: List[Dict[str, Any]]) -> None:
+    """
+    rows: [{cache_key, model, query, dim, vector, created_at}, ...]
+    """
+    migrate()
+    with transaction() as conn:
+        conn.executemany(
+            """
+            INSERT INTO embedding_cache(cache_key, model, query, dim, vector, created_at)
+            VALUES (:cache_key, :model, :query, :dim, :vector, :created_at)
+            ON CONFLICT(cache_key)
+            DO UPDATE SET
+                dim=excluded.dim,
+                vector=excluded.vector,
+                created_at=excluded.created_at
+            """,
+            rows,
+        )
+
+
 # ---------------------------
 # Backward compatible helpers
 # ---------------------------
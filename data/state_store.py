@@ -0,0 +1,244 @@
+from __future__ import annotations
+import dataclasses
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from data.db import get_conn, migrate, transaction
+
+# 직렬화했을 때 이보다 큰 값(simulation_data 등)은 내용 해시로 state_blobs에 따로 저장하고 참조만 남김
+BLOB_MIN_BYTES = 4096
+
+# 매 턴 다시 계산하는 파생/일회성 값은 체크포인트에 넣지 않음
+# (month_signal은 달이 바뀌거나 추천이 바뀌면 다시 계산해야 하므로 복원하면 안 됨)
+TRANSIENT_KEYS = frozenset({"month_signal", "portfolio_plan", "output_text"})
+
+# 스레드별로 남겨 둘 최근 스텝 수 (더 오래된 conv_steps는 저장할 때 같이 삭제)
+# 이만큼 저장할 때마다 한 번씩 prune_blobs()로 더 이상 참조되지 않는 blob도 정리
+STEPS_KEEP = 50
+
+# 메모리에 변경 감지용 키별 해시를 들고 있을 최근 스레드 수 (밀려나면 DB의 conv_state에서 다시 계산)
+HASH_CACHE_THREADS = 1024
+
+_LOCK = threading.Lock()
+# thread_id -> {키: 마지막으로 저장/로드한 값의 sha256} (값 자체는 들고 있지 않음)
+_HASHES: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+
+
+def _json_default(o: Any) -> Any:
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if hasattr(o, "item"):  # numpy 스칼라
+        return o.item()
+    if hasattr(o, "tolist"):  # numpy 배열
+        return o.tolist()
+    raise TypeError(f"JSON으로 저장할 수 없는 값: {type(o).__name__}")
+
+
+def _dumps(v: Any) -> str:
+    return json.dumps(v, ensure_ascii=False, default=_json_default, separators=(",", ":"))
+
+
+def _digest(raw: str) -> str:
+    # state_blobs의 blob_hash와 같은 방식
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _remember(thread_id: str, hashes: Dict[str, str]) -> None:
+    with _LOCK:
+        _HASHES[thread_id] = hashes
+        _HASHES.move_to_end(thread_id)
+        while len(_HASHES) > HASH_CACHE_THREADS:
+            _HASHES.popitem(last=False)
+
+
+def _known_hashes(thread_id: str) -> Dict[str, str]:
+    """
+    마지막 체크포인트의 키별 해시 (메모리에 없으면 blob 본문은 읽지 않고 DB에서 계산)
+    """
+    with _LOCK:
+        hashes = _HASHES.get(thread_id)
+        if hashes is not None:
+            _HASHES.move_to_end(thread_id)
+            return hashes
+    rows = get_conn().execute(
+        "SELECT key, value_json, blob_hash FROM conv_state WHERE thread_id=?",
+        (thread_id,),
+    ).fetchall()
+    hashes = {
+        r["key"]: r["blob_hash"] or _digest(r["value_json"])
+        for r in rows
+        if r["blob_hash"] or r["value_json"] is not None
+    }
+    _remember(thread_id, hashes)
+    return hashes
+
+
+def load_thread(thread_id: str) -> Dict[str, Any]:
+    """
+    스레드의 마지막 상태 복원 (없으면 빈 dict). 큰 값은 state_blobs에서 합쳐서 돌려줌.
+    """
+    migrate()
+    rows = get_conn().execute(
+        """
+        SELECT s.key, s.value_json, s.blob_hash, b.data AS blob_data
+        FROM conv_state s
+        LEFT JOIN state_blobs b ON b.blob_hash = s.blob_hash
+        WHERE s.thread_id=?
+        """,
+        (thread_id,),
+    ).fetchall()
+
+    state: Dict[str, Any] = {}
+    hashes: Dict[str, str] = {}
+    for r in rows:
+        raw = r["blob_data"] if r["blob_data"] is not None else r["value_json"]
+        if raw is None:
+            continue
+        hashes[r["key"]] = r["blob_hash"] or _digest(raw)
+        if r["key"] in TRANSIENT_KEYS:  # 예전 체크포인트에 남아 있던 값은 복원하지 않음
+            continue
+        state[r["key"]] = json.loads(raw)
+
+    _remember(thread_id, hashes)
+    return state
+
+
+def save_thread(thread_id: str, state: Dict[str, Any], user_id: Optional[str] = None) -> List[str]:
+    """
+    마지막 체크포인트 대비 바뀐 키만 저장 (스텝 1개 = 변경 키 목록 1행).
+    - 변경 감지: 직렬화한 값의 sha256을 마지막 체크포인트의 키별 해시와 비교
+    - 작은 값: conv_state.value_json에 그대로
+    - 큰 값: 내용 해시로 state_blobs에 한 번만 저장하고 conv_state에는 해시만
+    - TRANSIENT_KEYS는 저장하지 않음
+    - conv_steps는 스레드당 최근 STEPS_KEEP개만 유지
+    반환: 이번에 저장한 (바뀐/삭제된) 키 목록
+    """
+    migrate()
+    known = _known_hashes(thread_id)
+    raws: Dict[str, str] = {}
+    hashes: Dict[str, str] = {}
+    for k, v in state.items():
+        if k in TRANSIENT_KEYS:
+            continue
+        raws[k] = _dumps(v)
+        hashes[k] = _digest(raws[k])
+    changed = [k for k in hashes if known.get(k) != hashes[k]]
+    removed = [k for k in known if k not in hashes]
+    if not changed and not removed:
+        return []
+
+    diff: Dict[str, Any] = {}
+    rows = []
+    blobs = []
+    for k in changed:
+        raw = raws[k]
+        if len(raw.encode("utf-8")) >= BLOB_MIN_BYTES:
+            h = hashes[k]
+            blobs.append((h, raw, len(raw)))
+            rows.append((k, None, h))
+            diff[k] = {"$blob": h}
+        else:
+            rows.append((k, raw, None))
+            diff[k] = json.loads(raw)
+
+    uid = user_id or state.get("user_id")
+    with transaction() as conn:
+        conn.execute(
+            """
+            INSERT INTO conv_threads(thread_id, user_id, step)
+            VALUES (?, ?, 1)
+            ON CONFLICT(thread_id)
+            DO UPDATE SET step = step + 1, user_id = COALESCE(excluded.user_id, user_id), updated_at = CURRENT_TIMESTAMP
+            """,
+            (thread_id, uid),
+        )
+        step = int(conn.execute("SELECT step FROM conv_threads WHERE thread_id=?", (thread_id,)).fetchone()[0])
+
+        if blobs:
+            conn.executemany(
+                "INSERT OR IGNORE INTO state_blobs(blob_hash, data, size) VALUES (?, ?, ?)",
+                blobs,
+            )
+        conn.executemany(
+            """
+            INSERT INTO conv_state(thread_id, key, value_json, blob_hash, step)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(thread_id, key)
+            DO UPDATE SET value_json=excluded.value_json, blob_hash=excluded.blob_hash, step=excluded.step
+            """,
+            [(thread_id, k, v, h, step) for k, v, h in rows],
+        )
+        if removed:
+            conn.executemany(
+                "DELETE FROM conv_state WHERE thread_id=? AND key=?",
+                [(thread_id, k) for k in removed],
+            )
+        conn.execute(
+            "INSERT INTO conv_steps(thread_id, step, diff_json) VALUES (?, ?, ?)",
+            (thread_id, step, _dumps({"set": diff, "removed": removed})),
+        )
+        conn.execute(
+            "DELETE FROM conv_steps WHERE thread_id=? AND step<=?",
+            (thread_id, step - STEPS_KEEP),
+        )
+
+    _remember(thread_id, hashes)
+    if step % STEPS_KEEP == 0:
+        prune_blobs()
+    return sorted(changed) + sorted(removed)
+
+
+def reset_thread(thread_id: str, keep: Optional[Dict[str, Any]] = None) -> None:
+    """
+    스레드 체크포인트 삭제 (대화 초기화). keep이 있으면 그 값으로 새로 시작.
+    다른 스레드가 참조하지 않게 된 state_blobs도 같이 정리.
+    """
+    migrate()
+    with transaction() as conn:
+        conn.execute("DELETE FROM conv_state WHERE thread_id=?", (thread_id,))
+        conn.execute("DELETE FROM conv_steps WHERE thread_id=?", (thread_id,))
+        conn.execute("DELETE FROM conv_threads WHERE thread_id=?", (thread_id,))
+    _remember(thread_id, {})
+    prune_blobs()
+    if keep:
+        save_thread(thread_id, dict(keep))
+
+
+def thread_steps(thread_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    최근 스텝별 변경 키 (디버깅/감사용)
+    """
+    migrate()
+    rows = get_conn().execute(
+        """
+        SELECT step, diff_json, created_at FROM conv_steps
+        WHERE thread_id=? ORDER BY step DESC LIMIT ?
+        """,
+        (thread_id, limit),
+    ).fetchall()
+    return [{"step": r["step"], "created_at": r["created_at"], **json.loads(r["diff_json"])} for r in rows]
+
+
+def prune_blobs() -> int:
+    """
+    어떤 스레드의 현재 상태/스텝에서도 참조하지 않는 blob 삭제
+    (conv_steps는 스레드당 STEPS_KEEP개로 묶여 있으므로 스텝 전체를 읽어도 크기가 한정됨)
+    """
+    migrate()
+    with transaction() as conn:
+        live = {r[0] for r in conn.execute("SELECT blob_hash FROM conv_state WHERE blob_hash IS NOT NULL")}
+        for r in conn.execute("SELECT diff_json FROM conv_steps"):
+            live.update(_blob_refs(json.loads(r[0]).get("set", {}).values()))
+        dead = [r[0] for r in conn.execute("SELECT blob_hash FROM state_blobs") if r[0] not in live]
+        conn.executemany("DELETE FROM state_blobs WHERE blob_hash=?", [(h,) for h in dead])
+    return len(dead)
+
+
+def _blob_refs(values: Iterable[Any]) -> List[str]:
+    return [v["$blob"] for v in values if isinstance(v, dict) and "$blob" in v]
@@ -1,30 +1,43 @@
 # graph.py
 from __future__ import annotations
 
-from typing import TypedDict, Dict, Any
+from typing import TypedDict, Dict, Any, Callable, List, Optional
+import copy
 from dataclasses import fields
 from datetime import datetime, date
 import re
+import threading
+import time
 
 from langgraph.graph import StateGraph, END
 
 from state_schema import Profile, Policy, MonthSignal, PortfolioPlan, to_dict
 
-from agents.router import route_intent
-from agents.allocator import build_portfolio_plan
+from agents.router import route_turn
+from agents.allocator import SAFE_TICKER, build_portfolio_plan, equity_bucket
 from agents.decision_validator import decide_now
 from agents.tutor import answer_term_question
-from model.monthly_model import run_monthly_model_from_market, simulate_portfolio_history, backtest_crisis_scenarios
+from agents.llm_clients import get_llm
+from agents.portfolio_context import build_portfolio_qa_messages
+from agents.portfolio_schema import PortfolioSchemaError, generate_portfolio
+from agents.response_cache import get_cached, put_cached
+from agents.market_search import build_queries, search_market
+from agents.speculative import prefetch_simulation, simulation_job
+from agents.jobs import job_result, submit_job, wait_job
+from data.state_store import load_thread, save_thread
+from model.monthly_model import run_monthly_model_for_portfolio
+from model.backtest import run_walk_forward_backtest
 
 from agents.intake import ask_next_question, apply_intake_answer
 from agents.policy_writer import build_policy_from_profile, policy_to_text
 
-from agents.order_planner import build_order_plan
+from agents.order_planner import build_batch_order_plan, plan_orders_for_budgets, split_budget
 from model.reason_explainer import explain_reason_codes
 
 from agents.output_formatter import format_allocation_output
 
 from data.db import (
+    turn_cache,
     ensure_user,
     load_profile,
     load_active_profile,
@@ -70,6 +83,7 @@ class AppState(TypedDict, total=False):
     interview_step: str  # "ASK_GOAL" | "ASK_RISK" | "SHOW_RESULT" 등
     recommended_portfolio: Dict[str, Any]  # {tickers: [...], rationale: ...}
     simulation_data: Dict[str, Any]  # {history: [...], forecast: [...]}
+    pending_job: Optional[Dict[str, Any]]  # {job_id, kind, ...} 백그라운드 작업 진행 중이면 설정
 
 
 def _filter_kwargs_for_dataclass(dc_cls, data: dict) -> dict:
@@ -102,13 +116,65 @@ def _fmt_krw(x: Any) -> str:
         return str(x)
 
 
+def _portfolio_weights(portfolio: Dict[str, Any]) -> Dict[str, float]:
+    return {t['symbol']: t['weight'] for t in (portfolio or {}).get('tickers', [])}
+
+
+def _sim_horizon(state: AppState) -> int:
+    # 투자 기간 (기본 120개월)
+    horizon = 120
+    if state.get("profile") and state["profile"].get("horizon_months"):
+        try:
+            horizon = int(state["profile"]["horizon_months"])
+        except:
+            pass
+    return horizon
+
+
+def _prefetch_portfolio_simulation(state: AppState, portfolio: Dict[str, Any]) -> None:
+    # 다음 요청은 대부분 "시뮬레이션 보여줘" -> 백그라운드에서 미리 시작 (실패해도 무시)
+    try:
+        prefetch_simulation(_portfolio_weights(portfolio), months=_sim_horizon(state))
+    except Exception as e:
+        print(f"Simulation prefetch failed: {e}")
+
+
+def _portfolio_order_text(state: AppState, portfolio: Dict[str, Any]) -> str:
+    """
+    추천 포트폴리오 + 월 투자금 -> 이번 달 주문 목록 텍스트 (시세 조회 실패 시 빈 문자열)
+    """
+    budget = (state.get("profile") or {}).get("monthly_budget_krw")
+    weights = {}
+    for t in (portfolio or {}).get("tickers", []) or []:
+        try:
+            weights[str(t["symbol"]).upper()] = float(t["weight"])
+        except (KeyError, TypeError, ValueError):
+            continue
+    if not budget or not weights:
+        return ""
+
+    try:
+        batch = build_batch_order_plan(weights, int(budget))
+    except Exception as e:
+        print(f"Order plan failed: {e}")
+        return ""
+
+    lines = [f"🧾 **이번 달 주문 목록** (월 {_fmt_krw(batch['budget_krw'])}, 환율 {batch['fx_krw_per_usd']:,}원/$)"]
+    for o in batch["orders"]:
+        lines.append(
+            f"- {o['ticker']} ({o['weight']:.0%}): {o['shares']:.4f}주 × ${o['price_usd']:.2f} → {_fmt_krw(o['used_krw'])}"
+        )
+    if batch["missing"]:
+        lines.append(f"- ⚠️ 시세 조회 실패: {', '.join(batch['missing'])}")
+    lines.append(f"- 사용 {_fmt_krw(batch['used_krw'])} / 남는 금액 {_fmt_krw(batch['leftover_krw'])}")
+    return "\n".join(lines)
+
+
 # =========================================================
 # ✅ Stock Recommendation & Simulation Nodes
 # =========================================================
 def node_stock_interview(state: AppState) -> AppState:
-    from langchain_openai import ChatOpenAI
     from langchain_core.messages import SystemMessage, HumanMessage
-    import json
     # 필요시 추가 import
 
     user_text = state.get("user_text", "")
@@ -177,12 +243,15 @@ def node_stock_interview(state: AppState) -> AppState:
                 r = tk['reason'].replace("\\n", "\n")
                 tickers_desc_list.append(f"- **{tk['symbol']}** ({float(tk['weight'])*100:.0f}%): {r}")
             tickers_desc = "\n".join(tickers_desc_list)
+            order_text = _portfolio_order_text(state, rec)
+            _prefetch_portfolio_simulation(state, rec)
             
             state["interview_step"] = "SHOW_RESULT"
             state["output_text"] = (
                 f"📂 **저장된 포트폴리오를 불러왔습니다.**\n\n"
                 f"{rationale}\n\n"
                 f"{tickers_desc}\n\n"
+                + (f"{order_text}\n\n" if order_text else "") +
                 "📊 이 포트폴리오의 **미래 시뮬레이션**을 보시겠어요?\n"
                 "(‘네’ 또는 ‘보여줘’라고 말해주세요)"
             )
@@ -220,20 +289,13 @@ def node_stock_interview(state: AppState) -> AppState:
         state["interview_step"] = "SHOW_RESULT"
         
         # LLM 호출
-        llm = ChatOpenAI(model="gpt-4", temperature=0.7)
+        llm = get_llm("gpt-4", temperature=0.7)
         
         system_prompt = (
             "You are a professional portfolio manager named 'RulePilot'.\n"
             "Based on the user's investment goal and interested sectors, recommend a diversified portfolio of 3-5 US ETFs or stocks.\n"
             "The user wants a portfolio that will likely rise in the long term (Structural Growth).\n"
-            "Output MUST be a JSON object with this structure:\n"
-            "{\n"
-            "  \"rationale\": \"Brief explanation of the portfolio strategy (Korean)\",\n"
-            "  \"tickers\": [\n"
-            "    {\"symbol\": \"QQQ\", \"weight\": 0.4, \"reason\": \"Detailed reason including sector fit...\"},\n"
-            "    {\"symbol\": \"SCHD\", \"weight\": 0.3, \"reason\": \"...\"}\n"
-            "  ]\n"
-            "}\n"
+            "Return the portfolio through the provided schema (rationale and reasons in Korean).\n"
             "Ensure the sum of weights is 1.0.\n"
             "Prioritize assets with strong historical uptrends (e.g., SPY, QQQ, VIG, NVDA, MSFT) if appropriate.\n"
             "Reflect the user's interested sector if valid (e.g., if 'AI', include SOXX or NVDA).\n"
@@ -245,53 +307,42 @@ def node_stock_interview(state: AppState) -> AppState:
         )
         
         try:
-            resp = llm.invoke([
+            # 스키마 강제 생성 (형식이 깨지면 싼 모델로 한 번만 복구)
+            portfolio_data = generate_portfolio(llm, [
                 SystemMessage(content=system_prompt),
                 HumanMessage(content=f"User's goal: {goal}\nUser's interest: {sector}")
-            ])
-            
-            content = resp.content.strip()
-            # JSON 파싱 (마크다운 코드블록 제거)
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0].strip()
-            
-            # 괄호 등 잘못된 문자열 정제 시도
-            if content.startswith("{"):
-                 portfolio_data = json.loads(content)
-                 state["recommended_portfolio"] = portfolio_data
-                 
-                 # 줄바꿈 문자(\n)가 리터럴로 나오는 문제 해결 -> 실제 줄바꿈으로 변환
-                 # JSON 파싱 되면 문자열 내부의 \n은 이미 제어문자가 되지만, 
-                 # LLM이 \\n 이라고 줬을 수도 있으므로 replace
-                 rationale = portfolio_data['rationale'].replace("\\n", "\n")
-                 
-                 # 티커 설명도 마찬가지
-                 tickers_desc_list = []
-                 for t in portfolio_data['tickers']:
-                     r = t['reason'].replace("\\n", "\n")
-                     tickers_desc_list.append(f"- **{t['symbol']}** ({float(t['weight'])*100:.0f}%): {r}")
-                 
-                 tickers_desc = "\n".join(tickers_desc_list)
-
-                 # ✅ 추천 결과 DB 자동 저장 제거 -> 확인 단계 추가
-                 
-                 state["output_text"] = (
-                     f"🚀 **추천 포트폴리오 제안**\n\n"
-                     f"{rationale}\n\n"
-                     f"{tickers_desc}\n\n"
-                     "💾 **이 포트폴리오를 저장하시겠습니까?**\n"
-                     "(‘네’라고 하면 저장하고, ‘아니오’라고 하면 저장하지 않아요)"
-                 )
-                 state["interview_step"] = "ASK_SAVE"
-            else:
-                 raise ValueError("Invalid JSON format")
-
+            ]).to_state()
+        except PortfolioSchemaError as e:
+            # 인터뷰는 유지 -> 관심 분야를 다시 말하면 이어서 재시도
+            print(f"Portfolio schema error: {e}")
+            state["output_text"] = (
+                "죄송합니다. 포트폴리오 결과를 정리하지 못했어요.\n\n"
+                "관심 있는 **산업 분야**나 **테마**를 한 번 더 말씀해주시면 다시 만들어볼게요."
+            )
+            state["interview_step"] = "ASK_SECTOR"
+            return state
         except Exception as e:
             state["output_text"] = f"죄송합니다. 포트폴리오 생성 중 오류가 발생했습니다.\n{str(e)}"
             state["interview_step"] = None # 리셋
+            return state
 
+        state["recommended_portfolio"] = portfolio_data
+        tickers_desc = "\n".join(
+            f"- **{t['symbol']}** ({t['weight']*100:.0f}%): {t['reason']}" for t in portfolio_data["tickers"]
+        )
+        order_text = _portfolio_order_text(state, portfolio_data)
+        _prefetch_portfolio_simulation(state, portfolio_data)
+
+        # ✅ 추천 결과 DB 자동 저장 제거 -> 확인 단계 추가
+        state["output_text"] = (
+            f"🚀 **추천 포트폴리오 제안**\n\n"
+            f"{portfolio_data['rationale']}\n\n"
+            f"{tickers_desc}\n\n"
+            + (f"{order_text}\n\n" if order_text else "") +
+            "💾 **이 포트폴리오를 저장하시겠습니까?**\n"
+            "(‘네’라고 하면 저장하고, ‘아니오’라고 하면 저장하지 않아요)"
+        )
+        state["interview_step"] = "ASK_SAVE"
         return state
 
     # 4. 저장 여부 확인
@@ -333,29 +384,11 @@ def node_stock_interview(state: AppState) -> AppState:
             return state
 
         # 단순 질문/답변 처리
-        llm = ChatOpenAI(model="gpt-4", temperature=0.7)
-        
-        # 포트폴리오 정보를 컨텍스트로 제공
-        context_str = json.dumps(port_data, ensure_ascii=False)
-        
-        system_prompt = (
-            "You are a professional portfolio manager named 'RulePilot'.\n"
-            "The user takes a look at the recommended portfolio and asks a question.\n"
-            f"Current Portfolio Context: {context_str}\n"
-            "Answer the user's question specifically regarding this portfolio.\n"
-            "If the user asks for a comparison (e.g., VHT vs SPY), provide a logical investment perspective.\n"
-            "Keep the answer concise and helpful (Korean).\n\n"
-            "!!! IRON RULES (MUST FOLLOW) !!!\n"
-            "1. The goal is NOT to make money, but NOT TO LOSE money.\n"
-            "2. Keep Rule #1.\n"
-            "Always advise caution and emphasize risk management (MDD) in your answers."
-        )
-        
-        resp = llm.invoke([
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=user_text)
-        ])
-        
+        llm = get_llm("gpt-4", temperature=0.7)
+
+        # 고정 시스템 프롬프트 + 티커/비중/짧은 태그만 담은 포트폴리오 컨텍스트 (토큰 예산 이내)
+        resp = llm.invoke(build_portfolio_qa_messages(port_data, user_text))
+
         state["output_text"] = (
             f"{resp.content}\n\n"
             "📊 **시뮬레이션**을 보시려면 '시뮬레이션 보여줘'라고 말씀해주세요."
@@ -371,55 +404,43 @@ def node_portfolio_simulation(state: AppState) -> AppState:
         state["output_text"] = "⚠️ 추천된 포트폴리오가 없습니다. 먼저 종목 추천을 받아주세요."
         return state
 
-    portfolio = {t['symbol']: t['weight'] for t in port_data['tickers']}
-    
-    # 투자 기간 (기본 120개월)
-    horizon = 120
-    if state.get("profile") and state["profile"].get("horizon_months"):
-        try:
-            horizon = int(state["profile"]["horizon_months"])
-        except:
-            pass
+    portfolio = _portfolio_weights(port_data)
+    horizon = _sim_horizon(state)
 
+    # 시뮬레이션은 작업 큐에서 실행 (추천을 보여줄 때 미리 시작해 둔 작업이 있으면 그걸 이어받음)
+    # 1. 일반 시뮬레이션 (과거 + 미래) + 2. 위기 상황 스트레스 테스트
+    # 결과는 complete_pending_job()이 작업 완료 후 output_text로 만듦
+    state["pending_job"] = {
+        "job_id": simulation_job(portfolio, months=horizon),
+        "kind": "simulation",
+        "horizon": horizon,
+    }
     state["output_text"] = "⏳ 과거 데이터 분석 및 미래 시뮬레이션 중입니다... 잠시만 기다려주세요."
-    
-    try:
-        # 시뮬레이션 실행
-        # 1. 일반 시뮬레이션 (과거 + 미래)
-        sim_result = simulate_portfolio_history(portfolio, months=horizon)
-        
-        # 2. 위기 상황 스트레스 테스트 (New)
-        try:
-            crisis_result = backtest_crisis_scenarios(portfolio)
-            sim_result["crisis_test"] = crisis_result
-        except Exception as e:
-            print(f"Crisis test failed: {e}")
-            sim_result["crisis_test"] = []
-        
-        if "error" in sim_result:
-            state["output_text"] = f"데이터 로드 실패: {sim_result['error']}"
-            return state
-            
-        state["simulation_data"] = sim_result
-        
-        metrics = sim_result.get("metrics", {})
-        cagr = metrics.get('cagr_history', 0) * 100
-        vol = metrics.get('vol_history', 0) * 100
-        
-        state["output_text"] = (
-            f"✅ **시뮬레이션 완료!**\n\n"
-            f"📊 **과거 성과 분석 (Backtest)**\n"
-            f"- 연평균 수익률 (CAGR): **{cagr:.1f}%**\n"
-            f"- 연 변동성 (Risk): {vol:.1f}%\n\n"
-            f"🔮 **미래 예측 (Monte Carlo, {horizon}개월)**\n"
-            f"- 아래 차트에서 예상되는 자산 가치 범위를 확인하세요.\n"
-            f"- 점선 영역은 90% 확률 범위입니다.\n\n"
-            f"> *주의: 과거의 성과가 미래의 수익을 보장하지 않습니다.*"
-        )
-        
-    except Exception as e:
-        state["output_text"] = f"시뮬레이션 중 오류 발생: {str(e)}"
+    return state
+
 
+def _finish_simulation(state: AppState, sim_result: Dict[str, Any], job: Dict[str, Any]) -> AppState:
+    horizon = job.get("horizon", 120)
+    if "error" in sim_result:
+        state["output_text"] = f"데이터 로드 실패: {sim_result['error']}"
+        return state
+        
+    state["simulation_data"] = sim_result
+    
+    metrics = sim_result.get("metrics", {})
+    cagr = metrics.get('cagr_history', 0) * 100
+    vol = metrics.get('vol_history', 0) * 100
+    
+    state["output_text"] = (
+        f"✅ **시뮬레이션 완료!**\n\n"
+        f"📊 **과거 성과 분석 (Backtest)**\n"
+        f"- 연평균 수익률 (CAGR): **{cagr:.1f}%**\n"
+        f"- 연 변동성 (Risk): {vol:.1f}%\n\n"
+        f"🔮 **미래 예측 (Monte Carlo, {horizon}개월)**\n"
+        f"- 아래 차트에서 예상되는 자산 가치 범위를 확인하세요.\n"
+        f"- 점선 영역은 90% 확률 범위입니다.\n\n"
+        f"> *주의: 과거의 성과가 미래의 수익을 보장하지 않습니다.*"
+    )
     return state
 
 
@@ -512,42 +533,12 @@ def node_build_policy(state: AppState) -> AppState:
 
 
 def node_route(state: AppState) -> AppState:
-    if state.get("pending_confirm_reset"):
-        state["intent"] = "EDIT_CONFIRM"
-        return state
-
-    text = state.get("user_text", "")
-    
-    # ✅ 시뮬레이션 직행 (인터뷰 완료 상태에서 '보여줘' 등)
-    if state.get("interview_step") == "SHOW_RESULT":
-        if any(w in text for w in ["보여줘", "시뮬레이션", "예", "응", "그래"]):
-            state["intent"] = "RUN_SIMULATION"
-            return state
-    
-    # ✅ 인터뷰 진행 중 (기존 추천 확인 포함)
-    if state.get("interview_step") in ["ASK_GOAL", "ASK_RISK", "ASK_SECTOR", "CHECK_EXISTING", "SHOW_RESULT", "ASK_SAVE"]:
-         state["intent"] = "RECOMMEND_STOCK"
-         return state
-
-    # ✅ 시장 브리핑 (RAG)
-    market_keywords = [
-        "시장", "뉴스", "시황", "분위기", "전망", "trend", "market",
-        "경제", "증시", "지수", "장세", "나스닥", "다우", "S&P", "에스앤피",
-        "장이", "장 상황", "장 흐름"
-    ]
-    if any(w in text for w in market_keywords) or "어때" in text:
-        if "추천" not in text: # 추천 요청과 겹치지 않게
-            state["intent"] = "MARKET_INFO"
-            return state
-
-    # 기본 라우팅
-    intent = route_intent(text)
-    
-    # "추천해줘", "어떤 종목" 등이면 RECOMMEND_STOCK으로 오버라이드
-    if "추천" in text or "종목" in text or "살까" in text:
-        intent = "RECOMMEND_STOCK"
-
-    state["intent"] = intent
+    # 우선순위: 초기화 확인 -> 시뮬레이션 직행 -> 인터뷰 진행 -> 시장 브리핑 -> 추천 -> 기본 라우팅
+    state["intent"] = route_turn(
+        state.get("user_text", ""),
+        interview_step=state.get("interview_step"),
+        pending_confirm_reset=bool(state.get("pending_confirm_reset")),
+    ).intent
     return state
 
 
@@ -580,9 +571,32 @@ def node_onboard(state: AppState) -> AppState:
     return state
 
 
+def _equity_bucket_weights(state: AppState) -> Dict[str, float]:
+    """
+    월간 신호/주문/백테스트에 쓰는 주식 바스켓: 추천 포트폴리오(현재 state -> 저장된 최근 추천)에서
+    채권/금/현금성을 뺀 주식 종목 비중 (합 1). 없으면 QQQ 단독.
+    """
+    rec = state.get("recommended_portfolio")
+    if not rec:
+        from data.db import load_latest_recommendation
+        profile_id, _ = load_active_profile(state.get("user_id") or "local")
+        rec = load_latest_recommendation(state.get("user_id") or "local", profile_id)
+
+    weights: Dict[str, float] = {}
+    for t in (rec or {}).get("tickers", []) or []:
+        try:
+            weights[str(t["symbol"]).upper()] = float(t["weight"])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return equity_bucket(weights)
+
+
 def node_run_model_if_needed(state: AppState) -> AppState:
-    if "month_signal" not in state:
-        signal = run_monthly_model_from_market(ticker="QQQ")
+    # 달이 바뀌었거나 추천 포트폴리오가 바뀌어 주식 바스켓이 달라지면 신호도 다시 계산
+    basket = _equity_bucket_weights(state)
+    prev = state.get("month_signal") or {}
+    if prev.get("yyyymm") != yyyymm_now() or prev.get("basket") != basket:
+        signal = run_monthly_model_for_portfolio(basket)
         state["month_signal"] = to_dict(signal)
     return state
 
@@ -613,27 +627,25 @@ def node_allocate(state: AppState) -> AppState:
     prof = Profile(**merged_profile)
 
     # 2) 월간 시그널/계획 생성
-    sig = MonthSignal(**state["month_signal"])
+    sig = MonthSignal(**_filter_kwargs_for_dataclass(MonthSignal, state["month_signal"]))
     plan = build_portfolio_plan(prof, sig)
     state["portfolio_plan"] = to_dict(plan)
 
-    # 3) 주문 계획(예시)
-    equity_ticker = "QQQ"
-    safe_ticker = "BIL"
+    # 3) 주문 계획: 신호를 계산한 주식 바스켓 그대로 + 안전자산
+    basket = sig.basket or _equity_bucket_weights(state)
+    equity_ticker = "+".join(basket)
+    safe_ticker = SAFE_TICKER
     fx = 1350  # MVP 고정 환율(원/달러)
 
-    equity_order = build_order_plan(
-        equity_ticker,
-        plan.equity_amount_krw,
-        fx_krw_per_usd=fx,
-        allow_fractional=True,
-    )
-    safe_order = build_order_plan(
-        safe_ticker,
-        plan.safe_amount_krw,
-        fx_krw_per_usd=fx,
-        allow_fractional=True,
-    )
+    # 바스켓 + 안전자산 시세를 한 번에 조회
+    budgets = split_budget(basket, plan.equity_amount_krw)
+    budgets[safe_ticker] = plan.safe_amount_krw
+    batch = plan_orders_for_budgets(budgets, fx_krw_per_usd=fx, allow_fractional=True)
+    by_ticker = {o["ticker"]: o for o in batch["orders"]}
+    if batch["missing"]:
+        raise RuntimeError(f"가격을 못 가져왔어요: {', '.join(batch['missing'])}")
+    equity_orders = [by_ticker[t] for t in basket]
+    safe_order = by_ticker[safe_ticker]
 
     # 4) 이유 텍스트(설명용)
     reason_text = explain_reason_codes(getattr(sig, "reason_codes", []))
@@ -643,9 +655,19 @@ def node_allocate(state: AppState) -> AppState:
     base_output = {
         "plan": plan,
         "signal": sig,
-        "orders": {"equity": equity_order, "safe": safe_order},
+        "orders": {"equity": equity_orders, "safe": safe_order},
         "reason_text": reason_text,
     }
+    if user_level == "advanced":
+        # 숙련자에게만: 같은 바스켓에 이 규칙을 적용한 과거 성과(워크포워드 백테스트)
+        try:
+            base_output["backtest"] = run_walk_forward_backtest(
+                monthly_budget_krw=int(prof.monthly_budget_krw),
+                safe_ticker=safe_ticker,
+                equity_weights=basket,
+            )
+        except Exception as e:
+            print(f"Backtest failed: {e}")
     state["output_text"] = format_allocation_output(base_output, user_level)
 
     # 6) ✅ 히스토리 저장(딱 1번만, plan_json에 다 넣기)
@@ -655,9 +677,10 @@ def node_allocate(state: AppState) -> AppState:
         **to_dict(plan),
         "as_of": yyyymm_now(),  # 예: "202601"
         "equity_ticker": equity_ticker,
+        "equity_basket": basket,
         "safe_ticker": safe_ticker,
         "fx_krw_per_usd": fx,
-        "orders": {"equity": equity_order, "safe": safe_order},
+        "orders": {"equity": equity_orders, "safe": safe_order},
         "reason_codes": getattr(sig, "reason_codes", []),
         "equity_weight": float(sig.equity_weight),
         "safe_weight": float(sig.safe_weight),
@@ -1041,73 +1064,131 @@ def node_history_3m(state: AppState) -> AppState:
 # ✅ RAG Node: Market Briefing
 # =========================================================
 def node_market_briefing(state: AppState) -> AppState:
-    from langchain_community.tools import DuckDuckGoSearchRun
-    from langchain_openai import ChatOpenAI
-    from langchain_core.messages import SystemMessage, HumanMessage
-
     state["output_text"] = "🔍 최신 시장 뉴스를 검색하고 있습니다... 잠시만 기다려주세요."
     
     # 1. 검색어 설정 (사용자 질문에 따라 동적 변경)
     user_text = state.get("user_text", "")
     
-    # 단순 시장 질문인지, 특정 종목 질문인지 판단
-    target_ticker = None
-    # 대문자로 변환하여 티커 찾기 (간단한 로직)
-    import re
-    # 영어 대문자 2~5글자 혹은 한글 종목명 추정
-    # 여기서는 간단히 사용자 텍스트를 그대로 쿼리에 반영
-    
-    if "시장" in user_text or "장" in user_text:
-        query = "최신 미국 증시 전망 및 주요 뉴스 latest US stock market news"
-        focus = "market"
-    else:
-        # "TQQQ 어때?" -> "TQQQ 전망 분석"
-        query = f"{user_text} 주가 전망 분석 news analysis"
-        focus = "stock"
+    # 단순 시장 질문인지, 특정 종목 질문인지 판단 + 검색어 변형 (시장/티커, 한/영)
+    focus, queries = build_queries(user_text)
+    query = queries[0]
 
+    # 같은 검색어의 브리핑은 몇 분 동안 캐시 재사용 ("시장 어때?" 류는 모두 같은 검색어)
+    cached = get_cached("MARKET_INFO", query)
+    if cached is not None:
+        state["output_text"] = (
+            f"📰 **최신 시장 브리핑**\n\n"
+            f"{cached}\n\n"
+            "💡 이 정보를 바탕으로 **[종목 추천]**을 받아보시겠어요?"
+        )
+        return state
+
+    # 검색 + LLM 요약은 작업 큐에서 실행 (complete_pending_job()이 결과를 output_text로)
+    state["pending_job"] = {
+        "job_id": submit_job("market_briefing", _market_briefing_job, user_text, focus, query),
+        "kind": "market_briefing",
+    }
+    return state
+
+
+def _market_briefing_job(
+    user_text: str,
+    focus: str,
+    query: str,
+    progress: Optional[Callable[[float, str], None]] = None,
+) -> str:
+    from langchain_core.messages import SystemMessage, HumanMessage
+
+    def report(pct: float, msg: str) -> None:
+        if progress:
+            progress(pct, msg)
+
+    # 변형 검색어를 동시에 검색 (검색어별 타임아웃 + 전체 마감), 중복 제거 후 토큰 예산만큼만
+    report(0.05, "뉴스 검색 중")
+    search_ok = True
     try:
-        search = DuckDuckGoSearchRun()
-        search_result = search.invoke(query)
+        found = search_market(user_text)
+        search_result = found["text"]
+        if not found["ok"] or not search_result:
+            search_ok = False
+            search_result = "검색 결과를 시간 안에 가져오지 못했습니다."
     except Exception as e:
+        search_ok = False
         search_result = f"검색 중 오류 발생: {str(e)}"
 
     # 2. LLM 요약 및 인사이트 도출
-    try:
-        llm = ChatOpenAI(model="gpt-4", temperature=0.7)
-        
-        if focus == "market":
-            system_prompt = (
-                "You are a professional financial analyst named 'RulePilot'.\n"
-                "Analyze the provided search results about the US stock market.\n"
-                "Summarize the key trends, risks, and opportunities in 3 bullet points.\n"
-                "Finally, give a brief investment advice based on the 'Iron Rule': 'Don't lose money'.\n"
-                "Answer in Korean, friendly and professional tone."
-            )
-        else:
-            system_prompt = (
-                "You are a professional financial analyst named 'RulePilot'.\n"
-                "The user asked about a specific stock/ETF.\n"
-                "Analyze the provided search results to summarize:\n"
-                "1. Recent Performance & Trend\n"
-                "2. Key News or Catalysts\n"
-                "3. Risk Factors (Iron Rules perspective)\n"
-                "Conclude with a cautious stance emphasized on downside protection.\n"
-                "Answer in Korean, friendly and professional tone."
-            )
-        
-        resp = llm.invoke([
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=f"User Question: {user_text}\n\nSearch Result:\n{search_result}")
-        ])
-        
-        state["output_text"] = (
-            f"📰 **최신 시장 브리핑**\n\n"
-            f"{resp.content}\n\n"
-            "💡 이 정보를 바탕으로 **[종목 추천]**을 받아보시겠어요?"
+    report(0.5, "검색 결과 요약 중")
+    llm = get_llm("gpt-4", temperature=0.7)
+    
+    if focus == "market":
+        system_prompt = (
+            "You are a professional financial analyst named 'RulePilot'.\n"
+            "Analyze the provided search results about the US stock market.\n"
+            "Summarize the key trends, risks, and opportunities in 3 bullet points.\n"
+            "Finally, give a brief investment advice based on the 'Iron Rule': 'Don't lose money'.\n"
+            "Answer in Korean, friendly and professional tone."
         )
-    except Exception as e:
-        state["output_text"] = f"시장 브리핑 생성 중 오류가 발생했습니다.\n{str(e)}"
+    else:
+        system_prompt = (
+            "You are a professional financial analyst named 'RulePilot'.\n"
+            "The user asked about a specific stock/ETF.\n"
+            "Analyze the provided search results to summarize:\n"
+            "1. Recent Performance & Trend\n"
+            "2. Key News or Catalysts\n"
+            "3. Risk Factors (Iron Rules perspective)\n"
+            "Conclude with a cautious stance emphasized on downside protection.\n"
+            "Answer in Korean, friendly and professional tone."
+        )
+    
+    resp = llm.invoke([
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=f"User Question: {user_text}\n\nSearch Result:\n{search_result}")
+    ])
+    if search_ok and resp.content:
+        put_cached("MARKET_INFO", query, resp.content)
+    return resp.content
+
+
+def _finish_market_briefing(state: AppState, content: str, job: Dict[str, Any]) -> AppState:
+    state["output_text"] = (
+        f"📰 **최신 시장 브리핑**\n\n"
+        f"{content}\n\n"
+        "💡 이 정보를 바탕으로 **[종목 추천]**을 받아보시겠어요?"
+    )
+    return state
+
+
+# pending_job.kind -> (결과 -> output_text 만드는 함수, 실패 시 안내 문구)
+_JOB_FINISHERS = {
+    "simulation": (_finish_simulation, "시뮬레이션 중 오류 발생"),
+    "market_briefing": (_finish_market_briefing, "시장 브리핑 생성 중 오류가 발생했습니다."),
+}
 
+
+def complete_pending_job(state: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    state["pending_job"]의 작업이 끝나면(최대 timeout초 대기) 결과로 output_text 등을 채우고 pending_job 해제.
+    아직 안 끝났으면 state를 그대로 반환 (pending_job 유지).
+    """
+    job = state.get("pending_job")
+    if not job:
+        return state
+
+    snap = wait_job(job["job_id"], timeout)
+    if snap is not None and snap["status"] not in ("done", "error"):
+        return state
+
+    finish, fail_msg = _JOB_FINISHERS.get(job.get("kind"), (None, "작업 처리 중 오류가 발생했습니다."))
+    try:
+        if snap is None:
+            raise RuntimeError("작업 정보를 찾을 수 없어요(만료됨). 다시 요청해 주세요.")
+        # 같은 작업 키로 묶인 세션들이 결과 객체를 공유하므로 세션별 복사본을 state에 넣음
+        result = copy.deepcopy(job_result(job["job_id"]))
+        if finish is not None:
+            state = finish(state, result, job)
+    except Exception as e:
+        state["output_text"] = f"{fail_msg}\n{str(e)}"
+    state["pending_job"] = None
     return state
 
 # =========================================================
@@ -1131,44 +1212,88 @@ def route_by_intent(state: AppState) -> str:
     return state.get("intent", "ALLOCATE")
 
 
+# =========================================================
+# Node observers (부하 테스트/프로파일링용)
+# =========================================================
+# observer(node_name, elapsed_s, error): 노드가 끝날 때마다 호출 (등록된 게 없으면 오버헤드 없음)
+NodeObserver = Callable[[str, float, Optional[BaseException]], None]
+_NODE_OBSERVERS: List[NodeObserver] = []
+
+
+def add_node_observer(fn: NodeObserver) -> None:
+    if fn not in _NODE_OBSERVERS:
+        _NODE_OBSERVERS.append(fn)
+
+
+def remove_node_observer(fn: NodeObserver) -> None:
+    if fn in _NODE_OBSERVERS:
+        _NODE_OBSERVERS.remove(fn)
+
+
+def _observed(name: str, fn: Callable[[AppState], AppState]) -> Callable[[AppState], AppState]:
+    def run(state: AppState) -> AppState:
+        if not _NODE_OBSERVERS:
+            return fn(state)
+        t0 = time.perf_counter()
+        err: Optional[BaseException] = None
+        try:
+            return fn(state)
+        except BaseException as e:
+            err = e
+            raise
+        finally:
+            elapsed = time.perf_counter() - t0
+            for obs in list(_NODE_OBSERVERS):
+                try:
+                    obs(name, elapsed, err)
+                except Exception as e:
+                    print(f"Node observer failed: {e}")
+
+    run.__name__ = getattr(fn, "__name__", name)
+    return run
+
+
 # =========================================================
 # Build graph
 # =========================================================
 def build_app():
     g = StateGraph(AppState)
 
+    def add_node(name: str, fn: Callable[[AppState], AppState]) -> None:
+        g.add_node(name, _observed(name, fn))
+
     # Nodes
-    g.add_node("ensure_defaults", node_ensure_defaults)
+    add_node("ensure_defaults", node_ensure_defaults)
 
-    g.add_node("intake", node_intake)
-    g.add_node("intake_answer", node_intake_answer)
-    g.add_node("build_policy", node_build_policy)
+    add_node("intake", node_intake)
+    add_node("intake_answer", node_intake_answer)
+    add_node("build_policy", node_build_policy)
 
-    g.add_node("route", node_route)
-    g.add_node("term_qa", node_term_qa)
-    g.add_node("onboard", node_onboard)
+    add_node("route", node_route)
+    add_node("term_qa", node_term_qa)
+    add_node("onboard", node_onboard)
 
-    g.add_node("run_model_if_needed", node_run_model_if_needed)
-    g.add_node("allocate", node_allocate)
-    g.add_node("maybe_decide", node_maybe_decide)
+    add_node("run_model_if_needed", node_run_model_if_needed)
+    add_node("allocate", node_allocate)
+    add_node("maybe_decide", node_maybe_decide)
 
     # 설정 변경(confirm) 플로우
-    g.add_node("edit_settings_request", node_edit_settings_request)
-    g.add_node("edit_settings_confirm", node_edit_settings_confirm)
+    add_node("edit_settings_request", node_edit_settings_request)
+    add_node("edit_settings_confirm", node_edit_settings_confirm)
 
     # Profile multi management
-    g.add_node("profile_list", node_profile_list)
-    g.add_node("profile_switch", node_profile_switch)
-    g.add_node("profile_rename", node_profile_rename)
+    add_node("profile_list", node_profile_list)
+    add_node("profile_switch", node_profile_switch)
+    add_node("profile_rename", node_profile_rename)
 
     # ✅ History nodes
-    g.add_node("history_last_month", node_history_last_month)
-    g.add_node("history_3m", node_history_3m)
+    add_node("history_last_month", node_history_last_month)
+    add_node("history_3m", node_history_3m)
 
     # ✅ Stock & Simulation
-    g.add_node("stock_interview", node_stock_interview)
-    g.add_node("portfolio_simulation", node_portfolio_simulation)
-    g.add_node("market_briefing", node_market_briefing)
+    add_node("stock_interview", node_stock_interview)
+    add_node("portfolio_simulation", node_portfolio_simulation)
+    add_node("market_briefing", node_market_briefing)
 
     # Entry
     g.set_entry_point("ensure_defaults")
@@ -1254,3 +1379,53 @@ def build_app():
     g.add_edge("maybe_decide", END)
 
     return g.compile()
+
+
+# 컴파일된 그래프는 상태를 갖지 않음 (세션 상태는 invoke 인자로만 전달)
+# -> 프로세스당 한 번만 컴파일해서 모든 세션이 공유
+_APP = None
+_APP_LOCK = threading.Lock()
+
+
+def get_app():
+    """
+    프로세스 공용 컴파일 그래프. 세션 시작/사용자 전환/대화 초기화 때 다시 build_app() 하지 말고 이걸 사용.
+    """
+    global _APP
+    if _APP is None:
+        with _APP_LOCK:
+            if _APP is None:
+                _APP = build_app()
+    return _APP
+
+
+def run_turn(state: Dict[str, Any], wait_jobs: bool = False) -> Dict[str, Any]:
+    """
+    한 턴 실행: 공용 그래프 invoke + 턴 단위 DB 읽기 캐시
+    (같은 턴에서 active profile / 추천 등을 여러 노드가 읽어도 DB는 엔티티당 1번)
+    wait_jobs=True면 백그라운드 작업(pending_job)까지 끝난 결과를 반환 (CLI/배치용)
+    """
+    with turn_cache():
+        out = get_app().invoke(state)
+    if wait_jobs and isinstance(out, dict) and out.get("pending_job"):
+        out = complete_pending_job(dict(out))
+    return out
+
+
+def run_thread_turn(
+    thread_id: str,
+    updates: Dict[str, Any],
+    state: Optional[Dict[str, Any]] = None,
+    wait_jobs: bool = False,
+) -> Dict[str, Any]:
+    """
+    체크포인트 기반 한 턴: (state가 없으면) 스레드 마지막 상태에서 이어서 실행하고,
+    끝난 뒤 바뀐 키만 저장. 프로세스를 다시 띄워도 같은 thread_id면 대화가 이어짐.
+    """
+    if state is None:
+        state = load_thread(thread_id)
+    state.update(updates)
+    out = run_turn(state, wait_jobs=wait_jobs)
+    if isinstance(out, dict):
+        save_thread(thread_id, out)
+    return out
@@ -0,0 +1,202 @@
+from __future__ import annotations
+from datetime import date
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from model.data_loader import load_price_history, load_price_matrix
+from model.monthly_model import (
+    DEFAULT_PARAMS,
+    ModelParams,
+    _equity_weight,
+    _extract_close,
+    daily_scores,
+    daily_scores_matrix,
+    vol_score_from_vol20,
+)
+
+
+def month_end_features(eq_close: pd.Series, safe_close: pd.Series, years: int | None = 20) -> Dict[str, np.ndarray]:
+    """
+    월말 기준 워크포워드 입력값을 한 번에 계산.
+    - 신호(trend/vol)는 그 월말까지의 일봉만으로 계산 (미래 데이터 사용 없음)
+    - r_eq / r_safe[k]: 월말 k -> 월말 k+1 구간 수익률 (마지막 월은 0)
+    years가 있으면 마지막 years년 구간만 평가 (신호 워밍업은 전체 데이터 사용)
+    """
+    eq_scores = daily_scores(eq_close)
+    px = pd.concat(
+        [pd.to_numeric(eq_close, errors="coerce"), pd.to_numeric(safe_close, errors="coerce")],
+        axis=1,
+        keys=["eq", "safe"],
+    ).ffill().dropna()
+    # vol20 원값만 (vol_score는 simulate_monthly_rule이 params로 다시 계산 -> 파라미터 스윕용)
+    px = px.join(eq_scores[["trend_score", "vol20"]], how="inner")
+    return _month_end_rows(px, years)
+
+
+def basket_month_end_features(
+    eq_closes: pd.DataFrame,
+    weights: Dict[str, float],
+    safe_close: pd.Series,
+    years: int | None = 20,
+) -> Dict[str, np.ndarray]:
+    """
+    주식 바스켓(여러 티커) 버전의 month_end_features.
+    - 신호: 티커별 trend/vol 점수를 비중으로 가중평균 (run_monthly_model_for_portfolio와 같은 규칙)
+    - r_eq: 바스켓 수익률 (그날 가격이 있는 종목끼리 비중 재정규화, 상장 전 종목은 빠짐)
+    vol20 대신 vol_score를 바로 돌려줌 (가중평균은 점수 단위에서 하므로)
+    """
+    closes = eq_closes.apply(pd.to_numeric, errors="coerce").ffill()
+    w = pd.Series(weights, dtype=float).reindex(closes.columns).fillna(0.0)
+    scores = daily_scores_matrix(closes)
+
+    live = closes.notna().mul(w, axis=1)
+    denom = live.sum(axis=1).replace(0.0, np.nan)
+    trend = (scores["trend_score"].fillna(0.0) * live).sum(axis=1) / denom
+    vol = (scores["vol_score"].fillna(0.0) * live).sum(axis=1) / denom
+
+    rets = closes.pct_change(fill_method=None)
+    rw = rets.notna().mul(w, axis=1)
+    basket_ret = (rets.fillna(0.0) * rw).sum(axis=1) / rw.sum(axis=1).replace(0.0, np.nan)
+    eq_index = (1.0 + basket_ret.fillna(0.0)).cumprod().where(denom.notna())
+
+    px = pd.concat(
+        [eq_index, pd.to_numeric(safe_close, errors="coerce").reindex(closes.index).ffill(), trend, vol],
+        axis=1,
+        keys=["eq", "safe", "trend_score", "vol_score"],
+    ).dropna()
+    return _month_end_rows(px, years)
+
+
+def _month_end_rows(px: pd.DataFrame, years: int | None) -> Dict[str, np.ndarray]:
+    # 월말(해당 월의 마지막 거래일) 행
+    monthly = px.groupby(px.index.strftime("%Y%m")).tail(1)
+    if years:
+        start = monthly.index[-1] - pd.DateOffset(years=years)
+        monthly = monthly.loc[monthly.index >= start]
+
+    eq_px = monthly["eq"].to_numpy(dtype=float)
+    safe_px = monthly["safe"].to_numpy(dtype=float)
+    r_eq = np.zeros(len(monthly))
+    r_safe = np.zeros(len(monthly))
+    if len(monthly) > 1:
+        r_eq[:-1] = eq_px[1:] / eq_px[:-1] - 1.0
+        r_safe[:-1] = safe_px[1:] / safe_px[:-1] - 1.0
+
+    out = {
+        "dates": monthly.index.strftime("%Y-%m").to_numpy(),
+        "trend_score": monthly["trend_score"].to_numpy(dtype=float),
+        "r_eq": r_eq,
+        "r_safe": r_safe,
+    }
+    for col in ("vol20", "vol_score"):
+        if col in monthly.columns:
+            out[col] = monthly[col].to_numpy(dtype=float)
+    return out
+
+
+def _path_metrics(weights: np.ndarray, r_eq: np.ndarray, r_safe: np.ndarray, monthly_budget: float) -> Dict[str, float]:
+    """
+    월말마다 예산을 넣고 전체를 목표 비중으로 리밸런싱했을 때의 성과 (벡터화).
+    - cagr / mdd: 시간가중(적립금 효과 제외) 월간 NAV 기준
+    - turnover: 연평균 편도 회전율 (드리프트된 비중 -> 목표 비중 이동량 합)
+    - final_value_krw: 적립식으로 넣었을 때 마지막 월말 평가금액
+    """
+    n = len(weights) - 1  # 수익이 발생하는 월 수
+    if n <= 0:
+        return {"cagr": 0.0, "mdd": 0.0, "turnover": 0.0, "final_value_krw": float(monthly_budget)}
+
+    w = weights[:-1]
+    g = 1.0 + w * r_eq[:-1] + (1.0 - w) * r_safe[:-1]
+
+    nav = np.concatenate([[1.0], np.cumprod(g)])
+    cagr = nav[-1] ** (12.0 / n) - 1.0
+    mdd = float(np.min(nav / np.maximum.accumulate(nav) - 1.0))
+
+    # 한 달 보유 후 비중이 어디로 흘러갔는지 -> 다음 월말 목표 비중과의 차이
+    drift = w * (1.0 + r_eq[:-1]) / g
+    turnover = float(np.abs(weights[1:] - drift).sum() * 12.0 / n)
+
+    # V_{k+1} = (V_k + B) * g_k  =>  V_final = B * Σ_i Π_{j>=i} g_j
+    final_value = float(monthly_budget * np.sum(nav[-1] / nav[:-1]))
+
+    return {
+        "cagr": float(cagr),
+        "mdd": mdd,
+        "turnover": turnover,
+        "final_value_krw": final_value,
+    }
+
+
+def simulate_monthly_rule(
+    features: Dict[str, np.ndarray],
+    monthly_budget_krw: int,
+    params: ModelParams = DEFAULT_PARAMS,
+) -> Dict[str, Any]:
+    """
+    month_end_features 결과에 월간 규칙(기본: base 0.7 ± 조정, [0.2, 1.0])을 적용한 성과 vs 주식 100% 적립
+    """
+    if "vol_score" in features:  # 바스켓: 이미 점수 단위로 가중평균됨
+        vol_score = features["vol_score"]
+    else:
+        vol_score = vol_score_from_vol20(features["vol20"], params)
+    weights = np.asarray(_equity_weight(features["trend_score"], vol_score, params), dtype=float)
+    r_eq, r_safe = features["r_eq"], features["r_safe"]
+    dates = features.get("dates", [])
+    n_months = max(len(weights) - 1, 0)
+
+    return {
+        "period": f"{dates[0]}~{dates[-1]}" if len(dates) else "",
+        "months": n_months,
+        "monthly_budget_krw": int(monthly_budget_krw),
+        "invested_krw": int(monthly_budget_krw) * n_months,
+        "avg_equity_weight": float(weights[:-1].mean()) if n_months else float(weights.mean() if len(weights) else 0.0),
+        "strategy": _path_metrics(weights, r_eq, r_safe, monthly_budget_krw),
+        "buy_hold": _path_metrics(np.ones_like(weights), r_eq, r_safe, monthly_budget_krw),
+    }
+
+
+@lru_cache(maxsize=8)
+def _load_closes(equity_ticker: str, safe_ticker: str, period: str, as_of: str) -> Tuple[pd.Series, pd.Series]:
+    # as_of(오늘 날짜)는 캐시 키 용도: 하루 한 번만 다시 받음
+    eq = _extract_close(load_price_history(equity_ticker, period=period, interval="1d"))
+    safe = _extract_close(load_price_history(safe_ticker, period=period, interval="1d"))
+    return eq, safe
+
+
+@lru_cache(maxsize=8)
+def _load_basket_closes(tickers: Tuple[str, ...], safe_ticker: str, period: str, as_of: str) -> pd.DataFrame:
+    # 바스켓 + 안전자산을 한 번에 다운로드 (as_of는 캐시 키 용도)
+    return load_price_matrix(list(tickers) + [safe_ticker], period=period, interval="1d")
+
+
+def run_walk_forward_backtest(
+    monthly_budget_krw: int,
+    equity_ticker: str = "QQQ",
+    safe_ticker: str = "BIL",
+    years: int = 20,
+    equity_weights: Optional[Dict[str, float]] = None,
+) -> Dict[str, Any]:
+    """
+    월말마다 run_monthly_model_for_portfolio 규칙을 그 시점까지의 데이터로 적용하는 워크포워드 백테스트.
+    equity_weights({티커: 비중})가 두 종목 이상이면 그 바스켓으로, 아니면 equity_ticker 단독으로.
+    (safe 티커 상장 이후 구간만 평가되므로 실제 기간은 years보다 짧을 수 있음)
+    """
+    weights = {str(t).upper(): float(w) for t, w in (equity_weights or {}).items() if float(w or 0) > 0}
+    if len(weights) == 1:
+        equity_ticker = next(iter(weights))
+    if len(weights) > 1:
+        tickers = tuple(sorted(weights))
+        closes = _load_basket_closes(tickers, safe_ticker, "max", date.today().isoformat())
+        features = basket_month_end_features(closes[list(tickers)], weights, closes[safe_ticker], years=years)
+        equity_ticker = "+".join(sorted(weights, key=lambda t: -weights[t]))
+    else:
+        eq, safe = _load_closes(equity_ticker, safe_ticker, "max", date.today().isoformat())
+        features = month_end_features(eq, safe, years=years)
+    result = simulate_monthly_rule(features, monthly_budget_krw)
+    result["equity_ticker"] = equity_ticker
+    result["safe_ticker"] = safe_ticker
+    result["equity_weights"] = weights or {equity_ticker: 1.0}
+    return result
@@ -12,3 +12,27 @@ def load_price_history(ticker: str, period: str = "2y", interval: str = "1d") ->
         raise RuntimeError(f"가격 데이터를 못 가져왔어요: {ticker}")
     df = df.dropna()
     return df
+
+
+def load_price_matrix(tickers: list[str], period: str = "2y", interval: str = "1d") -> pd.DataFrame:
+    """
+    여러 티커의 종가를 한 번의 다운로드로 가져옴.
+    반환: Date index, columns=티커 (Adj Close 우선, 상장 전 구간은 NaN)
+    """
+    tickers = list(dict.fromkeys(str(t).upper() for t in tickers))
+    if not tickers:
+        raise ValueError("티커가 비어 있어요.")
+
+    df = yf.download(tickers, period=period, interval=interval, auto_adjust=False, progress=False, group_by="column")
+    if df is None or df.empty:
+        raise RuntimeError(f"가격 데이터를 못 가져왔어요: {', '.join(tickers)}")
+
+    if hasattr(df.columns, "nlevels") and df.columns.nlevels > 1:
+        fields = df.columns.get_level_values(0)
+        closes = df["Adj Close" if "Adj Close" in fields else "Close"]
+    else:
+        col = "Adj Close" if "Adj Close" in df.columns else "Close"
+        closes = df[[col]].rename(columns={col: tickers[0]})
+
+    closes = closes.reindex(columns=tickers).apply(pd.to_numeric, errors="coerce")
+    return closes.dropna(how="all")
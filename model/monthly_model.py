@@ -1,8 +1,30 @@
 from __future__ import annotations
+from dataclasses import dataclass
+from typing import Callable, Optional
 import numpy as np
 import pandas as pd
 from state_schema import MonthSignal
-from model.data_loader import load_price_history
+from model.data_loader import load_price_history, load_price_matrix
+from data.db import get_monthly_signal, upsert_monthly_signals, yyyymm_now
+
+@dataclass(frozen=True)
+class ModelParams:
+    """
+    월간 모델 계수 (기본값 = 현재 운영 규칙)
+    equity = base + trend_coef * trend_score - vol_penalty * vol_score  ->  [min_equity, max_equity]
+    vol_score = (vol20 - vol_lo) / (vol_hi - vol_lo)  ->  [0, 1]
+    vol_spike: VOL_SPIKE 이유코드 기준 (비중에는 영향 없음)
+    """
+    base: float = 0.7
+    trend_coef: float = 0.2
+    vol_penalty: float = 0.4
+    vol_lo: float = 0.01
+    vol_hi: float = 0.05
+    vol_spike: float = 0.6
+    min_equity: float = 0.2
+    max_equity: float = 1.0
+
+DEFAULT_PARAMS = ModelParams()
 
 def clamp(x: float, lo: float, hi: float) -> float:
     return max(lo, min(hi, x))
@@ -27,7 +49,7 @@ def calc_trend_score(close: pd.Series) -> float:
 
     return 0.6 if latest > latest_ma else -0.6
 
-def calc_vol_score(close: pd.Series) -> float:
+def calc_vol_score(close: pd.Series, params: ModelParams = DEFAULT_PARAMS) -> float:
     """
     변동성 점수(0~1):
     - 최근 20일 일간 수익률 표준편차를 이용해 스케일링
@@ -37,15 +59,13 @@ def calc_vol_score(close: pd.Series) -> float:
         return 0.0
     vol20 = ret.tail(20).std()  # 대략 0.01~0.05 범위가 흔함
     # 0.01 -> 0.0, 0.05 -> 1.0 정도로 매핑(대충)
-    score = (vol20 - 0.01) / (0.05 - 0.01)
+    score = (vol20 - params.vol_lo) / (params.vol_hi - params.vol_lo)
     return float(clamp(score, 0.0, 1.0))
 
-def run_monthly_model_from_market(ticker: str = "QQQ") -> MonthSignal:
+def _extract_close(df: pd.DataFrame) -> pd.Series:
     """
-    월 1회 실행: 시장 데이터 기반으로 '이번 달 주식 비중' 산출
+    yfinance 결과에서 종가 Series만 뽑아냄 (Adj Close 우선)
     """
-    df = load_price_history(ticker=ticker, period="2y", interval="1d")
-
     # ✅ yfinance가 컬럼을 MultiIndex로 주는 경우가 있어 단일 컬럼으로 정리
     if hasattr(df.columns, "nlevels") and df.columns.nlevels > 1:
         df.columns = df.columns.get_level_values(0)
@@ -63,18 +83,11 @@ def run_monthly_model_from_market(ticker: str = "QQQ") -> MonthSignal:
     if isinstance(close, pd.DataFrame):
         close = close.iloc[:, 0]
 
-    close = pd.to_numeric(close, errors="coerce").dropna()
-
-    trend_score = calc_trend_score(close)
-    vol_score = calc_vol_score(close)
-
-    base = 0.7
-    equity = base + 0.2 * trend_score - 0.4 * vol_score
-    equity = clamp(equity, 0.2, 1.0)
-    safe = 1.0 - equity
+    return pd.to_numeric(close, errors="coerce").dropna()
 
+def _reason_codes(trend_score: float, vol_score: float, params: ModelParams = DEFAULT_PARAMS) -> list[str]:
     reasons = []
-    if vol_score >= 0.6:
+    if vol_score >= params.vol_spike:
         reasons.append("VOL_SPIKE")
     if trend_score >= 0.3:
         reasons.append("TREND_UP")
@@ -82,20 +95,241 @@ def run_monthly_model_from_market(ticker: str = "QQQ") -> MonthSignal:
         reasons.append("TREND_DOWN")
     if not reasons:
         reasons = ["DEFAULT"]
+    return reasons
+
+def _equity_weight(trend_score, vol_score, params: ModelParams = DEFAULT_PARAMS):
+    """
+    base 0.7 ± 트렌드/변동성 조정, [0.2, 1.0]으로 제한
+    (float, numpy 배열 모두 받음)
+    """
+    equity = params.base + params.trend_coef * trend_score - params.vol_penalty * vol_score
+    return np.clip(equity, params.min_equity, params.max_equity)
+
+def vol_score_from_vol20(vol20, params: ModelParams = DEFAULT_PARAMS):
+    """
+    20일 변동성(원값, NaN=데이터 부족) -> 변동성 점수 (numpy 배열용)
+    """
+    vol20 = np.asarray(vol20, dtype=float)
+    score = np.clip((vol20 - params.vol_lo) / (params.vol_hi - params.vol_lo), 0.0, 1.0)
+    return np.where(np.isnan(vol20), 0.0, score)
+
+def daily_scores_matrix(closes: pd.DataFrame, params: ModelParams = DEFAULT_PARAMS) -> dict[str, pd.DataFrame]:
+    """
+    여러 티커의 종가 행렬(index=날짜, columns=티커)에 대해 한 번에 일별 점수를 계산.
+    각 열은 daily_scores를 그 티커에 따로 돌린 것과 같은 값 (상장 전 구간 NaN 허용).
+    반환: {"trend_score": DF, "vol_score": DF, "vol20": DF} (같은 모양)
+    """
+    closes = closes.apply(pd.to_numeric, errors="coerce")
+    # 상장 이후 중간에 빈 날짜만 앞 값으로 채움 (상장 전 NaN은 그대로)
+    closes = closes.ffill()
+
+    ma200 = closes.rolling(200).mean()
+    trend = np.where(ma200.isna(), 0.0, np.where(closes > ma200, 0.6, -0.6))
+
+    # 티커별로 수익률이 21개 이상 쌓여야(= 종가 22개) 점수를 냄 (calc_vol_score와 동일 조건)
+    rets = closes.pct_change(fill_method=None)
+    vol20 = rets.rolling(20).std().where(rets.notna().cumsum() >= 21)
+
+    return {
+        "trend_score": pd.DataFrame(trend, index=closes.index, columns=closes.columns),
+        "vol_score": pd.DataFrame(
+            vol_score_from_vol20(vol20.to_numpy(), params), index=closes.index, columns=closes.columns
+        ),
+        "vol20": vol20,
+    }
+
+def daily_scores(close: pd.Series, params: ModelParams = DEFAULT_PARAMS) -> pd.DataFrame:
+    """
+    매 거래일마다 calc_trend_score / calc_vol_score를 그 날짜까지의 데이터로 돌린 값 (벡터화)
+    반환: index=날짜, columns=trend_score, vol_score, vol20(원값, 데이터 부족 구간은 NaN)
+    """
+    if isinstance(close, pd.DataFrame):
+        close = close.iloc[:, 0]
+    close = pd.to_numeric(close, errors="coerce").dropna()
+
+    m = daily_scores_matrix(close.to_frame("close"), params)
+    return pd.DataFrame({k: v["close"] for k, v in m.items()}, index=close.index)
+
+def _monthly_rows(daily: pd.DataFrame, params: ModelParams = DEFAULT_PARAMS) -> pd.DataFrame:
+    """
+    일별 점수(trend_score, vol_score) -> 월말(해당 월의 마지막 거래일) 신호 행
+    """
+    daily = daily[["trend_score", "vol_score"]].copy()
+    daily.insert(0, "as_of", daily.index.strftime("%Y-%m-%d"))
+
+    monthly = daily.groupby(daily.index.strftime("%Y%m")).tail(1).copy()
+    monthly.index = pd.DatetimeIndex(monthly.index).strftime("%Y%m")
+    monthly.index.name = "yyyymm"
+
+    equity = _equity_weight(monthly["trend_score"].to_numpy(), monthly["vol_score"].to_numpy(), params)
+    monthly["equity_weight"] = equity
+    monthly["safe_weight"] = 1.0 - equity
+    monthly["reason_codes"] = [
+        _reason_codes(t, v, params) for t, v in zip(monthly["trend_score"], monthly["vol_score"])
+    ]
+    return monthly
 
-    return MonthSignal(equity_weight=float(equity), safe_weight=float(safe), reason_codes=reasons)
+def compute_signal_history(close: pd.Series) -> pd.DataFrame:
+    """
+    전체 가격 히스토리를 한 번에(벡터화) 훑어서 매월 말 시점의 신호를 계산.
+    calc_trend_score / calc_vol_score를 그 날짜까지의 데이터로 돌린 것과 같은 값.
+
+    반환: index=yyyymm, columns=as_of, trend_score, vol_score, equity_weight, safe_weight, reason_codes
+    """
+    return _monthly_rows(daily_scores(close))
+
+def compute_signal_history_matrix(closes: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    """
+    종가 행렬 -> {티커: compute_signal_history와 같은 월별 신호 DF}
+    롤링 계산은 전체 행렬에 한 번만 수행. 데이터가 없는 티커는 제외.
+    """
+    scores = daily_scores_matrix(closes)
+    valid = closes.apply(pd.to_numeric, errors="coerce").notna()
+
+    out: dict[str, pd.DataFrame] = {}
+    for ticker in closes.columns:
+        mask = valid[ticker]
+        if not mask.any():
+            continue
+        first = mask.idxmax()  # 첫 거래일(상장일)부터
+        daily = pd.DataFrame(
+            {"trend_score": scores["trend_score"][ticker], "vol_score": scores["vol_score"][ticker]}
+        ).loc[first:]
+        out[str(ticker)] = _monthly_rows(daily)
+    return out
 
-def simulate_portfolio_history(portfolio: dict, months: int = 120) -> dict:
+def compute_signals_matrix(closes: pd.DataFrame) -> pd.DataFrame:
+    """
+    종가 행렬 -> 티커별 최신 신호 (index=티커)
+    columns=as_of, trend_score, vol_score, equity_weight, safe_weight, reason_codes
+    """
+    rows = {t: h.iloc[-1] for t, h in compute_signal_history_matrix(closes).items() if not h.empty}
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+def _upsert_history(ticker: str, hist: pd.DataFrame) -> None:
+    rows = [
+        {"yyyymm": yyyymm, **rec}
+        for yyyymm, rec in zip(hist.index, hist.to_dict(orient="records"))
+    ]
+    upsert_monthly_signals(ticker, rows)
+
+def refresh_signal_history(ticker: str = "QQQ", period: str = "max") -> pd.DataFrame:
+    """
+    가격 히스토리 전체로 월별 신호를 다시 계산해서 monthly_signals 테이블에 저장
+    """
+    df = load_price_history(ticker=ticker, period=period, interval="1d")
+    hist = compute_signal_history(_extract_close(df))
+    _upsert_history(ticker, hist)
+    return hist
+
+def refresh_signal_history_many(tickers: list[str], period: str = "max") -> dict[str, pd.DataFrame]:
+    """
+    여러 티커를 한 번에 다운로드 -> 한 번의 행렬 계산 -> 티커별로 monthly_signals에 저장
+    """
+    closes = load_price_matrix(tickers, period=period, interval="1d")
+    hists = compute_signal_history_matrix(closes)
+    for ticker, hist in hists.items():
+        _upsert_history(ticker, hist)
+    return hists
+
+def _signal_from_row(row: dict) -> MonthSignal:
+    return MonthSignal(
+        equity_weight=float(row["equity_weight"]),
+        safe_weight=float(row["safe_weight"]),
+        reason_codes=list(row["reason_codes"]),
+    )
+
+def _current_signal_rows(tickers: list[str]) -> dict[str, dict]:
+    """
+    티커별 이번 달 신호 행. DB에 없는 티커만 모아서 한 번에 계산/저장.
+    월초(아직 이번 달 거래일이 없을 때)는 가장 최근 월말 신호를 이번 달 키로도 저장해서
+    다음 세션부터는 인덱스 조회만 (as_of는 원래 월말 날짜 그대로 -> 이월된 행임을 표시).
+    이번 달 실제 행은 다음 갱신(refresh_signal_history 등) 때 덮어씀.
+    """
+    yyyymm = yyyymm_now()
+    rows: dict[str, dict] = {}
+    missing: list[str] = []
+    for t in tickers:
+        row = get_monthly_signal(t, yyyymm)
+        if row:
+            rows[t] = row
+        else:
+            missing.append(t)
+
+    if missing:
+        for t, hist in refresh_signal_history_many(missing).items():
+            if hist.empty:
+                continue
+            if yyyymm in hist.index:
+                rows[t] = hist.loc[yyyymm].to_dict()
+                continue
+            rec = hist.iloc[-1].to_dict()
+            upsert_monthly_signals(t, [{"yyyymm": yyyymm, **rec}])
+            rows[t] = rec
+    return rows
+
+def run_monthly_model_for_portfolio(weights: dict[str, float]) -> MonthSignal:
+    """
+    포트폴리오(티커: 비중)에 맞춘 월간 신호.
+    티커별 trend/vol 점수를 비중으로 가중평균한 뒤 같은 규칙을 한 번 적용.
+    데이터가 없는 티커는 빼고 나머지 비중으로 다시 정규화.
+    """
+    weights = {str(t).upper(): float(w) for t, w in (weights or {}).items() if float(w or 0) > 0}
+    if not weights:
+        weights = {"QQQ": 1.0}
+
+    rows = _current_signal_rows(list(weights))
+    total = sum(w for t, w in weights.items() if t in rows)
+    if not rows or total <= 0:
+        return MonthSignal(basket=dict(weights), yyyymm=yyyymm_now())
+
+    trend_score = sum(weights[t] * float(r["trend_score"]) for t, r in rows.items()) / total
+    vol_score = sum(weights[t] * float(r["vol_score"]) for t, r in rows.items()) / total
+
+    equity = float(_equity_weight(trend_score, vol_score))
+    return MonthSignal(
+        equity_weight=equity,
+        safe_weight=1.0 - equity,
+        reason_codes=_reason_codes(trend_score, vol_score),
+        basket=dict(weights),
+        yyyymm=yyyymm_now(),
+    )
+
+def run_monthly_model_from_market(ticker: str = "QQQ") -> MonthSignal:
+    """
+    월 1회 실행: 시장 데이터 기반으로 '이번 달 주식 비중' 산출
+    - 이번 달 신호가 monthly_signals에 있으면 그대로 사용(인덱스 조회)
+    - 없으면 히스토리 전체를 한 번 계산해서 저장한 뒤 사용
+    """
+    return run_monthly_model_for_portfolio({ticker: 1.0})
+
+def _report(progress: Optional[Callable[[float, str], None]], pct: float, msg: str) -> None:
+    # 진행률 콜백은 표시용이라 실패해도 계산은 계속
+    if progress is None:
+        return
+    try:
+        progress(pct, msg)
+    except Exception:
+        pass
+
+def simulate_portfolio_history(
+    portfolio: dict,
+    months: int = 120,
+    progress: Optional[Callable[[float, str], None]] = None,
+) -> dict:
     """
     포트폴리오의 과거 성과(백테스트)와 미래 예측(몬테카를로)을 수행.
     portfolio: {ticker: weight, ...} 예: {"QQQ": 0.5, "SCHD": 0.5}
     months: 미래 예측 기간 (개월)
+    progress: (0~1, 메시지) 콜백 (선택)
     """
     
     # 1. 과거 데이터 로드 (최대 10년)
     hist_prices = pd.DataFrame()
     
-    for ticker in portfolio.keys():
+    tickers = list(portfolio.keys())
+    for i, ticker in enumerate(tickers):
+        _report(progress, 0.4 * i / max(len(tickers), 1), f"{ticker} 10년 가격 불러오는 중")
         try:
             df = load_price_history(ticker=ticker, period="10y", interval="1d")
             # MultiIndex 정리
@@ -120,6 +354,7 @@ def simulate_portfolio_history(portfolio: dict, months: int = 120) -> dict:
         return {"error": "No data found for tickers"}
 
     hist_prices = hist_prices.ffill().dropna()
+    _report(progress, 0.4, "10년 가격 히스토리 로드 완료")
     
     # 2. 백테스트 (일별 리밸런싱 가정 - 단순화)
     # 초기 자본 1.0
@@ -158,7 +393,9 @@ def simulate_portfolio_history(portfolio: dict, months: int = 120) -> dict:
     
     sim_paths = []
     
-    for _ in range(num_simulations):
+    for k in range(num_simulations):
+        if k % 10 == 0:
+            _report(progress, 0.45 + 0.5 * k / num_simulations, f"몬테카를로 {k * 100 // num_simulations}%")
         path = [last_val]
         curr = last_val
         for _ in range(simulation_days):
@@ -189,6 +426,7 @@ def simulate_portfolio_history(portfolio: dict, months: int = 120) -> dict:
             "lower": float(lower_path[i])
         })
         
+    _report(progress, 1.0, "시뮬레이션 완료")
     return {
         "history": history_data,
         "forecast": forecast_data,
@@ -209,9 +447,13 @@ def calculate_portfolio_returns(daily_ret_df, weights_dict):
             port_ret += daily_ret_df[ticker] * w
     return port_ret
 
-def backtest_crisis_scenarios(portfolio: dict) -> list[dict]:
+def backtest_crisis_scenarios(
+    portfolio: dict,
+    progress: Optional[Callable[[float, str], None]] = None,
+) -> list[dict]:
     """
     주요 경제 위기 구간에서의 포트폴리오 vs 시장(SPY) 성과 비교
+    progress: (0~1, 메시지) 콜백 (선택)
     """
     scenarios = [
         {"name": "2008 금융위기", "start": "2007-10-01", "end": "2009-03-09"},
@@ -222,6 +464,7 @@ def backtest_crisis_scenarios(portfolio: dict) -> list[dict]:
     results = []
     
     # SPY 데이터 로드 (벤치마크)
+    _report(progress, 0.0, "위기 구간 벤치마크(SPY) 불러오는 중")
     spy_df = load_price_history("SPY", period="20y", interval="1d")
     if hasattr(spy_df.columns, "nlevels") and spy_df.columns.nlevels > 1:
         spy_df.columns = spy_df.columns.get_level_values(0)
@@ -244,6 +487,7 @@ def backtest_crisis_scenarios(portfolio: dict) -> list[dict]:
             pass
             
     port_closes = port_closes.ffill().dropna()
+    _report(progress, 0.6, "위기 구간 가격 로드 완료")
     
     # 비중 정규화
     total_w = sum(portfolio.values())
@@ -317,4 +561,5 @@ def backtest_crisis_scenarios(portfolio: dict) -> list[dict]:
             "msg": "성공"
         })
         
+    _report(progress, 1.0, "위기 구간 테스트 완료")
     return results
\ No newline at end of file
@@ -0,0 +1,133 @@
+from __future__ import annotations
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, fields
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from model.backtest import month_end_features, simulate_monthly_rule
+from model.monthly_model import DEFAULT_PARAMS, ModelParams
+
+# risk_level별 허용 MDD (이보다 깊게 빠지는 조합은 랭킹에서 뒤로)
+RISK_MDD_LIMITS = {
+    "conservative": -0.20,
+    "neutral": -0.30,
+    "aggressive": -0.45,
+}
+
+# 기본 탐색 격자 (현재 운영값 포함)
+DEFAULT_GRID = {
+    "base": [0.5, 0.6, 0.7, 0.8],
+    "trend_coef": [0.0, 0.1, 0.2, 0.3],
+    "vol_penalty": [0.0, 0.2, 0.4, 0.6],
+    "vol_lo": [0.005, 0.01, 0.015],
+    "vol_hi": [0.03, 0.05, 0.07],
+}
+
+_FEATURE_KEYS = ("trend_score", "vol20", "r_eq", "r_safe")
+
+# 워커 프로세스마다 한 번만 받아두는 읽기 전용 월말 배열
+_WORKER_FEATURES: Dict[str, np.ndarray] = {}
+_WORKER_BUDGET = 0
+
+
+def param_grid(**axes: Sequence[float]) -> List[ModelParams]:
+    """
+    param_grid(base=[0.6, 0.7], vol_penalty=[0.2, 0.4]) -> ModelParams 조합 리스트
+    지정하지 않은 계수는 현재 기본값 유지. vol_lo >= vol_hi 조합은 제외.
+    """
+    allowed = {f.name for f in fields(ModelParams)}
+    unknown = set(axes) - allowed
+    if unknown:
+        raise ValueError(f"알 수 없는 파라미터: {sorted(unknown)}")
+
+    names = list(axes)
+    out: List[ModelParams] = []
+    for combo in itertools.product(*(axes[n] for n in names)):
+        p = ModelParams(**{**asdict(DEFAULT_PARAMS), **dict(zip(names, combo))})
+        if p.vol_lo >= p.vol_hi:
+            continue
+        out.append(p)
+    return out
+
+
+def _init_worker(arrays: Dict[str, np.ndarray], budget: int) -> None:
+    global _WORKER_FEATURES, _WORKER_BUDGET
+    for a in arrays.values():
+        a.flags.writeable = False
+    _WORKER_FEATURES = arrays
+    _WORKER_BUDGET = budget
+
+
+def _evaluate_chunk(chunk: List[Dict[str, float]]) -> List[Dict[str, Any]]:
+    rows = []
+    for d in chunk:
+        res = simulate_monthly_rule(_WORKER_FEATURES, _WORKER_BUDGET, ModelParams(**d))
+        st = res["strategy"]
+        rows.append({
+            **d,
+            "cagr": st["cagr"],
+            "mdd": st["mdd"],
+            "turnover": st["turnover"],
+            "avg_equity_weight": res["avg_equity_weight"],
+            "final_value_krw": st["final_value_krw"],
+        })
+    return rows
+
+
+def _chunks(items: List[Any], n_chunks: int) -> List[List[Any]]:
+    size = max(1, -(-len(items) // n_chunks))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def run_param_sweep(
+    eq_close: pd.Series,
+    safe_close: pd.Series,
+    grid: Optional[Iterable[ModelParams]] = None,
+    monthly_budget_krw: int = 1_000_000,
+    years: int = 20,
+    workers: Optional[int] = None,
+    risk_level: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    계수 조합별 워크포워드 백테스트를 프로세스 풀에서 병렬 평가하고 랭킹 테이블 반환.
+    - 가격 -> 월말 신호/수익률 배열은 한 번만 계산해서 워커 초기화 때 한 번씩 넘김(읽기 전용)
+    - 격자는 워커 수의 몇 배 청크로 나눠서 보냄 (조합 1개 = 밀리초 단위라 IPC 비용을 줄임)
+    - 정렬: risk_level MDD 한도 안쪽 먼저, 그 다음 CAGR / |MDD| 내림차순
+    """
+    params = list(grid) if grid is not None else param_grid(**DEFAULT_GRID)
+    if not params:
+        return pd.DataFrame()
+
+    feats = month_end_features(eq_close, safe_close, years=years)
+    arrays = {k: np.ascontiguousarray(feats[k], dtype=float) for k in _FEATURE_KEYS}
+    payload = [asdict(p) for p in params]
+
+    workers = workers or min(os.cpu_count() or 1, 8)
+    if workers <= 1:
+        _init_worker({k: v.copy() for k, v in arrays.items()}, monthly_budget_krw)
+        rows = _evaluate_chunk(payload)
+    else:
+        rows = []
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(arrays, monthly_budget_krw),
+        ) as ex:
+            for part in ex.map(_evaluate_chunk, _chunks(payload, workers * 4)):
+                rows.extend(part)
+
+    df = pd.DataFrame(rows)
+    df["ret_mdd"] = df["cagr"] / df["mdd"].abs().replace(0.0, np.nan)
+    df["ret_mdd"] = df["ret_mdd"].fillna(np.inf)
+
+    limit = RISK_MDD_LIMITS.get(risk_level or "")
+    df["within_risk"] = (df["mdd"] >= limit) if limit is not None else True
+
+    df = df.sort_values(["within_risk", "ret_mdd", "cagr"], ascending=[False, False, False])
+    df.insert(0, "rank", np.arange(1, len(df) + 1))
+    df.attrs["period"] = f"{feats['dates'][0]}~{feats['dates'][-1]}" if len(feats["dates"]) else ""
+    return df.reset_index(drop=True)
@@ -11,3 +11,31 @@ def get_latest_price_usd(ticker: str) -> float:
         raise RuntimeError(f"가격을 못 가져왔어요: {ticker}")
     price = float(hist["Close"].iloc[-1])
     return price
+
+
+def get_latest_prices_usd(tickers: list[str]) -> dict[str, float]:
+    """
+    여러 티커의 최근 종가(USD)를 한 번의 다운로드로 가져옴.
+    반환: {티커: 가격} (대문자 티커, 가격을 못 가져온 티커는 제외)
+    """
+    tickers = list(dict.fromkeys(str(t).upper() for t in tickers))
+    if not tickers:
+        return {}
+
+    df = yf.download(tickers, period="5d", interval="1d", auto_adjust=False, progress=False, group_by="column")
+    if df is None or df.empty:
+        raise RuntimeError(f"가격을 못 가져왔어요: {', '.join(tickers)}")
+
+    if hasattr(df.columns, "nlevels") and df.columns.nlevels > 1:
+        closes = df["Close"]
+    else:
+        closes = df[["Close"]].rename(columns={"Close": tickers[0]})
+
+    prices: dict[str, float] = {}
+    for t in tickers:
+        if t not in closes.columns:
+            continue
+        s = closes[t].dropna()
+        if not s.empty:
+            prices[t] = float(s.iloc[-1])
+    return prices
@@ -0,0 +1,296 @@
+from __future__ import annotations
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from state_schema import MonthSignal
+from model.data_loader import load_price_history
+from model.monthly_model import DEFAULT_PARAMS, _equity_weight, _extract_close, _reason_codes, clamp
+from data.db import load_signal_state, save_signal_state, upsert_monthly_signals
+
+MA_WINDOW = 200
+VOL_WINDOW = 20
+# 부동소수 누적 오차 방지용: 이 횟수마다 윈도우에서 합/모멘트를 다시 계산
+RESYNC_EVERY = 1000
+# 장중에 받은 오늘 일봉은 종가가 아님 -> 마감(16:00 ET) 후 데이터가 확정될 때까지 반영 안 함
+MARKET_TZ = ZoneInfo("America/New_York")
+SESSION_SETTLED = time(16, 30)
+# 저장된 마지막 종가와 새로 받은 같은 날 종가가 이만큼 다르면 (배당/분할로 Adj Close 재조정) 다시 초기화
+RESYNC_PRICE_TOL = 1e-4
+
+
+@dataclass
+class RollingSignalState:
+    """
+    MA200 / vol20을 일봉 1개당 O(1)로 갱신하는 롤링 상태.
+    - MA200: 최근 200개 종가의 running sum
+    - vol20: 최근 20개 일간 수익률의 Welford 방식 평균/제곱편차합(M2)
+    calc_trend_score / calc_vol_score와 같은 값을 냄.
+    """
+    ticker: str
+    last_date: str = ""
+    last_close: Optional[float] = None
+    closes: Deque[float] = field(default_factory=lambda: deque(maxlen=MA_WINDOW))
+    close_sum: float = 0.0
+    rets: Deque[float] = field(default_factory=lambda: deque(maxlen=VOL_WINDOW))
+    ret_mean: float = 0.0
+    ret_m2: float = 0.0
+    n_closes: int = 0
+    n_rets: int = 0
+    n_updates: int = 0
+    # 이번 refresh에서 저장된 상태가 이어지지 않아 다시 초기화했는지 (저장하지 않음)
+    rebootstrapped: bool = False
+
+    # ---------------------------
+    # 갱신
+    # ---------------------------
+    def update(self, date: str, close: float) -> bool:
+        """
+        새 일봉 1개 반영. 이미 반영한 날짜(이전 포함)면 무시하고 False.
+        """
+        date = str(date)[:10]
+        if self.last_date and date <= self.last_date:
+            return False
+
+        close = float(close)
+        if self.last_close is not None and self.last_close != 0:
+            self._push_ret(close / self.last_close - 1.0)
+        self._push_close(close)
+
+        self.last_close = close
+        self.last_date = date
+        self.n_updates += 1
+        if self.n_updates % RESYNC_EVERY == 0:
+            self._resync()
+        return True
+
+    def update_many(self, close: pd.Series) -> int:
+        """
+        종가 Series에서 last_date 이후의 일봉만 순서대로 반영. 반영한 개수 반환.
+        """
+        n = 0
+        for ts, px in close.items():
+            if self.update(pd.Timestamp(ts).strftime("%Y-%m-%d"), px):
+                n += 1
+        return n
+
+    def _push_close(self, x: float) -> None:
+        if len(self.closes) == MA_WINDOW:
+            self.close_sum -= self.closes[0]
+        self.closes.append(x)
+        self.close_sum += x
+        self.n_closes += 1
+
+    def _push_ret(self, x: float) -> None:
+        # 윈도우가 꽉 찼으면 가장 오래된 값을 Welford 역연산으로 제거
+        if len(self.rets) == VOL_WINDOW:
+            y = self.rets[0]
+            n = len(self.rets) - 1
+            if n == 0:
+                self.ret_mean, self.ret_m2 = 0.0, 0.0
+            else:
+                delta = y - self.ret_mean
+                self.ret_mean -= delta / n
+                self.ret_m2 -= delta * (y - self.ret_mean)
+
+        self.rets.append(x)
+        n = len(self.rets)
+        delta = x - self.ret_mean
+        self.ret_mean += delta / n
+        self.ret_m2 += delta * (x - self.ret_mean)
+        self.n_rets += 1
+
+    def _resync(self) -> None:
+        self.close_sum = float(sum(self.closes))
+        n = len(self.rets)
+        self.ret_mean = (sum(self.rets) / n) if n else 0.0
+        self.ret_m2 = float(sum((r - self.ret_mean) ** 2 for r in self.rets))
+
+    # ---------------------------
+    # 점수/신호
+    # ---------------------------
+    def trend_score(self) -> float:
+        if self.n_closes < MA_WINDOW or self.last_close is None:
+            return 0.0
+        ma200 = self.close_sum / MA_WINDOW
+        return 0.6 if self.last_close > ma200 else -0.6
+
+    def vol_score(self) -> float:
+        if self.n_rets < VOL_WINDOW + 1 or len(self.rets) < 2:
+            return 0.0
+        vol20 = math.sqrt(max(self.ret_m2, 0.0) / (len(self.rets) - 1))
+        score = (vol20 - DEFAULT_PARAMS.vol_lo) / (DEFAULT_PARAMS.vol_hi - DEFAULT_PARAMS.vol_lo)
+        return float(clamp(score, 0.0, 1.0))
+
+    def signal(self) -> MonthSignal:
+        trend_score = self.trend_score()
+        vol_score = self.vol_score()
+        equity = float(_equity_weight(trend_score, vol_score))
+        return MonthSignal(
+            equity_weight=equity,
+            safe_weight=1.0 - equity,
+            reason_codes=_reason_codes(trend_score, vol_score),
+        )
+
+    # ---------------------------
+    # 직렬화
+    # ---------------------------
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ticker": self.ticker,
+            "last_date": self.last_date,
+            "last_close": self.last_close,
+            "closes": list(self.closes),
+            "close_sum": self.close_sum,
+            "rets": list(self.rets),
+            "ret_mean": self.ret_mean,
+            "ret_m2": self.ret_m2,
+            "n_closes": self.n_closes,
+            "n_rets": self.n_rets,
+            "n_updates": self.n_updates,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "RollingSignalState":
+        return cls(
+            ticker=d["ticker"],
+            last_date=d.get("last_date") or "",
+            last_close=d.get("last_close"),
+            closes=deque(d.get("closes") or [], maxlen=MA_WINDOW),
+            close_sum=float(d.get("close_sum", 0.0)),
+            rets=deque(d.get("rets") or [], maxlen=VOL_WINDOW),
+            ret_mean=float(d.get("ret_mean", 0.0)),
+            ret_m2=float(d.get("ret_m2", 0.0)),
+            n_closes=int(d.get("n_closes", 0)),
+            n_rets=int(d.get("n_rets", 0)),
+            n_updates=int(d.get("n_updates", 0)),
+        )
+
+    @classmethod
+    def from_series(cls, ticker: str, close: pd.Series) -> "RollingSignalState":
+        """
+        과거 종가로 초기 상태를 만듦 (윈도우 꼬리만 보고 바로 계산)
+        """
+        close = pd.to_numeric(close, errors="coerce").dropna()
+        st = cls(ticker=ticker)
+        if close.empty:
+            return st
+
+        tail = close.tail(MA_WINDOW + 1)
+        ret_tail = tail.pct_change().dropna().tail(VOL_WINDOW)
+
+        st.closes.extend(float(x) for x in close.tail(MA_WINDOW))
+        st.rets.extend(float(x) for x in ret_tail)
+        st.n_closes = len(close)
+        st.n_rets = max(len(close) - 1, 0)
+        st.last_close = float(close.iloc[-1])
+        st.last_date = pd.Timestamp(close.index[-1]).strftime("%Y-%m-%d")
+        st._resync()
+        return st
+
+
+# ---------------------------
+# 영속화 + 일일 갱신 잡
+# ---------------------------
+def load_state(ticker: str) -> Optional[RollingSignalState]:
+    d = load_signal_state(ticker)
+    return RollingSignalState.from_dict(d) if d else None
+
+
+def save_state(st: RollingSignalState) -> None:
+    save_signal_state(st.ticker, st.last_date, st.to_dict())
+
+
+def completed_bars(close: pd.Series, now: Optional[datetime] = None) -> pd.Series:
+    """
+    마감된 세션의 일봉만 (오늘 봉은 장 마감 후에만 포함)
+    """
+    now = now.astimezone(MARKET_TZ) if now is not None else datetime.now(MARKET_TZ)
+    cutoff = now.date() if now.time() >= SESSION_SETTLED else now.date() - timedelta(days=1)
+    keep = [pd.Timestamp(ts).date() <= cutoff for ts in close.index]
+    return close[keep]
+
+
+def _connects(st: RollingSignalState, close: pd.Series) -> bool:
+    """
+    새로 받은 구간이 저장된 상태에 바로 이어지는지:
+    last_date 봉이 구간 안에 있어야 그 다음 봉이 곧 다음 세션 (빠진 봉 없음),
+    그 날 종가도 같아야 함 (다르면 과거 Adj Close가 재조정된 것).
+    """
+    if not st.last_date or st.last_close is None:
+        return False
+    for ts, px in close.items():
+        if pd.Timestamp(ts).strftime("%Y-%m-%d") == st.last_date:
+            return abs(float(px) / st.last_close - 1.0) <= RESYNC_PRICE_TOL if st.last_close else False
+    return False
+
+
+def refresh_ticker_state(ticker: str, bootstrap_period: str = "2y", update_period: str = "1mo") -> Tuple[RollingSignalState, int]:
+    """
+    저장된 상태가 있으면 최근 일봉만 받아서 O(1)씩 반영,
+    없거나 받은 구간이 last_date에 이어지지 않으면 (오래 갱신 안 함/가격 재조정) bootstrap_period 만큼 받아서 초기화.
+    마감 안 된 오늘 봉은 반영하지 않음. 다시 초기화했으면 반환 상태의 rebootstrapped=True.
+    monthly_signals의 해당 월 행도 같이 갱신함.
+    반환: (상태, 새로 반영한 일봉 수)
+    """
+    st = load_state(ticker)
+    n_new = 0
+    rebootstrapped = False
+    if st is not None:
+        close = completed_bars(_extract_close(load_price_history(ticker, period=update_period, interval="1d")))
+        if _connects(st, close):
+            n_new = st.update_many(close)
+        else:
+            rebootstrapped = True
+            st = None
+    if st is None:
+        close = completed_bars(_extract_close(load_price_history(ticker, period=bootstrap_period, interval="1d")))
+        st = RollingSignalState.from_series(ticker, close)
+        st.rebootstrapped = rebootstrapped
+        n_new = len(close)
+
+    if n_new and st.last_date:
+        sig = st.signal()
+        upsert_monthly_signals(
+            ticker,
+            [
+                {
+                    "yyyymm": st.last_date[:7].replace("-", ""),
+                    "as_of": st.last_date,
+                    "trend_score": st.trend_score(),
+                    "vol_score": st.vol_score(),
+                    "equity_weight": sig.equity_weight,
+                    "safe_weight": sig.safe_weight,
+                    "reason_codes": sig.reason_codes,
+                }
+            ],
+        )
+    save_state(st)
+    return st, n_new
+
+
+def refresh_daily_signals(tickers: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    여러 티커의 롤링 상태를 갱신 (일일 배치용). 실패한 티커는 error로 기록하고 계속 진행.
+    """
+    out: List[Dict[str, Any]] = []
+    for ticker in tickers:
+        try:
+            st, n_new = refresh_ticker_state(ticker)
+            sig = st.signal()
+            out.append({
+                "ticker": ticker,
+                "last_date": st.last_date,
+                "new_bars": n_new,
+                "rebootstrapped": st.rebootstrapped,
+                "equity_weight": sig.equity_weight,
+                "reason_codes": sig.reason_codes,
+            })
+        except Exception as e:
+            out.append({"ticker": ticker, "error": str(e)})
+    return out
@@ -8,10 +8,13 @@ from typing import Iterable, List
 from dotenv import load_dotenv
 
 from langchain_core.documents import Document
-from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from agents.llm_clients import get_embeddings
+
+# ✅ 프로젝트 루트에서 -m로 실행하세요: python -m rag.build_index
+
 
 SUPPORTED_EXTS = {".md", ".txt"}  # 필요하면 ".log" 같은 것도 추가 가능
 
@@ -83,8 +86,8 @@ def build_index(
     )
     chunks = splitter.split_documents(raw_docs)
 
-    # 최신 LangChain 표준: OpenAIEmbeddings(model=...)
-    embeddings = OpenAIEmbeddings(model=model)
+    # OpenAIEmbeddings(model=...) (RULEPILOT_PROVIDER=fake면 같은 차원의 가짜 임베딩)
+    embeddings = get_embeddings(model)
 
     # 벡터스토어 생성
     vs = FAISS.from_documents(chunks, embeddings)
@@ -0,0 +1,111 @@
+from __future__ import annotations
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from agents.providers import provider_name
+from agents.response_cache import normalize_question
+from data.db import get_embedding_cache, put_embedding_cache
+
+# RAG 질의 임베딩 캐시
+# - "ETF가 뭐야" / "etf 뭐야?" / "ETF란" 은 정규화하면 같은 질의 -> 임베딩 API 호출 1번
+# - 메모리 LRU -> SQLite(float32 바이트) 순으로 조회, 둘 다 없을 때만 원래 임베딩 호출
+LRU_SIZE = 1024
+
+_LOCK = threading.Lock()
+_WRAPPED: Dict[int, "CachedQueryEmbeddings"] = {}
+
+
+def _model_tag(base: Embeddings) -> str:
+    # 공급자/모델이 다르면 벡터 공간이 다르므로 키를 분리
+    model = getattr(base, "model", None) or ""
+    return f"{provider_name()}|{type(base).__name__}|{model}"
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    embed_query만 캐시 (embed_documents는 인덱스 생성용이라 그대로 통과)
+    """
+
+    def __init__(self, base: Embeddings, lru_size: int = LRU_SIZE):
+        self.base = base
+        self.model_tag = _model_tag(base)
+        self.lru_size = lru_size
+        self._lru: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = {"memory": 0, "db": 0, "miss": 0}
+
+    def _key(self, query: str) -> str:
+        return hashlib.sha256(f"{self.model_tag}|{query}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vec: List[float]) -> None:
+        with self._lock:
+            self._lru[key] = vec
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def embed_query(self, text: str) -> List[float]:
+        # 정규화된 질의를 임베딩 -> 같은 키면 누가 먼저 물었든 같은 벡터
+        query = normalize_question(text) or (text or "").strip()
+        key = self._key(query)
+
+        with self._lock:
+            vec = self._lru.get(key)
+            if vec is not None:
+                self._lru.move_to_end(key)
+                self.hits["memory"] += 1
+                return vec
+
+        try:
+            row = get_embedding_cache(key)
+        except Exception as e:
+            print(f"embedding cache read failed: {e}")
+            row = None
+        if row:
+            vec = np.frombuffer(row["vector"], dtype=np.float32).tolist()
+            if len(vec) == row["dim"]:
+                self._remember(key, vec)
+                self.hits["db"] += 1
+                return vec
+
+        # 저장 형식(float32)으로 맞춰서 메모리/DB 어느 쪽에서 읽어도 같은 벡터
+        arr = np.asarray(self.base.embed_query(query), dtype=np.float32)
+        vec = arr.tolist()
+        self.hits["miss"] += 1
+        self._remember(key, vec)
+        try:
+            put_embedding_cache([{
+                "cache_key": key,
+                "model": self.model_tag,
+                "query": query,
+                "dim": len(vec),
+                "vector": arr.tobytes(),
+                "created_at": time.time(),
+            }])
+        except Exception as e:
+            print(f"embedding cache write failed: {e}")
+        return vec
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+
+def cached_embeddings(base: Embeddings, lru_size: Optional[int] = None) -> CachedQueryEmbeddings:
+    """
+    원래 임베딩 객체당 래퍼 1개 (프로세스 공용 LRU 유지)
+    """
+    key = id(base)
+    wrapped = _WRAPPED.get(key)
+    if wrapped is None or wrapped.base is not base:
+        with _LOCK:
+            wrapped = _WRAPPED.get(key)
+            if wrapped is None or wrapped.base is not base:
+                wrapped = CachedQueryEmbeddings(base, lru_size or LRU_SIZE)
+                _WRAPPED[key] = wrapped
+    return wrapped
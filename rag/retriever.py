@@ -1,16 +1,77 @@
 from __future__ import annotations
+import copy
+import threading
 from pathlib import Path
-from dotenv import load_dotenv
+from typing import Any, Dict, Optional, Tuple
 
-from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
 
+from agents.llm_clients import get_embeddings, load_env
+from rag.embedding_cache import cached_embeddings
 
-def get_retriever(k: int = 4):
-    load_dotenv()
-    project_root = Path(__file__).resolve().parents[1]
-    store_dir = project_root / "data" / "vector_store"
+# FAISS 인덱스는 프로세스당 한 번만 읽어서 모든 세션이 읽기 전용으로 공유
+# - 매 호출은 인덱스 파일 stat 두 번만 (바뀌었을 때만 다시 로드)
+# - 임베딩 객체가 바뀌면 (API 키/공급자 변경) 인덱스는 그대로 두고 질의 임베딩만 교체
+# - 질의 임베딩은 rag.embedding_cache를 거침 (같은/비슷한 질문은 API 호출 없음)
+STORE_DIR = Path(__file__).resolve().parents[1] / "data" / "vector_store"
+INDEX_FILES = ("index.faiss", "index.pkl")
 
-    embeddings = OpenAIEmbeddings()
-    vs = FAISS.load_local(str(store_dir), embeddings, allow_dangerous_deserialization=True)
-    return vs.as_retriever(search_kwargs={"k": k})
+_LOCK = threading.Lock()
+# store_dir -> (파일 서명, 디스크에서 읽은 FAISS)
+_STORES: Dict[str, Tuple[Tuple, FAISS]] = {}
+# (store_dir, 서명, 임베딩 id) -> 질의용 FAISS (인덱스 공유, embedding_function만 다름)
+_BOUND: Dict[Tuple[str, Tuple, int], FAISS] = {}
+
+
+def _signature(store_dir: Path) -> Tuple:
+    # 인덱스를 다시 만들면 (rag.build_index) mtime/크기가 바뀜
+    sig = []
+    for name in INDEX_FILES:
+        st = (store_dir / name).stat()
+        sig.append((name, st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+
+def get_vector_store(store_dir: Optional[Path] = None) -> FAISS:
+    """
+    공유 FAISS 벡터스토어 (인덱스 파일이 바뀌었으면 다시 로드)
+    """
+    load_env()
+    store_dir = Path(store_dir or STORE_DIR)
+    key = str(store_dir)
+    sig = _signature(store_dir)
+    emb = cached_embeddings(get_embeddings())
+
+    bound_key = (key, sig, id(emb))
+    vs = _BOUND.get(bound_key)
+    if vs is not None:
+        return vs
+
+    with _LOCK:
+        vs = _BOUND.get(bound_key)
+        if vs is not None:
+            return vs
+        cached = _STORES.get(key)
+        if cached is None or cached[0] != sig:
+            if cached is not None:
+                print(f"vector store changed, reloading: {store_dir}")
+            base = FAISS.load_local(str(store_dir), emb, allow_dangerous_deserialization=True)
+            _STORES[key] = (sig, base)
+            # 옛 인덱스에 묶인 항목은 버림
+            for k in [k for k in _BOUND if k[0] == key]:
+                del _BOUND[k]
+        else:
+            base = copy.copy(cached[1])
+            base.embedding_function = emb
+        _BOUND[bound_key] = base
+        return base
+
+
+def get_retriever(k: int = 4, store_dir: Optional[Path] = None) -> Any:
+    return get_vector_store(store_dir).as_retriever(search_kwargs={"k": k})
+
+
+def clear_retriever_cache() -> None:
+    with _LOCK:
+        _STORES.clear()
+        _BOUND.clear()
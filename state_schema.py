@@ -23,6 +23,8 @@ class MonthSignal:
     equity_weight: float = 0.7
     safe_weight: float = 0.3
     reason_codes: List[str] = field(default_factory=lambda: ["DEFAULT"])
+    basket: Dict[str, float] = field(default_factory=dict)  # 신호를 계산한 주식 바스켓 {티커: 비중}
+    yyyymm: str = ""  # 신호를 계산한 달 (달이 바뀌면 다시 계산)
 
 
 @dataclass
@@ -0,0 +1,14 @@
+from agents.response_cache import normalize_question
+
+
+def test_particle_kept_when_stem_would_be_one_char():
+    # "주가"(주가)와 "주"(주식 1주)는 다른 용어 -> 캐시 키가 달라야 함
+    assert normalize_question("주가 뭐야") == "주가"
+    assert normalize_question("주 뭐야") == "주"
+    assert normalize_question("주가 뭐야") != normalize_question("주 뭐야")
+
+
+def test_particle_stripped_for_longer_stems():
+    assert normalize_question("ETF가 뭐야?") == normalize_question("etf 뭐야") == "etf"
+    assert normalize_question("주가가 뭐야") == "주가"
+    assert normalize_question("배당이란?") == "배당"
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# ✅ 실행 위치에 따라 모듈이 안 잡히면 -m로 실행하세요:
+# python -m tools.bench_db --sessions 16 --turns 200
+# python -m tools.bench_db --mode legacy   (호출마다 새 커넥션 + 기본 저널 모드 비교용)
+
+from data import db
+
+
+def _legacy_conn() -> sqlite3.Connection:
+    # 예전 get_conn(): 호출마다 새로 연결, rollback 저널, 기본 busy timeout
+    conn = sqlite3.connect(str(db.DB_PATH))
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _session(idx: int, turns: int, lat: list, errors: list, lock: threading.Lock) -> None:
+    uid = f"bench_{idx}"
+    db.ensure_user(uid)
+    db.create_profile(uid, {"monthly_budget_krw": 1_000_000, "risk_level": "neutral"}, name="bench")
+
+    local = []
+    for t in range(turns):
+        t0 = time.perf_counter()
+        try:
+            # 한 턴에서 하는 일과 비슷하게: 읽기 여러 번 + 월간 계획 쓰기 1번
+            db.load_active_profile(uid)
+            db.list_profiles(uid)
+            db.upsert_monthly_plan(uid, None, f"{2000 + t // 12}{t % 12 + 1:02d}", {"equity_weight": 0.7, "turn": t})
+            db.fetch_monthly_plans(uid, months=3)
+        except sqlite3.OperationalError as e:
+            with lock:
+                errors.append(str(e))
+            continue
+        local.append(time.perf_counter() - t0)
+
+    if db.get_conn is not _legacy_conn:
+        db.close_thread_conns()
+    with lock:
+        lat.extend(local)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="동시 세션에서 DB 읽기/쓰기 처리량 측정 (임시 DB 사용)")
+    parser.add_argument("--sessions", type=int, default=16, help="동시 세션(스레드) 수")
+    parser.add_argument("--turns", type=int, default=200, help="세션당 턴 수")
+    parser.add_argument("--mode", choices=["pooled", "legacy"], default="pooled")
+    args = parser.parse_args()
+
+    db.DB_PATH = Path(tempfile.mkdtemp()) / "bench.sqlite3"
+    if args.mode == "legacy":
+        db.get_conn = _legacy_conn
+    db.migrate()
+
+    lat: list = []
+    errors: list = []
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(target=_session, args=(i, args.turns, lat, errors, lock))
+        for i in range(args.sessions)
+    ]
+
+    t0 = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    elapsed = time.perf_counter() - t0
+
+    ok = len(lat)
+    print(f"mode={args.mode} sessions={args.sessions} turns/session={args.turns}")
+    print(f"- 완료 턴: {ok} / 실패(locked 등): {len(errors)}")
+    print(f"- 처리량: {ok / elapsed:,.0f} turns/s (읽기 {3 * ok / elapsed:,.0f}/s, 쓰기 {ok / elapsed:,.0f}/s)")
+    if lat:
+        q = statistics.quantiles(lat, n=100) if len(lat) >= 2 else [lat[0]] * 99
+        print(f"- 턴 지연: p50 {q[49] * 1000:.2f}ms / p95 {q[94] * 1000:.2f}ms / p99 {q[98] * 1000:.2f}ms")
+    if errors:
+        print(f"- 첫 오류: {errors[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+# ✅ 실행 위치에 따라 모듈이 안 잡히면 -m로 실행하세요:
+# python -m tools.bench_router                     (골든 코퍼스 검증 + 예전/현재 라우터 속도 비교)
+# python -m tools.bench_router --repeat 2000 --pad 400   (긴 발화에서 확인)
+
+from agents.intent_rules import KEYWORDS, AhoCorasick
+from agents.router import route_intent, route_turn
+
+GOLDEN_PATH = Path(__file__).resolve().parent.parent / "data" / "router_golden.jsonl"
+
+
+# -------------------------
+# 예전 라우터 (if 캐스케이드, 비교용)
+# -------------------------
+def _legacy_route_intent(user_text: str) -> str:
+    t = (user_text or "").strip()
+    if t == "":
+        return "ONBOARD"
+    if any(k in t for k in ["설정 바꿔", "설정 바꾸자", "설정 변경", "설정 수정", "프로필 바꿔", "프로필 변경"]):
+        return "EDIT_SETTINGS"
+    if any(k in t for k in ["내 설정 목록", "설정 목록", "프로필 목록", "내 설정 보여줘", "설정 리스트"]):
+        return "PROFILE_LIST"
+    if re.search(r"설정\s*\d+\s*번", t) and any(k in t for k in ["바꿔", "전환", "선택", "사용"]):
+        return "PROFILE_SWITCH"
+    if (("이 설정" in t) or ("설정 이름" in t) or ("이름을" in t)) and any(k in t for k in ["바꿔", "변경", "rename"]):
+        if re.search(r"(이\s*설정\s*이름|설정\s*이름|이름)\s*을", t) or ("이 설정 이름" in t):
+            return "PROFILE_RENAME"
+    last_month_pat = r"(지난\s*달|지난달|저번\s*달|저번달|이전\s*달|이전달|전\s*달|전달)"
+    history_action = r"(보여|조회|확인|요약|정리|기록|내역)"
+    plan_words = r"(계획|투자|비중|주문|리포트|가이드)?"
+    if re.search(last_month_pat, t) and (re.search(history_action, t) or re.search(plan_words, t)):
+        return "HISTORY_LAST_MONTH"
+    three_month_pat = r"(최근\s*3\s*개월|지난\s*3\s*개월|3\s*개월)"
+    if re.search(three_month_pat, t) and re.search(r"(요약|정리|리포트|조회|보여|내역)", t):
+        return "HISTORY_3M"
+    term_markers = ["뭐야", "뜻", "의미", "설명", "용어", "란"]
+    finance_terms = ["etf", "per", "pbr", "배당", "분산", "리밸런싱", "지수", "s&p", "나스닥", "qqq", "tqqq"]
+    if any(m in t for m in term_markers) and any(ft.lower() in t.lower() or ft in t for ft in finance_terms):
+        return "TERM_QA"
+    if "?" in t and any(ft.lower() in t.lower() or ft in t for ft in finance_terms):
+        return "TERM_QA"
+    if any(m in t for m in ["지금 사", "지금 사도", "지금 매수", "추가로 사", "더 사", "급락", "급등", "불안", "무서", "조급"]):
+        return "DECIDE_NOW"
+    if any(m in t for m in ["얼마씩", "얼마 사", "비중", "포트폴리오", "이번 달", "투자 계획", "가이드", "분배"]):
+        return "ALLOCATE"
+    if any(m in t for m in ["시작", "온보딩", "프로필", "설정 등록", "처음", "가입"]):
+        return "ONBOARD"
+    if "계획" in t and any(v in t for v in ["세워", "수립", "만들", "짜"]):
+        return "ONBOARD"
+    return "ALLOCATE"
+
+
+def _legacy_node_route(text: str, interview_step=None, pending_confirm_reset=False) -> str:
+    if pending_confirm_reset:
+        return "EDIT_CONFIRM"
+    if interview_step == "SHOW_RESULT":
+        if any(w in text for w in ["보여줘", "시뮬레이션", "예", "응", "그래"]):
+            return "RUN_SIMULATION"
+    if interview_step in ["ASK_GOAL", "ASK_RISK", "ASK_SECTOR", "CHECK_EXISTING", "SHOW_RESULT", "ASK_SAVE"]:
+        return "RECOMMEND_STOCK"
+    market_keywords = [
+        "시장", "뉴스", "시황", "분위기", "전망", "trend", "market",
+        "경제", "증시", "지수", "장세", "나스닥", "다우", "S&P", "에스앤피",
+        "장이", "장 상황", "장 흐름",
+    ]
+    if any(w in text for w in market_keywords) or "어때" in text:
+        if "추천" not in text:
+            return "MARKET_INFO"
+    intent = _legacy_route_intent(text)
+    if "추천" in text or "종목" in text or "살까" in text:
+        intent = "RECOMMEND_STOCK"
+    return intent
+
+
+def load_golden(path: Path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def verify(rows) -> int:
+    bad = 0
+    for r in rows:
+        got_base = route_intent(r["text"])
+        got_turn = route_turn(r["text"], r.get("interview_step"), bool(r.get("pending_confirm_reset"))).intent
+        if got_base != r["route_intent"] or got_turn != r["intent"]:
+            bad += 1
+            print(f"❌ {r['text']!r} step={r.get('interview_step')}: "
+                  f"route_intent {got_base} (기대 {r['route_intent']}), node_route {got_turn} (기대 {r['intent']})")
+    return bad
+
+
+def _time(fn, rows, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for r in rows:
+            fn(r["text"], r.get("interview_step"), bool(r.get("pending_confirm_reset")))
+    n = repeat * len(rows)
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def _scan_scaling(rows, extra: int, repeat: int) -> None:
+    # 키워드가 늘어날 때: 키워드마다 부분 문자열 검색(예전 방식) vs 자동자 한 번 훑기
+    words = [w for ws, _ in KEYWORDS.values() for w in ws]
+    words += [f"가상키워드{i}" for i in range(extra)]
+    ac = AhoCorasick([w.lower() for w in words])
+    texts = [r["text"] for r in rows]
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for t in texts:
+            [w for w in words if w in t]
+    naive_us = (time.perf_counter() - t0) / (repeat * len(texts)) * 1e6
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for t in texts:
+            ac.find(t.lower())
+    ac_us = (time.perf_counter() - t0) / (repeat * len(texts)) * 1e6
+    print(f"키워드 {len(words)}개 스캔: 부분 문자열 검색 {naive_us:.1f} µs, 자동자 {ac_us:.1f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="라우터 골든 코퍼스 검증 + 예전/현재 속도 비교")
+    parser.add_argument("--golden", default=str(GOLDEN_PATH))
+    parser.add_argument("--repeat", type=int, default=500, help="코퍼스 반복 횟수")
+    parser.add_argument("--pad", type=int, default=0, help="발화 앞에 붙일 잡담 글자 수 (긴 입력 확인용)")
+    parser.add_argument("--extra-keywords", type=int, default=1000, help="스캔 비용 비교용 가상 키워드 수 (0이면 생략)")
+    args = parser.parse_args()
+
+    rows = load_golden(Path(args.golden))
+    bad = verify(rows)
+    print(f"골든 코퍼스: {len(rows)}건 중 불일치 {bad}건")
+
+    if args.pad:
+        filler = ("오늘 날씨가 좋아서 " * (args.pad // 10 + 1))[: args.pad]
+        rows = [dict(r, text=filler + r["text"]) for r in rows]
+
+    legacy_us = _time(_legacy_node_route, rows, args.repeat)
+    new_us = _time(lambda t, s, c: route_turn(t, s, c).intent, rows, args.repeat)
+    print(f"예전 캐스케이드: {legacy_us:.1f} µs/발화")
+    print(f"규칙 표 매처:    {new_us:.1f} µs/발화 ({legacy_us / new_us:.1f}x)")
+    if args.extra_keywords:
+        _scan_scaling(rows, 0, max(1, args.repeat // 10))
+        _scan_scaling(rows, args.extra_keywords, max(1, args.repeat // 10))
+    sys.exit(1 if bad else 0)
+
+
+if __name__ == "__main__":
+    main()
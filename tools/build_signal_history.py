@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import argparse
+
+# ✅ 실행 위치에 따라 모듈이 안 잡히면 -m로 실행하세요:
+# python -m tools.build_signal_history --tickers QQQ SPY
+
+from model.monthly_model import refresh_signal_history_many
+
+
+def main():
+    parser = argparse.ArgumentParser(description="월말 모델 신호 히스토리를 계산해서 DB(monthly_signals)에 저장")
+    parser.add_argument("--tickers", nargs="+", default=["QQQ"])
+    parser.add_argument("--period", default="max", help="yfinance period (default: max)")
+    args = parser.parse_args()
+
+    # 여러 티커도 다운로드 1번 + 행렬 계산 1번
+    hists = refresh_signal_history_many(args.tickers, period=args.period)
+    for ticker in args.tickers:
+        hist = hists.get(ticker.upper())
+        if hist is None or hist.empty:
+            print(f"⚠️ {ticker}: 계산된 신호가 없어요.")
+            continue
+        print(f"✅ {ticker}: {len(hist)}개월 저장 ({hist.index[0]} ~ {hist.index[-1]})")
+
+
+if __name__ == "__main__":
+    main()
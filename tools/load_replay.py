@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# ✅ 실행 위치에 따라 모듈이 안 잡히면 -m로 실행하세요:
+# python -m tools.load_replay --users 32 --concurrency 8
+# python -m tools.load_replay --scenario recommend_simulate --users 8 --think-ms 500
+# python -m tools.load_replay --provider fake --latency-ms chat=800,embed=50,search=300
+# 기본은 임시 DB 사용 (--db로 지정 가능). LLM/검색 노드는 --provider에 따라 실제 API/가짜/녹화본 사용.
+
+from data import db
+
+SCENARIOS_PATH = Path(__file__).resolve().parent.parent / "data" / "load_scenarios.jsonl"
+
+
+def load_scenarios(path: Path, only: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    한 줄 = {"name", "weight"?, "turns": [발화 또는 {"text": ...}]}
+    """
+    out = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            s = json.loads(line)
+            if only and s["name"] not in only:
+                continue
+            s["turns"] = [t if isinstance(t, str) else t.get("text", "") for t in s["turns"]]
+            out.append(s)
+    if not out:
+        raise SystemExit(f"시나리오가 없습니다: {path} {only or ''}")
+    return out
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_intent: Dict[str, List[float]] = defaultdict(list)
+        self.by_node: Dict[str, List[float]] = defaultdict(list)
+        self.by_scenario: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.scenario_errors: Dict[str, int] = defaultdict(int)
+        self.node_errors: Dict[str, int] = defaultdict(int)
+        self.samples: List[str] = []
+
+    def node(self, name: str, elapsed: float, err: Optional[BaseException]) -> None:
+        with self.lock:
+            self.by_node[name].append(elapsed)
+            if err is not None:
+                self.node_errors[name] += 1
+
+    def turn(self, scenario: str, intent: str, elapsed: float, err: Optional[str] = None) -> None:
+        with self.lock:
+            self.by_intent[intent].append(elapsed)
+            self.by_scenario[scenario].append(elapsed)
+            if err:
+                self.errors[intent] += 1
+                self.scenario_errors[scenario] += 1
+                if len(self.samples) < 5:
+                    self.samples.append(f"[{scenario}/{intent}] {err}")
+
+
+def _pct(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _table(title: str, groups: Dict[str, List[float]], errors: Dict[str, int]) -> None:
+    print(f"\n[{title}]")
+    print(f"  {'name':<24}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'err':>6}")
+    for name, vals in sorted(groups.items(), key=lambda kv: -sum(kv[1])):
+        if not vals:
+            continue
+        print(
+            f"  {name:<24}{len(vals):>7}{_pct(vals, 0.5) * 1000:>10.1f}{_pct(vals, 0.95) * 1000:>10.1f}"
+            f"{_pct(vals, 0.99) * 1000:>10.1f}{max(vals) * 1000:>10.1f}{errors.get(name, 0):>6}"
+        )
+
+
+def run_user(idx: int, run_id: str, scenario: Dict[str, Any], stats: Stats, think_s: float, wait_jobs: bool) -> None:
+    from agents.router import route_turn
+    from graph import run_thread_turn
+
+    thread_id = f"load:{run_id}:{idx}"
+    state: Dict[str, Any] = {"user_id": f"load_{run_id}_{idx}"}
+    for text in scenario["turns"]:
+        t0 = time.perf_counter()
+        err = None
+        intent = "?"
+        try:
+            out = run_thread_turn(thread_id, {"user_text": text}, state=state, wait_jobs=wait_jobs)
+            if isinstance(out, dict):
+                state.update(out)
+            intent = state.get("intent") or ("INTAKE" if state.get("pending_intake_field") else "?")
+        except Exception as e:
+            # 그래프가 중간에 죽으면 결과 state가 없으므로 라우터로 intent만 다시 판단
+            err = f"{type(e).__name__}: {e}"
+            intent = route_turn(text, state.get("interview_step"), bool(state.get("pending_confirm_reset"))).intent
+        stats.turn(scenario["name"], intent, time.perf_counter() - t0, err)
+        if think_s:
+            time.sleep(random.uniform(0.5, 1.5) * think_s)
+    db.close_thread_conns()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="시나리오 대화를 여러 가상 사용자로 동시에 재생해 턴/노드 지연 측정")
+    parser.add_argument("--scenarios", default=str(SCENARIOS_PATH))
+    parser.add_argument("--scenario", action="append", help="이 이름의 시나리오만 (여러 번 지정 가능)")
+    parser.add_argument("--users", type=int, default=16, help="가상 사용자 수 (사용자마다 시나리오 1개를 가중치로 뽑음)")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시에 대화하는 사용자 수")
+    parser.add_argument("--think-ms", type=int, default=0, help="턴 사이 평균 대기 (ms)")
+    parser.add_argument("--no-wait-jobs", action="store_true", help="백그라운드 작업(시뮬레이션/브리핑) 완료를 기다리지 않음")
+    parser.add_argument("--db", default=None, help="사용할 SQLite 파일 (기본: 임시 파일)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--provider", default=None, help="openai | fake | recorded | record (기본: RULEPILOT_PROVIDER)")
+    parser.add_argument("--latency-ms", default=None, help="가짜/녹화 응답 지연 (예: 300 또는 chat=800,search=300)")
+    args = parser.parse_args()
+
+    # 공급자 선택은 모델을 만들기 전에 (agents.providers가 env를 읽음)
+    if args.provider:
+        os.environ["RULEPILOT_PROVIDER"] = args.provider
+    if args.latency_ms:
+        os.environ["RULEPILOT_PROVIDER_LATENCY_MS"] = args.latency_ms
+
+    random.seed(args.seed)
+    db.DB_PATH = Path(args.db) if args.db else Path(tempfile.mkdtemp()) / "load.sqlite3"
+    db.migrate()
+
+    import graph
+
+    graph.get_app()  # 컴파일은 측정에서 제외
+    scenarios = load_scenarios(Path(args.scenarios), args.scenario)
+    weights = [float(s.get("weight", 1)) for s in scenarios]
+    picks = random.choices(scenarios, weights=weights, k=args.users)
+    run_id = time.strftime("%H%M%S")
+
+    stats = Stats()
+    graph.add_node_observer(stats.node)
+    t0 = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="load-user") as ex:
+            futures = [
+                ex.submit(run_user, i, run_id, s, stats, args.think_ms / 1000, not args.no_wait_jobs)
+                for i, s in enumerate(picks)
+            ]
+            for f in futures:
+                f.result()
+    finally:
+        graph.remove_node_observer(stats.node)
+    wall = time.perf_counter() - t0
+
+    turns = sum(len(v) for v in stats.by_intent.values())
+    all_lat = [x for v in stats.by_intent.values() for x in v]
+    from agents.providers import provider_name
+
+    print(f"DB: {db.DB_PATH} / provider: {provider_name()}")
+    print(
+        f"사용자 {args.users}명 (동시 {args.concurrency}), 턴 {turns}개, {wall:.2f}초 "
+        f"-> {turns / wall if wall else 0:.1f} 턴/초, 오류 {sum(stats.errors.values())}건"
+    )
+    if all_lat:
+        print(
+            f"턴 지연 p50 {_pct(all_lat, 0.5) * 1000:.1f} ms / p95 {_pct(all_lat, 0.95) * 1000:.1f} ms "
+            f"/ p99 {_pct(all_lat, 0.99) * 1000:.1f} ms / 평균 {statistics.mean(all_lat) * 1000:.1f} ms"
+        )
+    _table("intent별 턴 지연", stats.by_intent, stats.errors)
+    _table("노드별 지연", stats.by_node, stats.node_errors)
+    _table("시나리오별 턴 지연", stats.by_scenario, stats.scenario_errors)
+    if stats.samples:
+        print("\n[오류 예시]")
+        for s in stats.samples:
+            print(f"  {s}")
+
+
+if __name__ == "__main__":
+    main()
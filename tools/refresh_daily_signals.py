@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import argparse
+
+# ✅ 실행 위치에 따라 모듈이 안 잡히면 -m로 실행하세요:
+# python -m tools.refresh_daily_signals --tickers QQQ SPY SCHD VIG GLD
+
+from model.rolling_state import refresh_daily_signals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="티커별 롤링 신호 상태를 최근 일봉으로 증분 갱신 (일일 배치)")
+    parser.add_argument("--tickers", nargs="+", default=["QQQ"])
+    args = parser.parse_args()
+
+    for r in refresh_daily_signals(args.tickers):
+        if "error" in r:
+            print(f"❌ {r['ticker']}: {r['error']}")
+            continue
+        print(
+            f"✅ {r['ticker']} ({r['last_date']}): +{r['new_bars']}봉, "
+            f"주식 비중 {r['equity_weight']:.0%}, {', '.join(r['reason_codes'])}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+# ✅ 실행 위치에 따라 모듈이 안 잡히면 -m로 실행하세요:
+# python -m tools.route_corpus --in logs/utterances.jsonl --out routed.jsonl --workers 4
+# python -m tools.route_corpus --in data/router_golden.jsonl --expect intent   (라벨과 비교)
+# 입력: 한 줄에 JSON 1개 ({"text": ..., "interview_step": ...}) 또는 그냥 발화 텍스트
+
+from agents.router import map_chunks, route_record
+
+
+def parse_line(line: str, text_field: str = "text") -> Optional[Dict[str, Any]]:
+    line = line.rstrip("\n")
+    if not line.strip():
+        return None
+    if not line.lstrip().startswith("{"):
+        return {"text": line}
+    rec = json.loads(line)
+    if text_field != "text" and "text" not in rec:
+        rec["text"] = rec.get(text_field, "")
+    return rec
+
+
+# (결과 JSON 줄, intent, 규칙, 지연 µs, 기대 intent)
+Routed = Tuple[str, str, str, float, Any]
+
+
+def route_lines(lines: List[str], text_field: str = "text", expect: Optional[str] = None) -> List[Routed]:
+    """
+    JSONL 줄 묶음 -> 라우팅 결과 (map_chunks 작업 단위).
+    파싱/직렬화까지 작업 프로세스에서 해야 workers를 늘린 만큼 빨라짐.
+    """
+    out: List[Routed] = []
+    for line in lines:
+        try:
+            rec = parse_line(line, text_field)
+        except json.JSONDecodeError as e:
+            print(f"⚠️ JSON 오류, 건너뜀: {e} ({line[:60]!r})", file=sys.stderr)
+            continue
+        if rec is None:
+            continue
+        # 기대 라벨이 "intent" 필드에 있으면 결과에 덮어써지므로 미리 꺼내둠
+        expected = rec.get(expect) if expect else None
+        res = route_record(rec)
+        out.append((json.dumps(res, ensure_ascii=False), res["intent"], res["rule"], res["elapsed_us"], expected))
+    return out
+
+
+def _pct(values, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="발화 JSONL을 라우터로 일괄 분류 (intent 분포/규칙 적중/처리량)")
+    parser.add_argument("--in", dest="inp", default="-", help="입력 JSONL (기본: stdin)")
+    parser.add_argument("--out", default=None, help="결과 JSONL (생략하면 요약만 출력, '-'면 stdout)")
+    parser.add_argument("--workers", type=int, default=1, help="프로세스 수 (1이면 현재 프로세스에서 처리)")
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--text-field", default="text", help="발화가 들어있는 필드 이름")
+    parser.add_argument("--expect", default=None, help="비교할 기대 intent 필드 (예: intent, label)")
+    parser.add_argument("--show-mismatch", type=int, default=20, help="불일치 예시 출력 개수")
+    args = parser.parse_args()
+
+    inp = sys.stdin if args.inp == "-" else open(args.inp, encoding="utf-8")
+    out: Optional[TextIO] = None
+    if args.out == "-":
+        out = sys.stdout
+    elif args.out:
+        out = open(args.out, "w", encoding="utf-8")
+
+    intents: Counter = Counter()
+    rules: Counter = Counter()
+    latencies = []
+    total = 0
+    matched = 0
+    confusion: Counter = Counter()
+    shown = 0
+
+    t0 = time.perf_counter()
+    try:
+        for line, intent, rule, elapsed_us, expected in map_chunks(
+            route_lines, inp, args.workers, args.chunk_size, args.text_field, args.expect
+        ):
+            total += 1
+            intents[intent] += 1
+            rules[rule] += 1
+            latencies.append(elapsed_us)
+
+            if args.expect:
+                if expected == intent:
+                    matched += 1
+                else:
+                    confusion[(expected, intent)] += 1
+                    if shown < args.show_mismatch:
+                        shown += 1
+                        print(f"❌ {line[:120]}: 기대 {expected}", file=sys.stderr)
+            if out is not None:
+                out.write(line + "\n")
+    finally:
+        if inp is not sys.stdin:
+            inp.close()
+        if out is not None and out is not sys.stdout:
+            out.close()
+    wall = time.perf_counter() - t0
+
+    # 결과를 stdout으로 흘리는 중이면 요약은 stderr로
+    log = sys.stderr if out is sys.stdout else sys.stdout
+    print(f"발화 {total}건, {wall:.2f}초 ({total / wall if wall else 0:,.0f}건/초, workers={args.workers})", file=log)
+    if latencies:
+        print(
+            f"라우팅 지연 µs: 평균 {statistics.mean(latencies):.1f} / p50 {_pct(latencies, 0.5):.1f} "
+            f"/ p95 {_pct(latencies, 0.95):.1f} / p99 {_pct(latencies, 0.99):.1f}",
+            file=log,
+        )
+    print("\n[intent 분포]", file=log)
+    for k, v in intents.most_common():
+        print(f"  {k:<20} {v:>7} ({v / total:.1%})", file=log)
+    print("\n[규칙 적중]", file=log)
+    for k, v in rules.most_common():
+        print(f"  {k:<20} {v:>7}", file=log)
+    if args.expect and total:
+        print(f"\n[기대값 비교] 일치 {matched}/{total} ({matched / total:.1%})", file=log)
+        for (exp, got), v in confusion.most_common(10):
+            print(f"  {exp} -> {got}: {v}", file=log)
+    sys.exit(1 if args.expect and matched != total else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import date
+
+# ✅ 실행 위치에 따라 모듈이 안 잡히면 -m로 실행하세요:
+# python -m tools.sweep_monthly_params --risk-level conservative --top 15
+
+from model.backtest import _load_closes
+from model.param_sweep import DEFAULT_GRID, RISK_MDD_LIMITS, param_grid, run_param_sweep
+
+
+def main():
+    parser = argparse.ArgumentParser(description="월간 모델 계수 격자 탐색 (워크포워드 백테스트, 프로세스 풀)")
+    parser.add_argument("--equity", default="QQQ")
+    parser.add_argument("--safe", default="BIL")
+    parser.add_argument("--budget", type=int, default=1_000_000, help="월 적립금(원)")
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--risk-level", choices=sorted(RISK_MDD_LIMITS), default=None)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--out", default=None, help="전체 결과 CSV 저장 경로")
+    args = parser.parse_args()
+
+    eq, safe = _load_closes(args.equity, args.safe, "max", date.today().isoformat())
+    grid = param_grid(**DEFAULT_GRID)
+
+    t0 = time.perf_counter()
+    df = run_param_sweep(
+        eq, safe, grid,
+        monthly_budget_krw=args.budget,
+        years=args.years,
+        workers=args.workers,
+        risk_level=args.risk_level,
+    )
+    elapsed = time.perf_counter() - t0
+
+    print(f"[OK] {len(df)}개 조합 평가 ({df.attrs.get('period', '')}) - {elapsed:.2f}s")
+    if args.risk_level:
+        print(f"[OK] risk_level={args.risk_level}: MDD 한도 {RISK_MDD_LIMITS[args.risk_level]:.0%}")
+    print(df.head(args.top).to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+
+    if args.out:
+        df.to_csv(args.out, index=False)
+        print("[OK] saved:", args.out)
+
+
+if __name__ == "__main__":
+    main()